@@ -0,0 +1,82 @@
+import math
+import tensorflow as tf
+
+# --- CONFIGURATION ---
+# Each policy is applied per image, inside the tf.data pipeline.
+# Nothing is written to disk: every epoch sees fresh random variants.
+AUGMENT_POLICY = {
+    "flip_prob": 0.5,                 # Chance of a horizontal mirror
+    "rotation_prob": 0.5,             # Chance of a small rotation
+    "max_rotation_degrees": 10,       # Same range the old "_rot1/_rot2" copies used
+    "brightness_prob": 0.5,           # Chance of a brightness change
+    "brightness_range": (0.7, 1.3),   # Same range the old "_light1" copies used
+}
+AUGMENT_SEED = 123
+
+
+def _rotation_transforms(angles, height, width):
+    """Builds one projective transform per image that rotates it about its centre."""
+    cos = tf.math.cos(angles)
+    sin = tf.math.sin(angles)
+    h = tf.cast(height, tf.float32) - 1
+    w = tf.cast(width, tf.float32) - 1
+    x_offset = (w - (cos * w - sin * h)) / 2.0
+    y_offset = (h - (sin * w + cos * h)) / 2.0
+    zeros = tf.zeros_like(angles)
+    return tf.stack([cos, -sin, x_offset, sin, cos, y_offset, zeros, zeros], axis=1)
+
+
+def augment_batch(images, seed, policy=AUGMENT_POLICY):
+    """
+    Randomly flips, rotates and brightens a batch of images (float 0-255, NHWC).
+    'seed' is a shape [2] int tensor, so the same seed always gives the same batch.
+    """
+    shape = tf.shape(images)
+    batch, height, width = shape[0], shape[1], shape[2]
+
+    # One independent draw per image for each policy
+    seeds = tf.random.experimental.stateless_split(seed, num=4)
+
+    # 1. Flip
+    flip = tf.random.stateless_uniform([batch], seeds[0]) < policy["flip_prob"]
+    images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+
+    # 2. Rotate (angle is 0 for images that were not picked)
+    max_angle = math.radians(policy["max_rotation_degrees"])
+    angle_seeds = tf.random.experimental.stateless_split(seeds[1], num=2)
+    angles = tf.random.stateless_uniform([batch], angle_seeds[0], -max_angle, max_angle)
+    rotate = tf.random.stateless_uniform([batch], angle_seeds[1]) < policy["rotation_prob"]
+    angles = tf.where(rotate, angles, tf.zeros_like(angles))
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=_rotation_transforms(angles, height, width),
+        output_shape=tf.stack([height, width]),
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="REFLECT",
+    )
+
+    # 3. Brightness (multiplicative, like PIL's ImageEnhance.Brightness)
+    low, high = policy["brightness_range"]
+    factors = tf.random.stateless_uniform([batch], seeds[2], low, high)
+    brighten = tf.random.stateless_uniform([batch], seeds[3]) < policy["brightness_prob"]
+    factors = tf.where(brighten, factors, tf.ones_like(factors))
+    images = tf.clip_by_value(images * factors[:, None, None, None], 0.0, 255.0)
+
+    return images
+
+
+def augment_dataset(ds, policy=AUGMENT_POLICY, seed=AUGMENT_SEED):
+    """
+    Adds the augmentation as a parallel map stage on a batched (images, labels) dataset.
+    Each batch gets its own seed drawn from 'seed', so runs are reproducible,
+    and the seeds change every epoch so the model never sees the same copy twice.
+    """
+    seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).batch(2)
+    ds = tf.data.Dataset.zip((ds, seeds))
+
+    def _map(batch, batch_seed):
+        images, labels = batch
+        return augment_batch(images, batch_seed, policy), labels
+
+    return ds.map(_map, num_parallel_calls=tf.data.AUTOTUNE)
@@ -0,0 +1,93 @@
+import os
+import tensorflow as tf
+from image_catalog import parse_capture_name
+from preprocess import tf_loader
+from config import IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE, SEED
+
+# --- CONFIGURATION ---
+SHUFFLE_BUFFER = 1000   # Per-stream buffer of file paths (images are decoded AFTER sampling)
+
+# How to split the files into streams:
+#   "class"        -> one stream per class folder (clear_road, fully_covered, ...)
+#   "camera"       -> one stream per StreamCode, so no busy camera dominates an epoch
+#   "class_camera" -> balance classes first, then cameras inside each class
+GROUP_BY = "class"
+
+
+def stream_code_from_filename(filename):
+    """Capture files are named '{StreamCode}_{YYYYmmdd}_{HHMMSS}.jpg', so the camera is the prefix."""
+    return parse_capture_name(filename)[0]
+
+
+def _group_files(file_paths, class_names, group_by):
+    """Returns {group_key: (paths, labels)} plus the class of every group."""
+    groups = {}
+    group_class = {}
+    for path in file_paths:
+        category = os.path.basename(os.path.dirname(path))
+        if category not in class_names:
+            continue
+        camera = stream_code_from_filename(path)
+
+        if group_by == "class":
+            key = category
+        elif group_by == "camera":
+            key = camera
+        elif group_by == "class_camera":
+            key = (category, camera)
+        else:
+            raise ValueError(f"Unknown group_by: {group_by}")
+
+        paths, labels = groups.setdefault(key, ([], []))
+        paths.append(path)
+        labels.append(class_names.index(category))
+        group_class[key] = category
+    return groups, group_class
+
+
+def _group_weights(keys, group_class, group_by, target_ratios):
+    """Turns target_ratios (per class, or per camera for 'camera') into per-stream weights."""
+    if group_by == "class_camera":
+        classes = sorted(set(group_class.values()))
+        cameras_per_class = {c: sum(1 for k in keys if group_class[k] == c) for c in classes}
+        class_ratio = {c: (target_ratios or {}).get(c, 1.0) for c in classes}
+        weights = [class_ratio[group_class[k]] / cameras_per_class[group_class[k]] for k in keys]
+    else:
+        weights = [(target_ratios or {}).get(k, 1.0) for k in keys]
+
+    total = sum(weights)
+    if total <= 0:
+        raise ValueError("target_ratios must give at least one group a positive weight.")
+    return [w / total for w in weights]
+
+
+def balanced_dataset(file_paths, class_names, group_by=GROUP_BY, target_ratios=None,
+                     image_size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE,
+                     shuffle_buffer=SHUFFLE_BUFFER, seed=SEED):
+    """
+    Builds a class (or camera) balanced training dataset by interleaving one
+    endless, shuffled file stream per group with the requested ratios.
+
+    Only file paths sit in the shuffle buffers; images are decoded after sampling,
+    so no class is ever loaded into memory as a whole and nothing is copied on disk.
+    One epoch yields as many images as there are files, like the unbalanced pipeline.
+    """
+    groups, group_class = _group_files(file_paths, class_names, group_by)
+    if not groups:
+        raise ValueError("No files matched the given class names.")
+
+    keys = sorted(groups)
+    weights = _group_weights(keys, group_class, group_by, target_ratios)
+
+    streams = []
+    for key in keys:
+        paths, labels = groups[key]
+        stream = tf.data.Dataset.from_tensor_slices((paths, labels))
+        stream = stream.shuffle(min(len(paths), shuffle_buffer), seed=seed, reshuffle_each_iteration=True)
+        streams.append(stream.repeat())
+
+    num_samples = sum(len(paths) for paths, _ in groups.values())
+    ds = tf.data.Dataset.sample_from_datasets(streams, weights=weights, seed=seed)
+    ds = ds.take(num_samples)
+    ds = ds.map(tf_loader(image_size), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.batch(batch_size)
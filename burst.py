@@ -0,0 +1,83 @@
+import numpy as np
+from frame_quality import small_grey, sharpness
+
+# One HLS handshake, several frames. The first frame after opening a stream is often a half-decoded
+# grey keyframe or motion-smeared, so capture reads a short burst from the same connection and
+# keeps the best one (or the per-pixel median of the good ones, which removes passing vehicles).
+#
+#   frame, info = capture_burst(cv2.VideoCapture(url))
+#
+# Only numpy + frame_quality.py: copy both next to gcp/code.py to use it in the cloud function.
+
+# --- CONFIGURATION ---
+BURST_FRAMES = 5          # Frames scored per connection (1 = the old single cap.read())
+BURST_STRIDE = 6          # Frames skipped (grab() only, no colour conversion) between scored ones; ~0.2s at 30fps
+BURST_MODE = "best"       # "best" = sharpest complete frame, "median" = median of the complete frames
+MIN_STACK = 3             # "median" needs at least this many complete frames, else falls back to "best"
+BLOCK = 16                # Completeness is judged on BLOCK x BLOCK tiles of the small grey copy
+DEAD_BLOCK_STD = 1.5      # A tile flatter than this is undecoded (grey / smeared) or genuinely featureless
+COMPLETE_TOLERANCE = 0.02 # Frames within this much of the burst's best completeness count as complete
+
+
+def completeness(grey):
+    """
+    Fraction of tiles with any texture. Half-decoded keyframes have whole bands of flat grey;
+    sky and snow are flat in every frame of a burst, so only compare frames of the same camera.
+    """
+    h, w = grey.shape[0] // BLOCK * BLOCK, grey.shape[1] // BLOCK * BLOCK
+    if not h or not w:
+        return 1.0
+    tiles = grey[:h, :w].reshape(h // BLOCK, BLOCK, w // BLOCK, BLOCK)
+    return float((tiles.std(axis=(1, 3)) >= DEAD_BLOCK_STD).mean())
+
+
+def score_frames(frames, bgr=True):
+    """[(completeness, sharpness)] per frame."""
+    scores = []
+    for frame in frames:
+        grey = small_grey(frame, bgr)
+        scores.append((completeness(grey), sharpness(grey)))
+    return scores
+
+
+def select(frames, scores, mode=BURST_MODE, min_stack=MIN_STACK):
+    """
+    (frame, chosen index or "median"). Frames within COMPLETE_TOLERANCE of the most complete one
+    qualify; "best" takes the sharpest of those, "median" stacks them.
+    """
+    best_complete = max(c for c, _ in scores)
+    good = [i for i, (c, _) in enumerate(scores) if c >= best_complete - COMPLETE_TOLERANCE]
+    if mode == "median" and len(good) >= min_stack and len({frames[i].shape for i in good}) == 1:
+        stack = np.stack([frames[i] for i in good])
+        return np.median(stack, axis=0).astype(np.uint8), "median"
+    index = max(good, key=lambda i: scores[i][1])
+    return frames[index], index
+
+
+def read_burst(cap, count=BURST_FRAMES, stride=BURST_STRIDE):
+    """Up to 'count' decoded frames from an open cv2.VideoCapture, 'stride' frames apart."""
+    frames = []
+    for n in range(count):
+        if n:
+            for _ in range(stride):
+                if not cap.grab():
+                    return frames
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    return frames
+
+
+def capture_burst(cap, count=BURST_FRAMES, stride=BURST_STRIDE, mode=BURST_MODE):
+    """
+    (BGR frame or None, info) from one open stream. info has the frames read, the pick and
+    the (completeness, sharpness) scores, for logging.
+    """
+    frames = read_burst(cap, count, stride)
+    if not frames:
+        return None, {"frames": 0, "picked": None, "scores": []}
+    scores = score_frames(frames)
+    frame, picked = select(frames, scores, mode)
+    return frame, {"frames": len(frames), "picked": picked,
+                   "scores": [(round(c, 3), round(s, 1)) for c, s in scores]}
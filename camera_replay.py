@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlparse
+from config import CAMERA_API_URL, HLS_URL_TEMPLATE
+
+# Record the live camera API + HLS streams once, then replay them locally so capture
+# changes (concurrency, timeouts, retries) can be benchmarked offline and repeatably.
+#
+#   python camera_replay.py record     -> saves GetCameras + playlists + segments to RECORDING_FOLDER
+#   python camera_replay.py serve      -> serves them on REPLAY_PORT with the faults configured below
+#
+# Then point the scraper at it in config.py:
+#   CAMERA_API_URL = "http://127.0.0.1:8766/Default.aspx/GetCameras"
+#   HLS_URL_TEMPLATE = "http://127.0.0.1:8766/{mms_url}/{forge}/public/hls/{stream_code}.m3u8"
+
+# --- CONFIGURATION ---
+RECORDING_FOLDER = "camera_recording"
+RECORD_MAX_CAMERAS = None      # None = every camera in the list
+RECORD_SEGMENTS = 2            # Newest media segments kept per stream
+RECORD_TIMEOUT = 20
+
+REPLAY_HOST = "127.0.0.1"
+REPLAY_PORT = 8766
+REPLAY_SEED = 123              # Same seed + same requests = same faults, whatever the thread timing
+
+# Fault injection (per request)
+LATENCY_MS = 80                # Base delay before answering
+JITTER_MS = 40                 # + uniform 0..JITTER_MS
+FAILURE_RATE = 0.05            # Answer 503
+HANG_RATE = 0.02               # Accept the connection but never answer (until HANG_SECONDS)
+HANG_SECONDS = 120
+BANDWIDTH_KBPS = None          # e.g. 2000 to throttle segment downloads, None = unlimited
+
+HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "User-Agent": "Mozilla/5.0"
+}
+
+
+# --- Recording ---
+
+def _local_path(folder, url):
+    """https://host/a/b.m3u8?token=... -> {folder}/hls/host/a/b.m3u8 (query strings dropped)."""
+    parts = urlparse(url)
+    return os.path.join(folder, "hls", parts.netloc, *[p for p in parts.path.split("/") if p])
+
+
+def _replay_uri(url):
+    """Absolute URL -> /host/path, which is what the replay server answers."""
+    parts = urlparse(url)
+    return f"/{parts.netloc}{parts.path}"
+
+
+def _save(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _parse_playlist(text):
+    """(header lines, [(tag lines, uri)]) of an m3u8 playlist."""
+    header, entries, tags = [], [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if entries or tags or line.startswith(("#EXTINF", "#EXT-X-STREAM-INF")):
+                tags.append(line)
+            else:
+                header.append(line)
+        else:
+            entries.append((tags, line))
+            tags = []
+    return header, entries
+
+
+def record_playlist(session, url, folder, segments=RECORD_SEGMENTS, depth=0):
+    """
+    Saves a playlist and what it points to. Master playlists recurse into their variants;
+    media playlists keep only the newest 'segments' and get #EXT-X-ENDLIST, so the replay
+    is a fixed, finite stream.
+    """
+    response = session.get(url, timeout=RECORD_TIMEOUT)
+    response.raise_for_status()
+    header, entries = _parse_playlist(response.text)
+    is_master = any(t.startswith("#EXT-X-STREAM-INF") for tags, _ in entries for t in tags)
+
+    lines = []
+    if is_master and depth == 0:
+        lines.extend(header)
+        for tags, uri in entries:
+            child = urljoin(url, uri)
+            record_playlist(session, child, folder, segments, depth + 1)
+            lines.extend(tags)
+            lines.append(_replay_uri(child))
+    else:
+        kept = entries[-segments:]
+        skipped = len(entries) - len(kept)
+        for line in header:
+            if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+                line = f"#EXT-X-MEDIA-SEQUENCE:{int(line.split(':')[1]) + skipped}"
+            lines.append(line)
+        for tags, uri in kept:
+            segment = urljoin(url, uri)
+            data = session.get(segment, timeout=RECORD_TIMEOUT)
+            data.raise_for_status()
+            _save(_local_path(folder, segment), data.content)
+            lines.extend(tags)
+            lines.append(_replay_uri(segment))
+        lines.append("#EXT-X-ENDLIST")
+
+    _save(_local_path(folder, url), ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def record(folder=RECORDING_FOLDER, max_cameras=RECORD_MAX_CAMERAS, segments=RECORD_SEGMENTS):
+    import requests
+
+    start = time.perf_counter()
+    session = requests.Session()
+    session.headers.update({"User-Agent": HEADERS["User-Agent"]})
+
+    print("1. Recording the camera list...")
+    response = requests.post(CAMERA_API_URL, json={}, headers=HEADERS, timeout=RECORD_TIMEOUT)
+    response.raise_for_status()
+    _save(os.path.join(folder, "GetCameras.json"), response.content)
+    cameras = response.json().get('d', [])
+    if max_cameras:
+        cameras = cameras[:max_cameras]
+
+    print(f"2. Recording {len(cameras)} streams ({segments} segments each)...")
+    ok = 0
+    for cam in cameras:
+        stream_code, mms_url, forge = cam.get('StreamCode'), cam.get('MMSUrl'), cam.get('Forge')
+        if not (stream_code and mms_url and forge):
+            continue
+        url = HLS_URL_TEMPLATE.format(mms_url=mms_url, forge=forge, stream_code=stream_code)
+        try:
+            record_playlist(session, url, folder, segments)
+            ok += 1
+        except Exception as e:
+            # Offline streams stay missing in the recording, so the replay 404s them like the real site
+            print(f"   {stream_code}: not recorded ({e})")
+    print(f"Recorded {ok}/{len(cameras)} streams to {folder} in {time.perf_counter() - start:.0f}s.")
+
+
+# --- Replay ---
+
+class FaultPlan:
+    """
+    Decides latency / failure / hang per request. The dice are seeded by (seed, path, n-th request
+    for that path), so a run sees the same faults for the same requests no matter how threads interleave.
+    """
+
+    def __init__(self, seed=REPLAY_SEED, latency_ms=LATENCY_MS, jitter_ms=JITTER_MS,
+                 failure_rate=FAILURE_RATE, hang_rate=HANG_RATE):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.stats = {"requests": 0, "failed": 0, "hung": 0}
+
+    def decide(self, path):
+        """(delay in seconds, "ok" / "fail" / "hang") for the next request to 'path'."""
+        with self.lock:
+            n = self.counts.get(path, 0)
+            self.counts[path] = n + 1
+            rng = random.Random(hashlib.sha1(f"{self.seed}|{path}|{n}".encode("utf-8")).digest())
+            delay = (self.latency_ms + rng.uniform(0, self.jitter_ms)) / 1000
+            roll = rng.random()
+            if roll < self.hang_rate:
+                outcome = "hang"
+                self.stats["hung"] += 1
+            elif roll < self.hang_rate + self.failure_rate:
+                outcome = "fail"
+                self.stats["failed"] += 1
+            else:
+                outcome = "ok"
+            self.stats["requests"] += 1
+        return delay, outcome
+
+
+def make_handler(folder, plan, bandwidth_kbps=BANDWIDTH_KBPS):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _serve(self, body, content_type):
+            delay, outcome = plan.decide(self.path)
+            time.sleep(delay)
+            if outcome == "hang":
+                time.sleep(HANG_SECONDS)
+                self.close_connection = True
+                return
+            if outcome == "fail" or body is None:
+                status = 503 if outcome == "fail" else 404
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not bandwidth_kbps:
+                self.wfile.write(body)
+                return
+            chunk = max(1024, int(bandwidth_kbps * 1024 / 8 / 10))  # ~10 writes per second
+            for i in range(0, len(body), chunk):
+                self.wfile.write(body[i:i + chunk])
+                time.sleep(len(body[i:i + chunk]) * 8 / (bandwidth_kbps * 1024))
+
+        def _read(self, path):
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except OSError:
+                return None
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if urlparse(self.path).path.endswith("/GetCameras"):
+                self._serve(self._read(os.path.join(folder, "GetCameras.json")), "application/json")
+            else:
+                self._serve(None, "")
+
+        def do_GET(self):
+            parts = [p for p in urlparse(self.path).path.split("/") if p and p != ".."]
+            path = os.path.join(folder, "hls", *parts)
+            if path.endswith(".m3u8"):
+                content_type = "application/vnd.apple.mpegurl"
+            else:
+                content_type = "video/mp2t"
+            self._serve(self._read(path), content_type)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def serve(folder=RECORDING_FOLDER, host=REPLAY_HOST, port=REPLAY_PORT, plan=None):
+    if not os.path.exists(os.path.join(folder, "GetCameras.json")):
+        print(f"No recording in '{folder}'. Run 'python camera_replay.py record' first.")
+        return
+    plan = plan or FaultPlan()
+    server = ThreadingHTTPServer((host, port), make_handler(folder, plan))
+    server.daemon_threads = True
+    print(f"Replaying {folder} on http://{host}:{port} "
+          f"(latency {plan.latency_ms}+{plan.jitter_ms}ms, {plan.failure_rate:.0%} 503s, {plan.hang_rate:.0%} hangs). "
+          f"Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {json.dumps(plan.stats)}")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "record":
+        record()
+    else:
+        serve()
@@ -1,70 +1,112 @@
 import requests
 import cv2  # OpenCV
+import json
 import time
 import os
 from datetime import datetime
+from config import CAPTURE_FOLDER, CAMERAS_FILE, CAMERA_API_URL, HLS_URL_TEMPLATE
+from frame_quality import check_frame, rejected_path, QualityStats, REJECT_ACTION
+from burst import capture_burst, BURST_FRAMES
 
 # --- CONFIGURATION ---
-API_URL = "https://edmontontrafficcam.com/Default.aspx/GetCameras"
-OUTPUT_FOLDER = "traffic_dataset"
+API_URL = CAMERA_API_URL  # Point at camera_replay.py (in config.py) to test offline
+OUTPUT_FOLDER = CAPTURE_FOLDER
+REQUEST_TIMEOUT = 30
 
 # Ensure output directory exists
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+# This headers dictionary mimics a real browser request
+HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+def fetch_cameras():
+    """The camera list from the API (also saved to CAMERAS_FILE for the status API)."""
+    # We send an empty POST request to get the full JSON list
+    response = requests.post(API_URL, json={}, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+    data = response.json().get('d', []) # The list is hidden inside the 'd' key
+
+    # Keep the camera list (road names etc.) for the status API
+    with open(CAMERAS_FILE, "w") as f:
+        json.dump(data, f)
+    return data
+
+def capture_camera(cam, quality):
+    """
+    Captures, checks and saves one camera. Returns (BGR frame, filename, burst info) for a
+    saved frame, or None (incomplete entry, stream offline or rejected by the quality gate).
+    """
+    stream_code = cam.get('StreamCode')
+    mms_url = cam.get('MMSUrl')
+    forge = cam.get('Forge')
+    description = cam.get('PrimaryRoad')
+
+    if not (stream_code and mms_url and forge):
+        return None
+
+    # Construct the HLS Streaming URL based on the JS logic you found:
+    # s = "https://" + t + "/" + e + "/public/hls/" + n + ".m3u8"
+    video_url = HLS_URL_TEMPLATE.format(mms_url=mms_url, forge=forge, stream_code=stream_code)
+
+    # Use OpenCV to capture a short burst and keep the best frame (see burst.py)
+    cap = cv2.VideoCapture(video_url)
+    try:
+        frame, burst = capture_burst(cap)
+    finally:
+        # Release the video connection immediately to be polite
+        cap.release()
+
+    if frame is None:
+        print(f"   {description}: ❌ Failed (Stream offline).")
+        return None
+
+    # Generate filename
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{OUTPUT_FOLDER}/{stream_code}_{timestamp}.jpg"
+
+    # Black / slate / blurred frames are not worth storing or labeling
+    result = check_frame(frame, bgr=True)
+    quality.add(stream_code, result)
+    if not result["ok"]:
+        if REJECT_ACTION == "route":
+            target = rejected_path(filename, result)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            cv2.imwrite(target, frame)
+        print(f"   {description}: ⚠️ Rejected ({', '.join(result['reasons'])}).")
+        return None
+
+    # Save the frame as an image
+    cv2.imwrite(filename, frame)
+    print(f"   {description}: ✅ Saved (frame {burst['picked']} of {burst['frames']}).")
+    return frame, filename, burst
+
 def scrape_traffic_cameras():
     print("1. Fetching camera list from API...")
-    
-    # This headers dictionary mimics a real browser request
-    headers = {
-        "Content-Type": "application/json; charset=utf-8",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
+    start = time.perf_counter()
 
     try:
-        # We send an empty POST request to get the full JSON list
-        response = requests.post(API_URL, json={}, headers=headers)
-        data = response.json().get('d', []) # The list is hidden inside the 'd' key
-        
+        data = fetch_cameras()
         print(f"   Found {len(data)} cameras active on the network.")
 
         success_count = 0
+        replaced_first = 0
+        quality = QualityStats()
         
-        # 2. Iterate through every camera found
+        # 2. Capture every camera found
         for cam in data:
-            stream_code = cam.get('StreamCode')
-            mms_url = cam.get('MMSUrl')
-            forge = cam.get('Forge')
-            description = cam.get('PrimaryRoad')
-
-            if not (stream_code and mms_url and forge):
-                continue
-
-            # Construct the HLS Streaming URL based on the JS logic you found:
-            # s = "https://" + t + "/" + e + "/public/hls/" + n + ".m3u8"
-            video_url = f"https://{mms_url}/{forge}/public/hls/{stream_code}.m3u8"
-            
-            # 3. Use OpenCV to Capture a Single Frame
-            print(f"   Capturing: {description}...", end=" ")
-            
-            cap = cv2.VideoCapture(video_url)
-            ret, frame = cap.read() # Read one frame
-            
-            if ret:
-                # Generate filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{OUTPUT_FOLDER}/{stream_code}_{timestamp}.jpg"
-                
-                # Save the frame as an image
-                cv2.imwrite(filename, frame)
-                print(f"✅ Saved.")
+            saved = capture_camera(cam, quality)
+            if saved is not None:
                 success_count += 1
-            else:
-                print(f"❌ Failed (Stream offline).")
-            
-            # Release the video connection immediately to be polite
-            cap.release()
+                if saved[2]["picked"] != 0:
+                    replaced_first += 1  # The first frame alone would have been the worse one
 
-        print(f"\nScrape Complete. Downloaded {success_count} images.")
+        quality.save()
+        print(f"\nScrape Complete. Downloaded {success_count} images in {time.perf_counter() - start:.1f}s "
+              f"({quality.summary()}).")
+        if BURST_FRAMES > 1:
+            print(f"   Burst capture replaced the first frame on {replaced_first} cameras.")
 
     except Exception as e:
         print(f"\nCRITICAL ERROR: {e}")
@@ -0,0 +1,273 @@
+import json
+import os
+import time
+import numpy as np
+from frame_quality import small_grey, signature
+from config import CLASS_NAMES, STATUS_URL
+
+# Adaptive capture: instead of every camera every N seconds, each camera has its own interval.
+# A camera whose predicted road condition or picture changes drops to MIN_INTERVAL; a stable one
+# backs off by DECAY per capture up to BASE_INTERVAL. Global rate and CPU budgets cap the total,
+# and when they bind, the most overdue (relative to their interval) cameras go first.
+#
+#   python capture_scheduler.py          -> capture loop over the camera API (Ctrl+C to stop)
+#   python capture_scheduler.py --once   -> one pass over the cameras that are due (for cron)
+
+# --- CONFIGURATION ---
+MIN_INTERVAL = 60               # Seconds between captures of a camera that is changing (storm)
+BASE_INTERVAL = 15 * 60         # Slowest interval a stable camera decays to
+DECAY = 1.5                     # Interval multiplier per capture without change
+SCENE_CHANGE = 0.15             # 1 - correlation of frame signatures above this = the scene changed
+INFER_MIN_CHANGE = 0.03         # Below this the frame is "the same picture": reuse the last label
+UNSURE_CONFIDENCE = 0.6         # Predictions below this confidence count as change (keep watching)
+MAX_CAPTURES_PER_MINUTE = 30    # Global rate budget (politeness towards the camera site)
+CPU_BUDGET = 0.5                # Cores' worth of CPU time for capture + inference
+CAPTURE_WORKERS = 4
+CAMERA_REFRESH_SECONDS = 3600   # Re-fetch the camera list this often
+ERROR_BACKOFF = 30              # Seconds to wait after a failed tick, doubled per failure in a row...
+MAX_ERROR_BACKOFF = 15 * 60     # ...up to this
+CLASSIFY = True                 # Run the road-condition model on captures (needs a trained model)
+STATE_PATH = "capture_schedule.json"
+
+
+class AdaptiveScheduler:
+    """Per-camera intervals plus token buckets for the rate and CPU budgets."""
+
+    def __init__(self, min_interval=MIN_INTERVAL, base_interval=BASE_INTERVAL, decay=DECAY,
+                 max_per_minute=MAX_CAPTURES_PER_MINUTE, cpu_budget=CPU_BUDGET):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.decay = decay
+        self.max_per_minute = max_per_minute
+        self.cpu_budget = cpu_budget
+        self.cameras = {}                 # code -> {"interval", "next_due", "label", "confidence", "signature", ...}
+        self.cpu_per_capture = 0.5        # Running estimate (seconds of CPU), corrected by observe()
+        self.rate_tokens = float(max_per_minute)
+        self.cpu_tokens = cpu_budget * 60
+        self.refilled = time.time()
+
+    def add_cameras(self, codes, now=None):
+        """New cameras start due now with the fast interval (nothing is known about them yet)."""
+        now = time.time() if now is None else now
+        for code in codes:
+            self.cameras.setdefault(code, {"interval": self.min_interval, "next_due": now, "label": None,
+                                           "confidence": None, "signature": None, "labeled_at": None,
+                                           "changes": 0, "captures": 0})
+
+    def set_cameras(self, codes, now=None):
+        """Adds new cameras and forgets the ones no longer listed (they would stay due forever)."""
+        codes = set(codes)
+        for code in [code for code in self.cameras if code not in codes]:
+            del self.cameras[code]
+        self.add_cameras(codes, now)
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self.refilled)
+        self.refilled = now
+        self.rate_tokens = min(self.max_per_minute, self.rate_tokens + elapsed * self.max_per_minute / 60)
+        self.cpu_tokens = min(self.cpu_budget * 60, self.cpu_tokens + elapsed * self.cpu_budget)
+
+    def due(self, now=None, live=None):
+        """
+        Codes to capture now, as many as the budgets allow. Most overdue relative to their own
+        interval first, so a changing camera that is a minute late beats a stable one that is a minute late.
+        'live' limits the choice to those codes before any budget is spent on the others.
+        """
+        now = time.time() if now is None else now
+        self._refill(now)
+        ready = [(code, (now - c["next_due"]) / c["interval"]) for code, c in self.cameras.items()
+                 if c["next_due"] <= now and (live is None or code in live)]
+        ready.sort(key=lambda item: -item[1])
+        allowed = int(min(self.rate_tokens, self.cpu_tokens / max(self.cpu_per_capture, 1e-3)))
+        chosen = [code for code, _ in ready[:max(0, allowed)]]
+        self.rate_tokens -= len(chosen)
+        self.cpu_tokens -= len(chosen) * self.cpu_per_capture
+        return chosen
+
+    def next_wakeup(self, now=None):
+        """Seconds until a camera is due and the budgets have room for it."""
+        now = time.time() if now is None else now
+        if not self.cameras:
+            return self.base_interval
+        wait = max(0.0, min(c["next_due"] for c in self.cameras.values()) - now)
+        rate_wait = max(0.0, 1 - self.rate_tokens) * 60 / self.max_per_minute
+        cpu_wait = max(0.0, self.cpu_per_capture - self.cpu_tokens) / self.cpu_budget
+        return max(wait, rate_wait, cpu_wait, 1.0)
+
+    def frame_change(self, code, frame, bgr=True):
+        """(1 - correlation with the camera's previous frame, new signature); 1.0 for a first frame."""
+        sig = signature(small_grey(frame, bgr))
+        previous = self.cameras.get(code, {}).get("signature")
+        if previous is None or len(previous) != len(sig):
+            return 1.0, sig
+        return float(max(0.0, 1.0 - sig @ np.asarray(previous))), sig
+
+    def observe(self, code, change=None, sig=None, label=None, confidence=None, cpu_seconds=None, now=None):
+        """
+        Records one capture attempt and sets the camera's next interval. change=None means the
+        capture failed (offline / rejected): back off like a stable camera.
+        """
+        now = time.time() if now is None else now
+        self.add_cameras([code], now)
+        cam = self.cameras[code]
+        cam["captures"] += 1
+
+        changed = False
+        if change is not None:
+            changed = change > SCENE_CHANGE
+            if sig is not None:
+                cam["signature"] = [round(float(v), 4) for v in sig]
+        if label is not None:
+            changed = changed or (cam["label"] is not None and label != cam["label"])
+            changed = changed or (confidence is not None and confidence < UNSURE_CONFIDENCE)
+            cam["label"], cam["confidence"], cam["labeled_at"] = label, confidence, now
+
+        if changed:
+            cam["changes"] += 1
+            cam["interval"] = self.min_interval
+        else:
+            cam["interval"] = min(self.base_interval, cam["interval"] * self.decay)
+        cam["next_due"] = now + cam["interval"]
+
+        if cpu_seconds is not None:
+            # Refund / charge the difference to the estimate that due() reserved
+            self.cpu_tokens += self.cpu_per_capture - cpu_seconds
+            self.cpu_per_capture = 0.8 * self.cpu_per_capture + 0.2 * cpu_seconds
+        return changed
+
+    def needs_inference(self, code, change, now=None):
+        """Classify again unless the picture is practically unchanged and the label is recent."""
+        now = time.time() if now is None else now
+        cam = self.cameras.get(code, {})
+        if cam.get("label") is None or cam.get("labeled_at") is None:
+            return True
+        return change > INFER_MIN_CHANGE or now - cam["labeled_at"] >= self.base_interval
+
+    def summary(self):
+        intervals = [c["interval"] for c in self.cameras.values()]
+        fast = sum(1 for i in intervals if i <= self.min_interval)
+        return (f"{len(intervals)} cameras, {fast} at the fast interval, median interval "
+                f"{np.median(intervals) if intervals else 0:.0f}s, {self.cpu_per_capture:.2f} CPU s/capture")
+
+    def save(self, path=STATE_PATH):
+        tmp = path + ".tmp"  # Written aside and swapped in, so a crash never leaves half a file
+        with open(tmp, "w") as f:
+            json.dump({"cameras": self.cameras, "cpu_per_capture": self.cpu_per_capture}, f)
+        os.replace(tmp, path)
+
+    def load(self, path=STATE_PATH):
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except ValueError as e:
+                print(f"Ignoring unreadable schedule {path} ({e}); starting fresh.")
+                return self
+            self.cameras = state.get("cameras", {})
+            self.cpu_per_capture = state.get("cpu_per_capture", self.cpu_per_capture)
+        return self
+
+
+def classify(model, frames):
+    """[(label, confidence)] for a list of BGR frames, in one batch."""
+    from preprocess import BatchDecoder, model_input
+
+    with BatchDecoder(batch_size=len(frames)) as decoder:
+        images, _ = decoder.decode(frames, bgr=True)
+        logits = np.asarray(model.predict_on_batch(model_input(images)), dtype=np.float64)
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs /= probs.sum(axis=1, keepdims=True)
+    return [(CLASS_NAMES[i], float(p[i])) for i, p in zip(np.argmax(probs, axis=1), probs)]
+
+
+def run(once=False, state_path=STATE_PATH, classify_frames=CLASSIFY):
+    """Capture loop over the camera API (captrue_feed_api.py does the capturing and saving)."""
+    from concurrent.futures import ThreadPoolExecutor
+    from captrue_feed_api import fetch_cameras, capture_camera
+    from frame_quality import QualityStats
+    from image_catalog import parse_capture_name
+    from status_store import post_status
+
+    scheduler = AdaptiveScheduler().load(state_path)
+    model = None
+    if classify_frames:
+        from predict import load_model
+        try:
+            model = load_model()
+        except Exception as e:
+            print(f"No model ({e}); scheduling on frame changes only.")
+
+    def _capture(code, quality):
+        # One camera's timeout / bad response must not take the others (or the loop) down
+        try:
+            return capture_camera(cameras[code], quality)
+        except Exception as e:
+            print(f"   {code}: ❌ Capture error ({e}).")
+            return None
+
+    cameras, fetched, failures = {}, 0.0, 0
+    pool = ThreadPoolExecutor(max_workers=CAPTURE_WORKERS)
+    try:
+        while True:
+            try:
+                # 1. Keep the camera list fresh (on failure the old list is kept and retried next tick)
+                if time.time() - fetched > CAMERA_REFRESH_SECONDS:
+                    cameras = {c.get('StreamCode'): c for c in fetch_cameras() if c.get('StreamCode')}
+                    scheduler.set_cameras(cameras)
+                    fetched = time.time()
+                    print(f"{len(cameras)} cameras. {scheduler.summary()}")
+
+                # 2. Capture whatever is due, within the budgets
+                codes = scheduler.due(live=cameras)
+                if codes:
+                    quality = QualityStats()
+                    cpu_start = time.process_time()
+                    saved = dict(zip(codes, pool.map(lambda code: _capture(code, quality), codes)))
+                    saved = {code: item for code, item in saved.items() if item is not None}  # code -> (frame, filename, burst)
+
+                    # 3. Frame differences decide which captures need the model
+                    changes = {code: scheduler.frame_change(code, frame) for code, (frame, _, _) in saved.items()}
+                    infer = [code for code in saved if model is not None and scheduler.needs_inference(code, changes[code][0])]
+                    labels = {}
+                    if infer:
+                        try:
+                            labels = dict(zip(infer, classify(model, [saved[code][0] for code in infer])))
+                        except Exception as e:
+                            print(f"Classification failed ({e}); scheduling this batch on frame changes only.")
+                    for code, (label, confidence) in labels.items():
+                        if STATUS_URL:
+                            _, captured_at = parse_capture_name(saved[code][1])
+                            post_status(STATUS_URL, code, label, confidence, captured_at)
+
+                    # 4. New intervals (failed captures back off like stable cameras); the measured
+                    #    CPU cost feeds the budget. State is saved after every camera.
+                    cpu_each = (time.process_time() - cpu_start) / len(codes)
+                    changed = 0
+                    for code in codes:
+                        change, sig = changes.get(code, (None, None))
+                        label, confidence = labels.get(code, (None, None))
+                        changed += scheduler.observe(code, change, sig, label, confidence, cpu_each)
+                        scheduler.save(state_path)
+                    quality.save()
+                    print(f"[{time.strftime('%H:%M:%S')}] {len(saved)}/{len(codes)} captured, {len(labels)} classified, "
+                          f"{changed} changing. {scheduler.summary()}")
+                failures = 0
+                wait = scheduler.next_wakeup() if cameras else ERROR_BACKOFF
+            except Exception as e:
+                failures += 1
+                wait = min(MAX_ERROR_BACKOFF, ERROR_BACKOFF * 2 ** (failures - 1))
+                print(f"[{time.strftime('%H:%M:%S')}] Tick failed ({type(e).__name__}: {e}); retrying in {wait:.0f}s.")
+
+            if once:
+                break
+            time.sleep(wait)
+    except KeyboardInterrupt:
+        print("\nStopping scheduler...")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        scheduler.save(state_path)
+
+
+if __name__ == "__main__":
+    import sys
+    run(once="--once" in sys.argv[1:])
@@ -0,0 +1,158 @@
+import json
+import os
+import time
+import numpy as np
+from config import MODEL_PATH, TINY_MODEL_PATH, CASCADE_PATH
+
+# Two-stage inference: the tiny model (train_model.py with MODEL_SIZE = "tiny") looks at every
+# frame; only frames where its top-2 margin is below the calibrated threshold go to the full model.
+#
+#   python cascade.py   -> calibrates the threshold on the validation split, reports the
+#                          escalation rate and accuracy vs full-model-only, writes cascade.json
+
+# --- CONFIGURATION ---
+MAX_ACCURACY_DROP = 0.005   # Allowed accuracy loss vs the full model alone (0.005 = half a point)
+
+
+def softmax(logits):
+    z = np.asarray(logits, dtype=np.float64)
+    z = np.exp(z - z.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+
+def top_margin(logits):
+    """Probability of the top class minus the runner-up, per row."""
+    top2 = np.sort(softmax(logits), axis=1)[:, -2:]
+    return top2[:, 1] - top2[:, 0]
+
+
+class CascadeClassifier:
+    """
+    Drop-in for a Keras model's predict() / predict_on_batch(): returns logits, taken from the
+    full model for escalated rows and from the tiny model for the rest.
+    """
+
+    def __init__(self, tiny_path=TINY_MODEL_PATH, full_path=MODEL_PATH, threshold=None, cascade_path=CASCADE_PATH):
+        import tensorflow as tf
+
+        if threshold is None:
+            with open(cascade_path) as f:
+                threshold = json.load(f)["threshold"]
+        self.threshold = threshold
+        self.tiny = tf.keras.models.load_model(tiny_path)
+        self.full = tf.keras.models.load_model(full_path)
+        self.seen = 0
+        self.escalated = 0
+
+    def predict_on_batch(self, images):
+        logits = np.array(self.tiny.predict_on_batch(images))
+        unsure = np.flatnonzero(top_margin(logits) < self.threshold)
+        if unsure.size:
+            logits[unsure] = np.asarray(self.full.predict_on_batch(np.asarray(images)[unsure]))
+        self.seen += len(logits)
+        self.escalated += unsure.size
+        return logits
+
+    def predict(self, images, verbose=0):
+        return self.predict_on_batch(images)
+
+    def escalation_rate(self):
+        return self.escalated / max(1, self.seen)
+
+
+def collect(tiny, full, ds):
+    """Runs both models over a batched (images, labels) dataset. Returns labels, tiny/full predictions, margins and timings."""
+    labels, tiny_pred, full_pred, margins = [], [], [], []
+    tiny_seconds = full_seconds = 0.0
+    for images, batch_labels in ds:
+        start = time.perf_counter()
+        tiny_logits = np.asarray(tiny.predict_on_batch(images))
+        tiny_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        full_logits = np.asarray(full.predict_on_batch(images))
+        full_seconds += time.perf_counter() - start
+
+        labels.append(np.asarray(batch_labels))
+        tiny_pred.append(np.argmax(tiny_logits, axis=1))
+        full_pred.append(np.argmax(full_logits, axis=1))
+        margins.append(top_margin(tiny_logits))
+    n = max(1, sum(len(l) for l in labels))
+    return {"labels": np.concatenate(labels), "tiny": np.concatenate(tiny_pred),
+            "full": np.concatenate(full_pred), "margin": np.concatenate(margins),
+            "tiny_ms": 1000 * tiny_seconds / n, "full_ms": 1000 * full_seconds / n}
+
+
+def cascade_accuracy(data, threshold, index=None):
+    """(accuracy, escalated fraction) of the cascade at 'threshold' on the rows in 'index'."""
+    index = np.arange(len(data["labels"])) if index is None else index
+    escalate = data["margin"][index] < threshold
+    pred = np.where(escalate, data["full"][index], data["tiny"][index])
+    return float((pred == data["labels"][index]).mean()), float(escalate.mean())
+
+
+def calibrate(data, index, max_drop=MAX_ACCURACY_DROP):
+    """
+    Smallest threshold (= fewest escalations) whose cascade accuracy on 'index' stays within
+    max_drop of the full model alone. Sweeps every observed margin in one sorted pass.
+    """
+    labels, margin = data["labels"][index], data["margin"][index]
+    tiny_ok = data["tiny"][index] == labels
+    full_ok = data["full"][index] == labels
+    target = full_ok.mean() - max_drop
+
+    # Threshold just above the k-th smallest margin escalates exactly those k rows
+    order = np.argsort(margin, kind="stable")
+    gain = (full_ok[order].astype(np.int64) - tiny_ok[order].astype(np.int64)).cumsum()
+    correct = np.concatenate([[tiny_ok.sum()], tiny_ok.sum() + gain]) / max(1, len(labels))
+    candidates = np.concatenate([[0.0], np.nextafter(margin[order], 2.0)])
+    ok = np.flatnonzero(correct >= target)
+    return float(candidates[ok[0]]) if ok.size else 1.01  # 1.01 = always escalate
+
+
+def run(tiny_path=TINY_MODEL_PATH, full_path=MODEL_PATH, cascade_path=CASCADE_PATH):
+    import tensorflow as tf
+    from evaluate_model import load_validation
+
+    for path in (tiny_path, full_path):
+        if not os.path.exists(path):
+            print(f"Error: '{path}' not found. Train it first (MODEL_SIZE in train_model.py).")
+            return None
+
+    print("Loading Data...")
+    val_ds, class_names = load_validation()
+    tiny = tf.keras.models.load_model(tiny_path)
+    full = tf.keras.models.load_model(full_path)
+    print("Running both models over the validation split...")
+    data = collect(tiny, full, val_ds.prefetch(tf.data.AUTOTUNE))
+
+    # Calibrate on half of the images and report on the other half, so the numbers aren't flattered
+    everything = np.arange(len(data["labels"]))
+    calib, held_out = everything[0::2], everything[1::2]
+    threshold = calibrate(data, calib)
+
+    full_acc = float((data["full"][held_out] == data["labels"][held_out]).mean())
+    tiny_acc = float((data["tiny"][held_out] == data["labels"][held_out]).mean())
+    cascade_acc, escalated = cascade_accuracy(data, threshold, held_out)
+    cost_ms = data["tiny_ms"] + escalated * data["full_ms"]
+
+    print("------------------------------------------------")
+    print(f"Threshold (tiny-model margin): {threshold:.3f}")
+    print(f"Escalated to the full model:   {escalated:.1%}")
+    print(f"Accuracy  full only: {full_acc:.2%}   tiny only: {tiny_acc:.2%}   cascade: {cascade_acc:.2%}")
+    print(f"Time/frame full only: {data['full_ms']:.2f} ms   cascade: {cost_ms:.2f} ms "
+          f"({data['full_ms'] / max(cost_ms, 1e-9):.1f}x faster)")
+    print("------------------------------------------------")
+
+    result = {"threshold": threshold, "escalated": escalated, "full_accuracy": full_acc,
+              "tiny_accuracy": tiny_acc, "cascade_accuracy": cascade_acc,
+              "full_ms_per_frame": data["full_ms"], "cascade_ms_per_frame": cost_ms,
+              "max_accuracy_drop": MAX_ACCURACY_DROP, "images": int(len(held_out)),
+              "tiny_model": tiny_path, "full_model": full_path}
+    with open(cascade_path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved to {cascade_path}")
+    return result
+
+
+if __name__ == "__main__":
+    run()
@@ -1,12 +1,28 @@
+import json
 import os
+import shutil
+from image_catalog import ImageCatalog
+from near_duplicates import hash_files, find_clusters, is_uniform, MAX_DISTANCE
+from file_journal import TRASH_FOLDER
+from config import DATASET_PATH
 
 # --- CONFIGURATION ---
-DATASET_PATH = "labeled_dataset"
 
 # What text identifies a "fake" augmented file?
-# Change this to match your files! (e.g., "aug_", "flip", "rotated")
+# manual_sorter.py no longer creates these (augmentation now happens during training),
+# so this only purges copies left over from older labeling sessions.
 KEYWORDS_TO_DELETE = [ "light1", "flip", "rot1", "rot2"] 
 
+# Near-duplicates: consecutive frames from the same camera that look (almost) identical.
+# Only frames of the same camera are compared, and dark / featureless frames are skipped
+# (their hashes all look alike). One representative per cluster is kept (the earliest capture),
+# the rest are MOVED to DUPLICATES_TRASH (same label folders), so they can be put back.
+# Clusters whose members have DIFFERENT labels are only reported, never touched.
+REMOVE_NEAR_DUPLICATES = True
+DUPLICATE_DISTANCE = MAX_DISTANCE      # Max differing bits (of 64) in the perceptual hash
+DUPLICATES_REPORT = "duplicates_report.json"
+DUPLICATES_TRASH = os.path.join(TRASH_FOLDER, "duplicates")
+
 # Set to False to ACTUALLY delete files
 DRY_RUN = False  
 
@@ -14,21 +30,32 @@ def clean_data():
     print(f"Scanning {DATASET_PATH}...")
     deleted_count = 0
     kept_count = 0
+    deleted = set()
+
+    catalog = ImageCatalog()
+    catalog.scan(DATASET_PATH, labeled=True)
+
+    for row in catalog.query(root=DATASET_PATH):
+        filename = row["filename"]
+        file_path = row["path"]
 
-    for root, dirs, files in os.walk(DATASET_PATH):
-        for filename in files:
-            file_path = os.path.join(root, filename)
-            
-            # Check if filename contains any of the bad keywords
-            if any(keyword in filename for keyword in KEYWORDS_TO_DELETE):
-                if DRY_RUN:
-                    print(f"[Would Delete]: {filename}")
-                else:
-                    os.remove(file_path)
-                    print(f"[Deleted]: {filename}")
-                deleted_count += 1
+        # Check if filename contains any of the bad keywords
+        if any(keyword in filename for keyword in KEYWORDS_TO_DELETE):
+            if DRY_RUN:
+                print(f"[Would Delete]: {filename}")
             else:
-                kept_count += 1
+                os.remove(file_path)
+                catalog.record_delete(file_path)
+                print(f"[Deleted]: {filename}")
+            deleted.add(file_path)
+            deleted_count += 1
+        else:
+            kept_count += 1
+
+    if REMOVE_NEAR_DUPLICATES:
+        removed = remove_near_duplicates(catalog, skip=deleted)
+        deleted_count += removed
+        kept_count -= removed
 
     print("-" * 30)
     if DRY_RUN:
@@ -39,5 +66,72 @@ def clean_data():
         print(f"DONE! Deleted {deleted_count} files.")
         print(f"Remaining clean files: {kept_count}")
 
+def remove_near_duplicates(catalog, skip=()):
+    """
+    Finds clusters of near-identical images per camera with a BK-tree and keeps one per cluster.
+    'skip' = paths already removed by the keyword pass (still on disk in a dry run).
+    """
+    print(f"Looking for near-duplicates (distance <= {DUPLICATE_DISTANCE})...")
+    rows = [r for r in catalog.query(root=DATASET_PATH, order_by="captured_at")
+            if r["path"] not in skip and os.path.exists(r["path"])]
+    labels = {r["path"]: r["label"] for r in rows}
+    order = [r["path"] for r in rows]
+
+    # Hashes are cached in the catalog; only new or changed files are hashed (in parallel)
+    hashes = catalog.cached_hashes(DATASET_PATH)
+    missing = [p for p in order if p not in hashes]
+    if missing:
+        print(f"   Hashing {len(missing)} new images...")
+        new_hashes = hash_files(missing)
+        catalog.record_hashes(new_hashes)
+        hashes.update(new_hashes)
+
+    # One BK-tree per camera: frames of different cameras are never "the same picture".
+    # Files whose name has no camera + timestamp (stream_code is then the whole name) end up alone.
+    cameras = {}
+    uniform = 0
+    for r in rows:
+        h = hashes.get(r["path"])
+        if h is None:
+            continue
+        if is_uniform(h):
+            uniform += 1
+            continue
+        cameras.setdefault(r["stream_code"], []).append(r["path"])
+    clusters = []
+    for paths in cameras.values():
+        clusters.extend(find_clusters(hashes, paths, DUPLICATE_DISTANCE))
+    if uniform:
+        print(f"   Skipped {uniform} dark / featureless images (their hashes can't tell them apart).")
+
+    report = {"distance": DUPLICATE_DISTANCE, "dry_run": DRY_RUN, "trash": DUPLICATES_TRASH,
+              "clusters": [], "label_conflicts": []}
+    removed = 0
+    for keep, duplicates in clusters:
+        cluster_labels = {labels[keep]} | {labels[d] for d in duplicates}
+        entry = {"keep": keep, "duplicates": duplicates, "labels": sorted(l or "" for l in cluster_labels)}
+        if len(cluster_labels) > 1:
+            # Same picture, different labels: a human needs to look at it
+            report["label_conflicts"].append(entry)
+            continue
+        report["clusters"].append(entry)
+        for path in duplicates:
+            if DRY_RUN:
+                print(f"[Would Remove Duplicate]: {os.path.basename(path)} (same as {os.path.basename(keep)})")
+            else:
+                # Into the trash with its label folder, so it can be moved back by hand
+                target = os.path.join(DUPLICATES_TRASH, os.path.relpath(path, DATASET_PATH))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+                catalog.record_delete(path)
+                print(f"[Moved Duplicate to {DUPLICATES_TRASH}]: {os.path.basename(path)}")
+            removed += 1
+
+    with open(DUPLICATES_REPORT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"   {len(report['clusters'])} duplicate clusters, {removed} extra copies, "
+          f"{len(report['label_conflicts'])} clusters with conflicting labels (see {DUPLICATES_REPORT}).")
+    return removed
+
 if __name__ == "__main__":
     clean_data()
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+One entry point for every tool:
+
+    python cli.py capture [--selenium]      grab camera frames
+    python cli.py capture --adaptive [--once]  per-camera intervals driven by changes
+    python cli.py sort                      label new screenshots (Tk)
+    python cli.py review [--grid]           fix labels in labeled_dataset (Tk)
+    python cli.py clean                     remove augmented copies and near-duplicates
+    python cli.py scan                      quarantine corrupt images
+    python cli.py split                     update split_manifest.csv
+    python cli.py retention [--dry-run]     downsample / thin / archive old raw captures
+    python cli.py prelabel [FOLDER]         store model guesses for the sorter / grid
+    python cli.py train
+    python cli.py distill                   train the compact student from road_model.keras
+    python cli.py eval [--unseen] [MODEL ...]
+    python cli.py predict [IMAGE ...]
+    python cli.py status                    serve the live road status API
+    python cli.py replay {record,serve}     record the camera site / replay it offline
+
+Each command imports its tool only when it runs, so the light commands (sort, review,
+clean, scan, split) never pay for importing TensorFlow, matplotlib, OpenCV or Selenium.
+Shared settings live in config.py.
+"""
+import argparse
+import sys
+
+
+def cmd_capture(args):
+    if args.selenium:
+        from traffic_cam_capture import main
+        main()
+    elif args.adaptive:
+        from capture_scheduler import run
+        run(once=args.once)
+    else:
+        from captrue_feed_api import scrape_traffic_cameras
+        scrape_traffic_cameras()
+
+
+def cmd_sort(args):
+    from manual_sorter import main
+    main()
+
+
+def cmd_review(args):
+    from dataset_reviewer import main, GRID_MODE
+    main(GRID_MODE or args.grid)
+
+
+def cmd_clean(args):
+    from clean_dataset import clean_data
+    clean_data()
+
+
+def cmd_scan(args):
+    from integrity_scan import scan
+    scan()
+
+
+def cmd_split(args):
+    from split_dataset import update_manifest
+    update_manifest()
+
+
+def cmd_retention(args):
+    from retention import apply_retention, DRY_RUN
+    apply_retention(dry_run=DRY_RUN or args.dry_run)
+
+
+def cmd_prelabel(args):
+    import os
+    from config import SOURCE_FOLDER, DATASET_PATH
+    from prelabel import prelabel
+    folder = args.folder or SOURCE_FOLDER
+    prelabel(folder, labeled=(os.path.normpath(folder) == os.path.normpath(DATASET_PATH)))
+
+
+def cmd_train(args):
+    from train_model import train
+    train()
+
+
+def cmd_distill(args):
+    from distill import distill
+    distill()
+
+
+def cmd_eval(args):
+    if args.unseen:
+        from test_on_unseen import test_model
+        test_model(args.models)
+    else:
+        from evaluate_model import evaluate
+        evaluate(args.models)
+
+
+def cmd_predict(args):
+    from predict import main
+    main(args.images)
+
+
+def cmd_status(args):
+    from status_store import serve, STATUS_HOST, STATUS_PORT
+    serve(args.host or STATUS_HOST, args.port or STATUS_PORT)
+
+
+def cmd_replay(args):
+    import camera_replay
+    if args.action == "record":
+        camera_replay.record(max_cameras=args.max_cameras or camera_replay.RECORD_MAX_CAMERAS)
+    else:
+        camera_replay.serve()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Road condition camera tools.")
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND")
+    sub.required = True
+
+    p = sub.add_parser("capture", help="Grab one frame from every camera")
+    p.add_argument("--selenium", action="store_true", help="Use the browser screenshot loop instead of the API")
+    p.add_argument("--adaptive", action="store_true", help="Keep capturing, each camera at its own adaptive interval")
+    p.add_argument("--once", action="store_true", help="With --adaptive: one pass over the due cameras (for cron)")
+    p.set_defaults(func=cmd_capture)
+
+    sub.add_parser("sort", help="Label new screenshots").set_defaults(func=cmd_sort)
+
+    p = sub.add_parser("review", help="Review labeled images")
+    p.add_argument("--grid", action="store_true", help="Batch-label a grid of thumbnails")
+    p.set_defaults(func=cmd_review)
+
+    sub.add_parser("clean", help="Remove augmented copies and near-duplicates").set_defaults(func=cmd_clean)
+    sub.add_parser("scan", help="Find and quarantine unreadable images").set_defaults(func=cmd_scan)
+    sub.add_parser("split", help="Update the train/validation/test manifest").set_defaults(func=cmd_split)
+
+    p = sub.add_parser("retention", help="Compact old frames in the raw capture folders")
+    p.add_argument("--dry-run", action="store_true", help="Only report what would be done")
+    p.set_defaults(func=cmd_retention)
+
+    p = sub.add_parser("prelabel", help="Store model predictions in the catalog")
+    p.add_argument("folder", nargs="?", help="Folder to pre-label (default: the screenshots folder)")
+    p.set_defaults(func=cmd_prelabel)
+
+    sub.add_parser("train", help="Train the road condition model").set_defaults(func=cmd_train)
+    sub.add_parser("distill", help="Distill the trained model into a compact student").set_defaults(func=cmd_distill)
+
+    p = sub.add_parser("eval", help="Score models on the validation split")
+    p.add_argument("--unseen", action="store_true", help="Use the unseen test set instead")
+    p.add_argument("models", nargs="*", help="Model files (default: MODEL_PATHS in the eval script)")
+    p.set_defaults(func=cmd_eval)
+
+    p = sub.add_parser("predict", help="Classify single images")
+    p.add_argument("images", nargs="*", help="Image files (default: a sample screenshot)")
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser("status", help="Serve the latest road condition per camera over HTTP")
+    p.add_argument("--host")
+    p.add_argument("--port", type=int)
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("replay", help="Record the camera API + streams, or replay them locally")
+    p.add_argument("action", choices=["record", "serve"])
+    p.add_argument("--max-cameras", type=int, help="Only record this many cameras")
+    p.set_defaults(func=cmd_replay)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,34 @@
+# --- SHARED CONFIGURATION ---
+# Settings used by more than one tool live here (tool-specific ones stay at the top of each script).
+# Keep this file free of heavy imports: every command, even the Tk tools, imports it.
+
+# Folders
+SOURCE_FOLDER = "traffic_screenshots"   # Selenium captures waiting to be sorted
+CAPTURE_FOLDER = "traffic_dataset"      # API scraper (captrue_feed_api.py) output
+DATASET_PATH = "labeled_dataset"        # One sub-folder per class
+DATASET_URI = None                      # e.g. "gs://YOUR_BUCKET_NAME": train from the bucket instead (object_store.py)
+TEST_PATH = "test_dataset"              # Optional hand-picked unseen images
+CAMERAS_FILE = "cameras.json"           # Last GetCameras camera list (StreamCode, PrimaryRoad, ...)
+
+# Classes, exactly as they appear in the labeled_dataset folders (alphabetical, like Keras sorts them)
+CLASS_NAMES = ['clear_road', 'fully_covered', 'partially_covered']
+
+# Model
+MODEL_PATH = "road_model.keras"
+TINY_MODEL_PATH = "road_model_tiny.keras"  # First stage of the cascade (train_model.py with MODEL_SIZE = "tiny")
+STUDENT_MODEL_PATH = "road_model_student.keras"  # Compact CPU model distilled from the full one (distill.py)
+CASCADE_PATH = "cascade.json"              # Calibrated escalation threshold (cascade.py)
+USE_CASCADE = False                        # predict.py: tiny model first, full model only when unsure
+IMG_HEIGHT = 180
+IMG_WIDTH = 180
+BATCH_SIZE = 32
+SEED = 123
+
+# Camera source. To benchmark capture offline, record once and replay (camera_replay.py), then use:
+#   CAMERA_API_URL = "http://127.0.0.1:8766/Default.aspx/GetCameras"
+#   HLS_URL_TEMPLATE = "http://127.0.0.1:8766/{mms_url}/{forge}/public/hls/{stream_code}.m3u8"
+CAMERA_API_URL = "https://edmontontrafficcam.com/Default.aspx/GetCameras"
+HLS_URL_TEMPLATE = "https://{mms_url}/{forge}/public/hls/{stream_code}.m3u8"
+
+# Live status API (status_store.py). None = predictions are only printed
+STATUS_URL = None  # e.g. "http://127.0.0.1:8765"
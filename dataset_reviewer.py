@@ -1,16 +1,39 @@
 import os
-import shutil
 import tkinter as tk
 from PIL import Image, ImageTk
+from image_catalog import ImageCatalog
+from image_prefetch import PrefetchLoader
+from thumbnail_cache import ThumbnailCache
+from file_journal import FileJournal, POLL_MS
+from integrity_scan import quarantine_path
+from config import DATASET_PATH
 
 # --- CONFIGURATION ---
-DATASET_FOLDER = "labeled_dataset"
+DATASET_FOLDER = DATASET_PATH
 FOLDERS = {
-    '1': "labeled_dataset/fully_covered",
-    '2': "labeled_dataset/partially_covered",
-    '3': "labeled_dataset/clear_road"
+    '1': os.path.join(DATASET_PATH, "fully_covered"),
+    '2': os.path.join(DATASET_PATH, "partially_covered"),
+    '3': os.path.join(DATASET_PATH, "clear_road")
 }
 
+# Optional filters (answered by the catalog, no directory walk)
+ONLY_UNREVIEWED = False   # Skip images you already pressed SPACE on in an earlier session
+CAMERA_FILTER = None      # e.g. "CAM123" to review one StreamCode only
+SINCE = None              # e.g. "2024-01-01" (capture time, ISO format)
+UNTIL = None
+
+# --- GRID MODE (python dataset_reviewer.py --grid) ---
+# Shows a page of thumbnails; every tile starts selected, click the odd ones out,
+# then one key labels (or deletes) the whole selection.
+GRID_MODE = False
+GRID_COLUMNS = 6
+GRID_ROWS = 4
+TILE_SIZE = (200, 150)
+GRID_SORT = "camera"      # "camera" = by StreamCode then capture time, "predicted" = by AI guess (run prelabel.py labeled_dataset)
+GRID_SORTS = {"camera": "stream_code, captured_at", "predicted": "predicted"}
+SELECTED_COLOR = "#1e90ff"
+UNSELECTED_COLOR = "#d0d0d0"
+
 class DatasetReviewer:
     def __init__(self, master):
         self.master = master
@@ -23,17 +46,33 @@ class DatasetReviewer:
             print("Error: labeled_dataset folder not found!")
             return
 
-        for category in os.listdir(DATASET_FOLDER):
-            cat_path = os.path.join(DATASET_FOLDER, category)
-            if os.path.isdir(cat_path):
-                files = [f for f in os.listdir(cat_path) if f.endswith(('.png', '.jpg', '.jpeg'))]
-                for f in files:
-                    self.all_files.append((cat_path, f, category))
+        self.catalog = ImageCatalog()
+        self.catalog.scan(DATASET_FOLDER, labeled=True)
+        rows = self.catalog.query(root=DATASET_FOLDER, stream_code=CAMERA_FILTER, since=SINCE, until=UNTIL,
+                                  unreviewed=ONLY_UNREVIEWED, order_by="label, path")
+        for row in rows:
+            if row["label"] is not None:
+                self.all_files.append((row["folder"], row["filename"], row["label"]))
 
         self.current_index = 0
+
+        # File moves/deletes run in the background through an undoable journal.
+        # Resume at the image the last session was showing.
+        # The catalog is only updated once a move has really happened (see poll_journal).
+        self.journal = FileJournal("reviewer")
+        paths = [os.path.join(folder, f) for folder, f, _ in self.all_files]
+        last = self.journal.last_position()
+        if last in paths:
+            self.current_index = paths.index(last)
+        self.master.after(POLL_MS, self.poll_journal)
+
+        # Decodes the next few images on worker threads while you look at this one.
+        # Thumbnails are kept on disk, so the next session reads small pre-scaled files.
+        self.thumbs = ThumbnailCache()
+        self.loader = PrefetchLoader(paths, decode=self.thumbs.load)
         
         # 2. UI Setup
-        self.lbl_info = tk.Label(master, text="SPACE: Keep | X: Delete | 1/2/3: Move to Category", font=("Arial", 12, "bold"))
+        self.lbl_info = tk.Label(master, text="SPACE: Keep | X: Delete | 1/2/3: Move to Category | Z: Undo", font=("Arial", 12, "bold"))
         self.lbl_info.pack(pady=10)
 
         self.lbl_category = tk.Label(master, text="", font=("Arial", 14, "bold"), fg="blue")
@@ -51,9 +90,22 @@ class DatasetReviewer:
         master.bind('1', lambda e: self.move_image('1'))    # Move to Fully
         master.bind('2', lambda e: self.move_image('2'))    # Move to Partial
         master.bind('3', lambda e: self.move_image('3'))    # Move to Clear
+        master.bind('z', lambda e: self.undo())             # Undo last delete/move
+        master.bind('<Control-z>', lambda e: self.undo())
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.load_image()
 
+    def poll_journal(self):
+        """Applies finished background moves to the catalog (on the Tk thread, which owns it)."""
+        self.journal.poll()
+        self.master.after(POLL_MS, self.poll_journal)
+
+    def on_close(self):
+        print("Finishing queued file operations...")
+        self.journal.close()
+        self.master.destroy()
+
     def load_image(self):
         if self.current_index >= len(self.all_files):
             self.lbl_status.config(text="Review Complete! No more images.")
@@ -63,43 +115,51 @@ class DatasetReviewer:
 
         current_path, filename, category = self.all_files[self.current_index]
         full_path = os.path.join(current_path, filename)
+        self.journal.save_position(full_path)
 
         # Update labels
         self.lbl_category.config(text=f"Current Label: {category}")
         self.lbl_status.config(text=f"Image {self.current_index + 1} / {len(self.all_files)}")
 
         try:
-            # Display Image
-            img = Image.open(full_path)
-            img.thumbnail((800, 600))
+            # Display Image (already decoded in the background)
+            img = self.loader.get(self.current_index)
             self.photo = ImageTk.PhotoImage(img)
             self.canvas.config(image=self.photo)
         except Exception as e:
             print(f"Error loading {filename}: {e}")
+            # Move it aside so it can't break training (undoable with Z)
+            self.journal.move(full_path, quarantine_path(full_path), index=self.current_index,
+                              on_done=lambda: self.catalog.record_delete(full_path))
+            self.loader.discard(full_path)
+            print(f"Quarantined unreadable file: {filename}")
             self.current_index += 1
             self.load_image()
 
     def next_image(self):
         """Keep the image and go to next."""
+        if self.current_index < len(self.all_files):
+            current_path, filename, _ = self.all_files[self.current_index]
+            self.catalog.mark_reviewed(os.path.join(current_path, filename))
         self.current_index += 1
         self.load_image()
 
     def delete_image(self):
-        """Deletes the current image."""
+        """Deletes the current image (into the trash folder, in the background, so Z can undo it)."""
+        if self.current_index >= len(self.all_files): return
         current_path, filename, _ = self.all_files[self.current_index]
         full_path = os.path.join(current_path, filename)
         
-        try:
-            os.remove(full_path)
-            print(f"Deleted: {filename}")
-        except Exception as e:
-            print(f"Error deleting: {e}")
+        self.journal.delete(full_path, index=self.current_index, on_done=lambda: self.catalog.record_delete(full_path))
+        self.loader.discard(full_path)
+        print(f"Deleted: {filename}")
             
         self.current_index += 1
         self.load_image()
 
     def move_image(self, key):
         """Moves image to a different folder if you mislabeled it."""
+        if self.current_index >= len(self.all_files): return
         current_path, filename, _ = self.all_files[self.current_index]
         src = os.path.join(current_path, filename)
         
@@ -111,16 +171,306 @@ class DatasetReviewer:
             self.next_image()
             return
 
-        try:
-            shutil.move(src, dst)
-            print(f"Moved {filename} -> {target_folder}")
-        except Exception as e:
-            print(f"Error moving: {e}")
+        # The journal does the actual disk work on a background thread
+        def _moved():
+            self.catalog.record_move(src, dst, DATASET_FOLDER, os.path.basename(target_folder))
+            self.catalog.mark_reviewed(dst)
+        self.journal.move(src, dst, index=self.current_index, on_done=_moved)
+        self.loader.discard(src)
+        print(f"Moved {filename} -> {target_folder}")
 
         self.current_index += 1
         self.load_image()
 
-if __name__ == "__main__":
+    def undo(self):
+        """Z: reverts the last delete/move and goes back to that image."""
+        # Wait for the file to be back, or load_image() would see it missing and quarantine it
+        action = self.journal.undo(wait=True, on_done=self.record_undo)
+        if action is None:
+            print("Nothing to undo.")
+            return
+
+        src = action["src"]
+        print(f"Undo: {os.path.basename(src)} back to {os.path.dirname(src)}")
+
+        index = action.get("index")
+        if index is not None and index < len(self.all_files):
+            self.current_index = index
+        self.load_image()
+
+    def record_undo(self, action):
+        """Catalog update once an undone move/delete has put the file back."""
+        src = action["src"]
+        self.catalog.record_move(action["dst"], src, DATASET_FOLDER, os.path.basename(os.path.dirname(src)))
+
+class GridReviewer:
+    def __init__(self, master):
+        self.master = master
+        self.master.title("Dataset Reviewer - Grid Mode")
+        self.page_size = GRID_COLUMNS * GRID_ROWS
+        self.page = 0
+        self.items = []  # One dict per image: path, filename, category, status
+
+        if not os.path.exists(DATASET_FOLDER):
+            print("Error: labeled_dataset folder not found!")
+            return
+
+        # 1. Gather files from the catalog, sorted so similar frames end up on the same page
+        self.catalog = ImageCatalog()
+        self.catalog.scan(DATASET_FOLDER, labeled=True)
+        rows = self.catalog.query(root=DATASET_FOLDER, stream_code=CAMERA_FILTER, since=SINCE, until=UNTIL,
+                                  unreviewed=ONLY_UNREVIEWED, order_by=GRID_SORTS[GRID_SORT])
+        for row in rows:
+            if row["label"] is not None:
+                self.items.append({"path": row["path"], "filename": row["filename"],
+                                   "category": row["label"], "guess": row["pred_label"], "status": ""})
+
+        # Own journal: undo indices and saved position refer to the grid ordering
+        self.journal = FileJournal("reviewer_grid")
+        last = self.journal.last_position()
+        paths = [item["path"] for item in self.items]
+        if last in paths:
+            self.page = paths.index(last) // self.page_size
+        self.master.after(POLL_MS, self.poll_journal)
+
+        # Tiles are decoded in parallel (and cached on disk at tile size)
+        self.thumbs = ThumbnailCache()
+        self.loader = None
+        self.reset_loader()
+
+        # 2. UI Setup
+        self.lbl_info = tk.Label(master, font=("Arial", 12, "bold"),
+                                 text="CLICK: Select/Deselect | 1/2/3: Label selection | X: Delete selection | "
+                                      "A/N: Select all/none | SPACE/RIGHT: Next page | LEFT: Previous | Z: Undo")
+        self.lbl_info.pack(pady=10)
+
+        self.grid_frame = tk.Frame(master)
+        self.grid_frame.pack()
+        self.tiles = []
+        for i in range(self.page_size):
+            tile = tk.Label(self.grid_frame, compound='top', font=("Arial", 9), highlightthickness=4)
+            tile.grid(row=i // GRID_COLUMNS, column=i % GRID_COLUMNS, padx=2, pady=2)
+            tile.bind('<Button-1>', lambda e, i=i: self.toggle(i))
+            self.tiles.append(tile)
+        self.photos = [None] * self.page_size
+        self.blank = ImageTk.PhotoImage(Image.new('RGB', TILE_SIZE, UNSELECTED_COLOR))  # Shown while a tile decodes
+        self.selected = set()
+        self.pending = {}
+
+        self.lbl_status = tk.Label(master, text="", font=("Arial", 10))
+        self.lbl_status.pack(pady=10)
+
+        # 3. Bind Keys
+        for key in FOLDERS:
+            master.bind(key, lambda e, key=key: self.label_selection(key))
+        master.bind('x', lambda e: self.delete_selection())
+        master.bind('a', lambda e: self.select_all(True))
+        master.bind('n', lambda e: self.select_all(False))
+        master.bind('<space>', lambda e: self.next_page())
+        master.bind('<Right>', lambda e: self.next_page())
+        master.bind('<Left>', lambda e: self.previous_page())
+        master.bind('z', lambda e: self.undo())
+        master.bind('<Control-z>', lambda e: self.undo())
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.load_page()
+
+    def reset_loader(self):
+        """(Re)starts the tile prefetcher after the item list changed."""
+        if self.loader:
+            self.loader.close()
+        self.loader = PrefetchLoader([item["path"] for item in self.items], size=TILE_SIZE, ahead=self.page_size,
+                                     behind=0, capacity=3 * self.page_size, workers=4, decode=self.thumbs.load)
+
+    def poll_journal(self):
+        """Applies finished background moves to the catalog (on the Tk thread, which owns it)."""
+        self.journal.poll()
+        self.master.after(POLL_MS, self.poll_journal)
+
+    def on_close(self):
+        print("Finishing queued file operations...")
+        self.journal.close()
+        self.loader.close()
+        self.master.destroy()
+
+    def page_items(self):
+        start = self.page * self.page_size
+        return list(enumerate(self.items[start:start + self.page_size], start))
+
+    def load_page(self):
+        entries = self.page_items()
+        if not entries:
+            self.lbl_status.config(text="Review Complete! No more images.")
+            for tile in self.tiles:
+                tile.config(image=self.blank, text='', highlightbackground=UNSELECTED_COLOR)
+            return
+
+        self.journal.save_position(entries[0][1]["path"])
+        # Everything still in the dataset starts selected; you click the exceptions
+        self.selected = {slot for slot, (_, item) in enumerate(entries) if item["status"] != "deleted"}
+        self.pending = {}
+        for slot, tile in enumerate(self.tiles):
+            self.photos[slot] = None
+            if slot < len(entries):
+                index, item = entries[slot]
+                self.pending[slot] = (index, self.loader.request(index))
+                tile.config(image=self.blank, text="loading...")
+            else:
+                tile.config(image=self.blank, text='')
+            self.refresh_tile(slot)
+
+        # Warm up the next page while this one is on screen
+        next_start = (self.page + 1) * self.page_size
+        for index in range(next_start, min(next_start + self.page_size, len(self.items))):
+            self.loader.request(index)
+
+        total_pages = (len(self.items) + self.page_size - 1) // self.page_size
+        self.lbl_status.config(text=f"Page {self.page + 1} / {total_pages}  ({len(self.items)} images)")
+        self.poll_tiles()
+
+    def poll_tiles(self):
+        """Puts decoded tiles on screen as they finish, without blocking the UI."""
+        for slot, (index, future) in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[slot]
+            try:
+                self.photos[slot] = ImageTk.PhotoImage(future.result())
+            except Exception as e:
+                print(f"Error loading {self.items[index]['filename']}: {e}")
+            self.refresh_tile(slot)
+        if self.pending:
+            self.master.after(30, self.poll_tiles)
+
+    def refresh_tile(self, slot):
+        tile = self.tiles[slot]
+        entries = self.page_items()
+        if slot >= len(entries):
+            tile.config(highlightbackground=UNSELECTED_COLOR)
+            return
+        _, item = entries[slot]
+        caption = item["category"] if not item["status"] else item["status"]
+        if item.get("guess") and item["guess"] != item["category"] and not item["status"]:
+            caption += f" (AI: {item['guess']})"
+        color = SELECTED_COLOR if slot in self.selected else UNSELECTED_COLOR
+        if self.photos[slot] is not None:
+            tile.config(image=self.photos[slot], text=caption, highlightbackground=color)
+        else:
+            tile.config(text=caption, highlightbackground=color)
+
+    def toggle(self, slot):
+        if slot >= len(self.page_items()):
+            return
+        self.selected ^= {slot}
+        self.refresh_tile(slot)
+
+    def select_all(self, selected):
+        entries = self.page_items()
+        self.selected = {slot for slot, (_, item) in enumerate(entries)
+                         if selected and item["status"] != "deleted"}
+        for slot in range(len(self.tiles)):
+            self.refresh_tile(slot)
+
+    def label_selection(self, key):
+        """Moves every selected tile to one class (tiles already in that class are just confirmed)."""
+        target_folder = FOLDERS[key]
+        category = os.path.basename(target_folder)
+        batch = f"grid-{self.page}-{os.urandom(4).hex()}"
+        moved = 0
+        for slot, (index, item) in enumerate(self.page_items()):
+            if slot not in self.selected or item["status"] == "deleted":
+                continue
+            if item["category"] != category:
+                dst = os.path.join(target_folder, item["filename"])
+                self.journal.move(item["path"], dst, index=index, extra={"batch": batch},
+                                  on_done=lambda src=item["path"], dst=dst: self.record_label(src, dst, category))
+                self.loader.discard(item["path"])
+                item["path"], item["category"] = os.path.normpath(dst), category
+                self.loader.paths[index] = item["path"]
+                moved += 1
+            else:
+                self.catalog.mark_reviewed(item["path"])
+        print(f"Labeled selection as {category} ({moved} moved).")
+        self.select_all(False)
+
+    def delete_selection(self):
+        batch = f"grid-{self.page}-{os.urandom(4).hex()}"
+        deleted = 0
+        for slot, (index, item) in enumerate(self.page_items()):
+            if slot not in self.selected or item["status"] == "deleted":
+                continue
+            self.journal.delete(item["path"], index=index, extra={"batch": batch},
+                                on_done=lambda path=item["path"]: self.catalog.record_delete(path))
+            self.loader.discard(item["path"])
+            item["status"] = "deleted"
+            deleted += 1
+        print(f"Deleted {deleted} images.")
+        self.select_all(False)
+
+    def record_label(self, src, dst, category):
+        """Catalog update once a relabeling move has run."""
+        self.catalog.record_move(src, dst, DATASET_FOLDER, category)
+        self.catalog.mark_reviewed(dst)
+
+    def record_undo(self, action):
+        """Catalog update once an undone move/delete has put the file back."""
+        src = action["src"]
+        self.catalog.record_move(action["dst"], src, DATASET_FOLDER, os.path.basename(os.path.dirname(src)))
+
+    def next_page(self):
+        """Keeps whatever is left on this page as-is (marked reviewed) and moves on."""
+        for _, item in self.page_items():
+            if item["status"] != "deleted":
+                self.catalog.mark_reviewed(item["path"])
+        if (self.page + 1) * self.page_size < len(self.items):
+            self.page += 1
+        else:
+            self.page = len(self.items)  # Past the end: "Review Complete"
+        self.load_page()
+
+    def previous_page(self):
+        self.page = max(0, min(self.page, (len(self.items) - 1) // self.page_size) - 1)
+        self.load_page()
+
+    def undo(self):
+        """Z: reverts the last label/delete action (the whole selection at once) and shows that page."""
+        actions = self.journal.undo_batch(wait=True, on_done=self.record_undo)
+        if not actions:
+            print("Nothing to undo.")
+            return
+        inserted = False
+        for action in actions:
+            src = action["src"]
+            # The saved index only counts if it still shows this image (the history outlives
+            # sessions, and new labels or filters reorder the grid); else look it up by path
+            known = {os.path.normpath(src), os.path.normpath(action["dst"])}
+            index = action.get("index")
+            if index is None or index >= len(self.items) or self.items[index]["path"] not in known:
+                index = next((i for i, item in enumerate(self.items) if item["path"] in known), None)
+            if index is None:
+                # Not in this session's grid: put it back on the current page
+                index = min(self.page * self.page_size, len(self.items))
+                self.items.insert(index, {"path": "", "filename": os.path.basename(src), "guess": None})
+                inserted = True
+            item = self.items[index]
+            item["path"], item["category"], item["status"] = (
+                os.path.normpath(src), os.path.basename(os.path.dirname(src)), "")
+            if not inserted:
+                self.loader.paths[index] = item["path"]
+            self.page = index // self.page_size
+        if inserted:
+            self.reset_loader()
+        print(f"Undo: restored {len(actions)} image(s).")
+        self.load_page()
+
+def main(grid=GRID_MODE):
     root = tk.Tk()
-    app = DatasetReviewer(root)
-    root.mainloop()
\ No newline at end of file
+    if grid:
+        app = GridReviewer(root)
+    else:
+        app = DatasetReviewer(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    import sys
+    main(GRID_MODE or "--grid" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from train_model import load_train_val, training_pipeline, build_model
+from eval_engine import stream_confusion, metrics_from_confusion
+from config import MODEL_PATH, STUDENT_MODEL_PATH, IMG_HEIGHT, IMG_WIDTH
+
+# Knowledge distillation: the trained full model (teacher) labels every augmented training batch
+# with soft probabilities, and the compact student (train_model.build_model(..., "student"))
+# learns from those plus the true labels. Then both are compared for size, CPU speed and accuracy.
+
+# --- CONFIGURATION ---
+TEACHER_PATH = MODEL_PATH     # Any trained model with the same classes (a bigger one works too)
+EPOCHS = 20
+TEMPERATURE = 4.0             # Softens the teacher's probabilities so "which wrong class" is visible
+ALPHA = 0.3                   # Weight of the hard-label loss (1 - ALPHA goes to the teacher's soft targets)
+LEARNING_RATE = 1e-3
+LATENCY_RUNS = 50             # Single-image CPU predictions timed per model
+REPORT_PATH = "distillation_report.json"
+
+
+def distillation_loss(labels, student_logits, teacher_logits, temperature=TEMPERATURE, alpha=ALPHA):
+    hard = tf.keras.losses.sparse_categorical_crossentropy(labels, student_logits, from_logits=True)
+    soft_teacher = tf.nn.softmax(teacher_logits / temperature)
+    log_student = tf.nn.log_softmax(student_logits / temperature)
+    # KL(teacher || student), scaled by T^2 so its gradients stay comparable to the hard loss
+    soft = tf.reduce_sum(soft_teacher * (tf.math.log(soft_teacher + 1e-8) - log_student), axis=1)
+    return tf.reduce_mean(alpha * hard + (1 - alpha) * soft * temperature ** 2)
+
+
+def cpu_latency_ms(model, runs=LATENCY_RUNS):
+    """Median time of one single-image prediction on the CPU."""
+    image = np.random.default_rng(0).uniform(0, 255, (1, IMG_HEIGHT, IMG_WIDTH, 3)).astype(np.float32)
+    with tf.device('/CPU:0'):
+        model.predict_on_batch(image)  # Warm-up (graph tracing)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            model.predict_on_batch(image)
+            times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def describe(name, model, path, val_ds, class_names):
+    cm = stream_confusion(model, val_ds, len(class_names))
+    metrics = metrics_from_confusion(cm, class_names)
+    return {"name": name, "path": path, "parameters": int(model.count_params()),
+            "file_mb": round(os.path.getsize(path) / 1e6, 2), "cpu_ms_per_image": round(cpu_latency_ms(model), 2),
+            "accuracy": metrics["accuracy"],
+            "per_class_recall": {c: metrics["classes"][c]["recall"] for c in class_names}}
+
+
+def distill(teacher_path=TEACHER_PATH, student_path=STUDENT_MODEL_PATH, epochs=EPOCHS):
+    if not os.path.exists(teacher_path):
+        print(f"Error: teacher '{teacher_path}' not found. Run train_model.py first.")
+        return None
+
+    # 1. Same data, split and augmentation as train_model.py
+    train_ds, val_ds, class_names, train_paths = load_train_val()
+    train_ds, val_ds = training_pipeline(train_ds, val_ds, class_names, train_paths)
+    train_ds = train_ds.prefetch(tf.data.AUTOTUNE)
+
+    teacher = tf.keras.models.load_model(teacher_path)
+    teacher.trainable = False
+    student = build_model(len(class_names), "student")
+    optimizer = tf.keras.optimizers.Adam(LEARNING_RATE)
+    print(f"Teacher: {teacher.count_params():,} parameters, student: {student.count_params():,}")
+
+    @tf.function
+    def train_step(images, labels):
+        teacher_logits = teacher(images, training=False)
+        with tf.GradientTape() as tape:
+            student_logits = student(images, training=True)
+            loss = distillation_loss(labels, student_logits, teacher_logits)
+        grads = tape.gradient(loss, student.trainable_variables)
+        optimizer.apply_gradients(zip(grads, student.trainable_variables))
+        return loss
+
+    # 2. Train, keeping the epoch with the best validation accuracy
+    best_acc, best_weights = -1.0, None
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        losses = [float(train_step(images, labels)) for images, labels in train_ds]
+        cm = stream_confusion(student, val_ds, len(class_names))
+        val_acc = float(np.trace(cm) / max(1, cm.sum()))
+        print(f"Epoch {epoch + 1}/{epochs}: loss {np.mean(losses):.4f}, val_accuracy {val_acc:.4f} "
+              f"({time.perf_counter() - start:.0f}s)")
+        if val_acc > best_acc:
+            best_acc, best_weights = val_acc, student.get_weights()
+    student.set_weights(best_weights)
+
+    # Compiled like train_model.py's models, so it loads and evaluates the same way
+    student.compile(optimizer='adam',
+                    loss=tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True),
+                    metrics=['accuracy'])
+    student.save(student_path)
+    print(f"Student saved as {student_path}")
+
+    # 3. The trade-off, side by side
+    report = {"teacher": describe("teacher", teacher, teacher_path, val_ds, class_names),
+              "student": describe("student", student, student_path, val_ds, class_names),
+              "temperature": TEMPERATURE, "alpha": ALPHA, "epochs": epochs}
+    print("------------------------------------------------")
+    print(f"{'':<10}{'params':>12}{'file MB':>10}{'CPU ms':>9}{'accuracy':>10}  per-class recall")
+    for key in ("teacher", "student"):
+        r = report[key]
+        recalls = ", ".join(f"{c} {v:.2f}" for c, v in r["per_class_recall"].items())
+        print(f"{key:<10}{r['parameters']:>12,}{r['file_mb']:>10.2f}{r['cpu_ms_per_image']:>9.2f}"
+              f"{r['accuracy']:>10.2%}  {recalls}")
+    print("------------------------------------------------")
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {REPORT_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    distill()
@@ -0,0 +1,143 @@
+import json
+import os
+import numpy as np
+
+# Shared by evaluate_model.py and test_on_unseen.py.
+# Everything is streamed batch by batch: only a (classes x classes) count matrix
+# per model is kept in memory, never the decoded images or the full prediction arrays.
+
+
+def update_confusion(cm, y_true, y_pred):
+    """Adds one batch of (true, predicted) class indices to the confusion matrix in place."""
+    n = cm.shape[0]
+    cm += np.bincount(n * np.asarray(y_true, dtype=np.int64) + np.asarray(y_pred, dtype=np.int64),
+                      minlength=n * n).reshape(n, n)
+    return cm
+
+
+def stream_confusion(model, ds, num_classes):
+    """Runs the model over a batched (images, labels) dataset and returns the confusion matrix."""
+    return stream_confusions({"model": model}, ds, num_classes)["model"]
+
+
+def stream_confusions(models, ds, num_classes):
+    """
+    Same as stream_confusion, but for several models at once: {name: model} -> {name: cm}.
+    Each batch is decoded ONCE and then fed to every model.
+    """
+    cms = {name: np.zeros((num_classes, num_classes), dtype=np.int64) for name in models}
+    for images, labels in ds:
+        y_true = np.asarray(labels)
+        for name, model in models.items():
+            preds = model.predict_on_batch(images)
+            update_confusion(cms[name], y_true, np.argmax(preds, axis=1))
+    return cms
+
+
+def metrics_from_confusion(cm, class_names):
+    """Per-class precision / recall / f1 / support plus accuracy and averages, from the counts alone."""
+    cm = np.asarray(cm, dtype=np.float64)
+    tp = np.diag(cm)
+    support = cm.sum(axis=1)
+    predicted = cm.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    total = support.sum()
+    weights = support / total if total else np.zeros_like(support)
+    metrics = {
+        "classes": {
+            name: {"precision": float(precision[i]), "recall": float(recall[i]),
+                   "f1-score": float(f1[i]), "support": int(support[i])}
+            for i, name in enumerate(class_names)
+        },
+        "accuracy": float(tp.sum() / total) if total else 0.0,
+        "macro avg": {"precision": float(precision.mean()), "recall": float(recall.mean()),
+                      "f1-score": float(f1.mean()), "support": int(total)},
+        "weighted avg": {"precision": float((precision * weights).sum()),
+                         "recall": float((recall * weights).sum()),
+                         "f1-score": float((f1 * weights).sum()), "support": int(total)},
+    }
+    return metrics
+
+
+def classification_report_from_confusion(cm, class_names):
+    """Same layout as sklearn's classification_report, built from the confusion matrix."""
+    m = metrics_from_confusion(cm, class_names)
+    width = max(len(name) for name in list(class_names) + ["weighted avg"])
+    lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+    for name in class_names:
+        c = m["classes"][name]
+        lines.append(f"{name:>{width}} {c['precision']:>9.2f} {c['recall']:>9.2f} {c['f1-score']:>9.2f} {c['support']:>9}")
+    lines.append("")
+    total = m["macro avg"]["support"]
+    lines.append(f"{'accuracy':>{width}} {'':>9} {'':>9} {m['accuracy']:>9.2f} {total:>9}")
+    for avg in ("macro avg", "weighted avg"):
+        a = m[avg]
+        lines.append(f"{avg:>{width}} {a['precision']:>9.2f} {a['recall']:>9.2f} {a['f1-score']:>9.2f} {a['support']:>9}")
+    return "\n".join(lines)
+
+
+def save_confusion_image(cm, class_names, path, title, cmap='Blues'):
+    """Writes the confusion-matrix heatmap to a PNG. No window is opened."""
+    import matplotlib
+    matplotlib.use("Agg")  # Headless: works on servers and never blocks
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap=cmap,
+                xticklabels=class_names, yticklabels=class_names)
+    plt.ylabel('Actual Truth')
+    plt.xlabel('AI Prediction')
+    plt.title(title)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+def evaluate_checkpoints(model_paths, ds, class_names, output_dir, title, cmap='Blues'):
+    """
+    Evaluates every model file against the same dataset in a single data pass.
+    Prints each report and writes metrics.json plus one confusion-matrix PNG per model.
+    """
+    import tensorflow as tf
+
+    models = {}
+    for path in model_paths:
+        if not os.path.exists(path):
+            print(f"Skipping '{path}': model not found.")
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"Loading {path}...")
+        models[name] = tf.keras.models.load_model(path)
+
+    if not models:
+        print("Error: no models to evaluate.")
+        return {}
+
+    print(f"Running predictions for {len(models)} model(s)...")
+    cms = stream_confusions(models, ds, len(class_names))
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    for name, cm in cms.items():
+        print("\n------------------------------------------------")
+        print(f"CLASSIFICATION REPORT: {name}")
+        print("------------------------------------------------")
+        print(classification_report_from_confusion(cm, class_names))
+
+        image_path = os.path.join(output_dir, f"{name}_confusion.png")
+        save_confusion_image(cm, class_names, image_path, f"{title} - {name}", cmap)
+
+        results[name] = metrics_from_confusion(cm, class_names)
+        results[name]["confusion_matrix"] = cm.tolist()
+        results[name]["confusion_image"] = image_path
+
+    metrics_path = os.path.join(output_dir, "metrics.json")
+    with open(metrics_path, "w") as f:
+        json.dump({"class_names": list(class_names), "models": results}, f, indent=2)
+    print(f"\nResults saved to {output_dir}/")
+    return results
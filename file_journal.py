@@ -0,0 +1,267 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+# --- CONFIGURATION ---
+JOURNAL_PATH = "labeling_journal_{tool}.jsonl"   # One journal per tool: each rewrites its own on launch
+TRASH_FOLDER = ".trash"   # "Deleted" images wait here so a delete can be undone
+UNDO_DEPTH = 50           # How many actions per tool can be undone (also kept across restarts)
+UNDO_WAIT_SECONDS = 10    # How long undo(wait=True) waits for the file to actually be back
+POLL_MS = 200             # How often the tools run poll() from the Tk loop
+
+
+class FileJournal:
+    """
+    Append-only journal + background worker for the labeling tools' file operations.
+
+    The Tk thread only writes one line to the journal and returns; a worker thread
+    does the actual move/delete, so a slow disk never freezes the UI. Because every
+    action is journaled BEFORE it runs, a crash loses nothing: unfinished actions are
+    redone on the next launch, the last K actions can be undone, and the tool can
+    resume at the image it was showing.
+
+    on_done callbacks (e.g. catalog updates) only run for actions that succeeded, on the
+    thread that calls poll(), so the UI thread can keep SQLite / Tk to itself.
+
+    Journal lines:
+        {"event": "action", "id": 7, "tool": "sorter", "op": "move", "src": ..., "dst": ..., "index": 12}
+        {"event": "done", "id": 7} / {"event": "failed", "id": 7, "error": ...}
+        {"event": "undo", "id": 7}
+        {"event": "position", "tool": "sorter", "key": "CAM1_20240101_120000.jpg"}
+    """
+
+    def __init__(self, tool, journal_path=JOURNAL_PATH, trash_folder=TRASH_FOLDER, undo_depth=UNDO_DEPTH):
+        self.tool = tool
+        self.journal_path = journal_path.format(tool=tool)
+        self.trash_folder = trash_folder
+        self.undo_depth = undo_depth
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()
+
+        self.actions = {}     # id -> action dict
+        self.finished = set()
+        self.undone = set()
+        self.positions = {}   # tool -> key
+        self.events = {}      # id -> threading.Event, set once the worker has run the action
+        self.callbacks = {}   # id -> on_done callback
+        self.completed = queue.Queue()   # Callbacks of succeeded actions, waiting for poll()
+        self.next_id = 1
+        self._replay()
+        self._compact()
+
+        self.file = open(self.journal_path, "a", encoding="utf-8")
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+        # Redo anything a crash interrupted
+        pending = [a for i, a in sorted(self.actions.items()) if i not in self.finished]
+        for action in pending:
+            print(f"Resuming unfinished action: {action['op']} {action['src']}")
+            self.tasks.put(action)
+
+    # --- Journal file ---
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Half-written last line after a crash
+                event = entry.get("event")
+                if event == "action":
+                    self.actions[entry["id"]] = entry
+                    self.next_id = max(self.next_id, entry["id"] + 1)
+                elif event in ("done", "failed"):
+                    self.finished.add(entry["id"])
+                elif event == "undo":
+                    self.undone.add(entry["id"])
+                elif event == "position":
+                    self.positions[entry["tool"]] = entry["key"]
+
+    def _compact(self):
+        """Rewrites the journal with only what still matters (pending + undoable actions, positions)."""
+        keep = set()
+        for tool in {a["tool"] for a in self.actions.values()}:
+            ids = [i for i in sorted(self.actions) if self.actions[i]["tool"] == tool]
+            keep.update(ids[-self.undo_depth:])
+        keep.update(i for i in self.actions if i not in self.finished)
+
+        lines = []
+        for i in sorted(keep):
+            lines.append({**self.actions[i]})
+            if i in self.finished:
+                lines.append({"event": "done", "id": i})
+            if i in self.undone:
+                lines.append({"event": "undo", "id": i})
+        for tool, key in self.positions.items():
+            lines.append({"event": "position", "tool": tool, "key": key})
+
+        # Deletes that can no longer be undone: empty them out of the trash for good
+        for i, action in self.actions.items():
+            if i not in keep and action["op"] == "delete" and i not in self.undone:
+                try:
+                    os.remove(action["dst"])
+                except OSError:
+                    pass
+
+        self.actions = {i: self.actions[i] for i in keep}
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in lines:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.journal_path)
+
+    def _append(self, entry):
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    # --- Worker thread ---
+
+    def _run(self):
+        while True:
+            action = self.tasks.get()
+            if action is None:
+                break
+            try:
+                if os.path.exists(action["src"]):
+                    os.makedirs(os.path.dirname(action["dst"]) or ".", exist_ok=True)
+                    shutil.move(action["src"], action["dst"])
+                elif not os.path.exists(action["dst"]):
+                    raise FileNotFoundError(action["src"])
+                # (src gone but dst present = already done before a crash)
+                self._append({"event": "done", "id": action["id"]})
+                with self.lock:
+                    callback = self.callbacks.get(action["id"])
+                if callback is not None:
+                    self.completed.put(callback)
+            except Exception as e:
+                print(f"Error in background {action['op']} of {os.path.basename(action['src'])}: {e}")
+                self._append({"event": "failed", "id": action["id"], "error": str(e)})
+            with self.lock:
+                self.finished.add(action["id"])
+                self.callbacks.pop(action["id"], None)
+                event = self.events.pop(action["id"], None)
+            if event is not None:
+                event.set()
+            self.tasks.task_done()
+
+    # --- Called from the UI thread (all return immediately) ---
+
+    def _submit(self, op, src, dst, index, extra, on_done=None):
+        with self.lock:
+            action = {"event": "action", "id": self.next_id, "tool": self.tool, "op": op,
+                      "src": src, "dst": dst, "index": index, "time": time.time(), **(extra or {})}
+            self.next_id += 1
+            self.actions[action["id"]] = action
+            self.events[action["id"]] = threading.Event()
+            if on_done is not None:
+                self.callbacks[action["id"]] = on_done
+        self._append(action)
+        self.tasks.put(action)
+        return action
+
+    def move(self, src, dst, index=None, extra=None, on_done=None):
+        """
+        Queues a move (e.g. label an image). 'index' is the queue position, used by undo.
+        on_done() runs from poll() once the file has actually moved.
+        """
+        return self._submit("move", src, dst, index, extra, on_done)
+
+    def delete(self, path, index=None, extra=None, on_done=None):
+        """Queues a delete. The file goes to the trash folder so it can still be undone."""
+        with self.lock:
+            trash_name = f"{self.tool}_{self.next_id}_{os.path.basename(path)}"
+        return self._submit("delete", path, os.path.join(self.trash_folder, trash_name), index, extra, on_done)
+
+    def poll(self):
+        """Runs the on_done callbacks of the actions finished since the last call (UI thread)."""
+        while True:
+            try:
+                callback = self.completed.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error after background file operation: {e}")
+
+    def wait(self, action_id, timeout=UNDO_WAIT_SECONDS):
+        """Blocks until the worker has run the action (True), or the timeout passed (False)."""
+        with self.lock:
+            event = self.events.get(action_id)
+        return event is None or event.wait(timeout)
+
+    def undo(self, wait=False, on_done=None):
+        """
+        Reverts this tool's most recent action that isn't undone yet (the reverse move is queued
+        behind the original, so it is safe even if the original hasn't run yet).
+        With wait=True it returns only once the file is back (and its on_done(action) has run),
+        so the caller can show it right away.
+        Returns the undone action, or None if there is nothing left to undo.
+        """
+        with self.lock:
+            candidates = [i for i in sorted(self.actions, reverse=True)
+                          if self.actions[i]["tool"] == self.tool and self.actions[i]["op"] in ("move", "delete")
+                          and i not in self.undone]
+            if not candidates:
+                return None
+            action = self.actions[candidates[0]]
+            self.undone.add(action["id"])
+        self._append({"event": "undo", "id": action["id"]})
+        callback = (lambda: on_done(action)) if on_done is not None else None
+        reverse = self._submit("undo", action["dst"], action["src"], action.get("index"), {"undoes": action["id"]},
+                               callback)
+        if wait:
+            if not self.wait(reverse["id"]):
+                print(f"Undo of {os.path.basename(action['src'])} is still running in the background.")
+            self.poll()
+        return action
+
+    def undo_batch(self, wait=False, on_done=None):
+        """
+        Like undo(), but if the last action was part of a batch (extra={"batch": ...}),
+        every action of that batch is reverted. Returns the list of undone actions.
+        """
+        first = self.undo(on_done=on_done)
+        if first is None:
+            return []
+        undone = [first]
+        batch = first.get("batch")
+        if batch is not None:
+            while True:
+                with self.lock:
+                    more = any(a.get("batch") == batch and a["tool"] == self.tool and i not in self.undone
+                               and a["op"] in ("move", "delete") for i, a in self.actions.items())
+                if not more:
+                    break
+                undone.append(self.undo(on_done=on_done))
+        # The reverse moves run in queue order, so waiting for the last one covers the batch
+        if wait:
+            if not self.wait(self.next_id - 1):
+                print("Undo is still running in the background.")
+            self.poll()
+        return undone
+
+    def save_position(self, key):
+        """Remember which image the tool is showing, so the next launch resumes there."""
+        if self.positions.get(self.tool) == key:
+            return
+        self.positions[self.tool] = key
+        self._append({"event": "position", "tool": self.tool, "key": key})
+
+    def last_position(self):
+        return self.positions.get(self.tool)
+
+    def close(self):
+        """Waits for queued file operations to finish and runs their callbacks (call when the window closes)."""
+        self.tasks.put(None)
+        self.worker.join()
+        self.file.close()
+        self.poll()
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import numpy as np
+
+# Cheap "is this frame worth keeping?" check, run before a frame is stored or classified.
+# Everything works on a strided ~320px copy of the frame, so a check costs about a millisecond.
+#
+#   python frame_quality.py traffic_dataset   -> score a folder and print the metric distribution
+#                                                (use it to calibrate the thresholds below)
+
+# --- CONFIGURATION ---
+# Careful: snow-covered roads are bright, white and low-texture, and they are exactly the frames
+# we want. These limits only catch frames that are almost entirely black / white / featureless.
+DARK_LEVEL = 25               # Grey level counted as "black"
+MAX_DARK_FRACTION = 0.90      # Night frames / dead streams
+BRIGHT_LEVEL = 245
+MAX_BRIGHT_FRACTION = 0.97    # Blown-out or lens fully covered by snow
+MIN_SHARPNESS = 8.0           # Variance of the Laplacian (on the small copy); lower = motion smear / fog on lens
+MIN_COLOUR_ENTROPY = 2.0      # Bits (of 9). Flat slates and blocked lenses have almost one colour
+SLATE_FOLDER = "slate_templates"  # Example images of "stream unavailable" slates etc.
+SLATE_MATCH = 0.92            # Correlation with a slate template above this = slate
+
+REJECT_ACTION = "route"       # "route" = save to REJECTED_FOLDER/<reason>/, "skip" = don't save at all
+REJECTED_FOLDER = "rejected_frames"
+STATS_PATH = "frame_quality_stats.json"
+
+WORK_WIDTH = 320
+SIGNATURE_SIZE = (12, 16)     # (rows, cols) of the block-mean thumbnail used to match slates
+
+_slates = None
+
+
+def _small_grey(rgb):
+    """Strided downscale + luma, as float32."""
+    step = max(1, rgb.shape[1] // WORK_WIDTH)
+    small = rgb[::step, ::step, :3].astype(np.float32)
+    return small, small @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def small_grey(frame, bgr=False):
+    """The strided luma copy every metric here (and burst.py) works on."""
+    if bgr:
+        frame = frame[..., ::-1]
+    return _small_grey(frame)[1]
+
+
+def sharpness(grey):
+    """Variance of the 4-neighbour Laplacian."""
+    lap = grey[1:-1, :-2] + grey[1:-1, 2:] + grey[:-2, 1:-1] + grey[2:, 1:-1] - 4 * grey[1:-1, 1:-1]
+    return float(lap.var())
+
+
+def signature(grey):
+    """Zero-mean, unit-norm block-mean thumbnail. Dot product of two signatures = correlation."""
+    rows, cols = SIGNATURE_SIZE
+    h, w = grey.shape[0] // rows * rows, grey.shape[1] // cols * cols
+    blocks = grey[:h, :w].reshape(rows, h // rows, cols, w // cols).mean(axis=(1, 3)).ravel()
+    blocks = blocks - blocks.mean()
+    norm = np.linalg.norm(blocks)
+    return blocks / norm if norm > 0 else blocks
+
+
+def load_slates(folder=SLATE_FOLDER):
+    """Signatures of every image in SLATE_FOLDER (loaded once)."""
+    global _slates
+    if _slates is None:
+        _slates = []
+        if os.path.isdir(folder):
+            from PIL import Image
+            for name in sorted(os.listdir(folder)):
+                try:
+                    with Image.open(os.path.join(folder, name)) as img:
+                        rgb = np.asarray(img.convert('RGB'))
+                except Exception:
+                    continue
+                _slates.append((name, signature(_small_grey(rgb)[1])))
+    return _slates
+
+
+def check_frame(frame, bgr=False):
+    """
+    Scores one HxWx3 uint8 frame (bgr=True for OpenCV frames).
+    Returns {"ok": bool, "reasons": [...], plus the metrics}.
+    """
+    if bgr:
+        frame = frame[..., ::-1]
+    small, grey = _small_grey(frame)
+
+    dark = float((grey < DARK_LEVEL).mean())
+    bright = float((grey > BRIGHT_LEVEL).mean())
+
+    sharp = sharpness(grey)
+
+    # Entropy of a 3-bit-per-channel colour histogram
+    q = small.astype(np.uint8) >> 5
+    codes = (q[..., 0].astype(np.int32) << 6) | (q[..., 1].astype(np.int32) << 3) | q[..., 2]
+    counts = np.bincount(codes.ravel(), minlength=512)
+    p = counts[counts > 0] / codes.size
+    entropy = max(0.0, float(-(p * np.log2(p)).sum()))
+
+    slate, slate_score = None, 0.0
+    slates = load_slates()
+    if slates:
+        sig = signature(grey)
+        for name, template in slates:
+            score = float(sig @ template)
+            if score > slate_score:
+                slate, slate_score = name, score
+
+    reasons = []
+    if dark > MAX_DARK_FRACTION:
+        reasons.append("dark")
+    if bright > MAX_BRIGHT_FRACTION:
+        reasons.append("washed_out")
+    if sharp < MIN_SHARPNESS:
+        reasons.append("blurry")
+    if entropy < MIN_COLOUR_ENTROPY:
+        reasons.append("flat")
+    if slate_score > SLATE_MATCH:
+        reasons.append("slate")
+
+    return {"ok": not reasons, "reasons": reasons, "dark_fraction": round(dark, 3),
+            "bright_fraction": round(bright, 3), "sharpness": round(sharp, 1),
+            "entropy": round(entropy, 2), "slate": slate if slate_score > SLATE_MATCH else None}
+
+
+def check_file(path):
+    from preprocess import open_rgb
+
+    # Fast reduced-size JPEG decode
+    return check_frame(np.asarray(open_rgb(path, draft_size=(WORK_WIDTH * 2, WORK_WIDTH * 2))))
+
+
+def rejected_path(filename, result):
+    """Where a rejected frame goes when REJECT_ACTION == "route"."""
+    return os.path.join(REJECTED_FOLDER, result["reasons"][0], os.path.basename(filename))
+
+
+class QualityStats:
+    """Per-camera pass / reject counts, merged into STATS_PATH across runs."""
+
+    def __init__(self):
+        self.cameras = {}
+        self.lock = threading.Lock()  # Capture threads share one instance
+
+    def add(self, stream_code, result):
+        with self.lock:
+            entry = self.cameras.setdefault(stream_code, {"checked": 0, "rejected": 0, "reasons": {}})
+            entry["checked"] += 1
+            if not result["ok"]:
+                entry["rejected"] += 1
+                for reason in result["reasons"]:
+                    entry["reasons"][reason] = entry["reasons"].get(reason, 0) + 1
+
+    def save(self, path=STATS_PATH):
+        totals = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                totals = json.load(f)
+        for code, entry in self.cameras.items():
+            total = totals.setdefault(code, {"checked": 0, "rejected": 0, "reasons": {}})
+            total["checked"] += entry["checked"]
+            total["rejected"] += entry["rejected"]
+            for reason, n in entry["reasons"].items():
+                total["reasons"][reason] = total["reasons"].get(reason, 0) + n
+        with open(path, "w") as f:
+            json.dump(totals, f, indent=2, sort_keys=True)
+        return totals
+
+    def summary(self):
+        checked = sum(e["checked"] for e in self.cameras.values())
+        rejected = sum(e["rejected"] for e in self.cameras.values())
+        return f"{rejected}/{checked} frames rejected by the quality gate"
+
+
+def report(path=STATS_PATH, top=20):
+    """Prints the cameras with the highest rejection rate."""
+    if not os.path.exists(path):
+        print(f"No stats yet ({path}).")
+        return
+    with open(path) as f:
+        totals = json.load(f)
+    rows = sorted(totals.items(), key=lambda kv: -kv[1]["rejected"] / max(1, kv[1]["checked"]))
+    print(f"{'Camera':<20} {'Checked':>8} {'Rejected':>9}  Reasons")
+    for code, e in rows[:top]:
+        rate = e["rejected"] / max(1, e["checked"])
+        print(f"{code:<20} {e['checked']:>8} {rate:>8.0%}  {e['reasons']}")
+
+
+if __name__ == "__main__":
+    import sys
+    folder = sys.argv[1] if len(sys.argv) > 1 else None
+    if folder is None:
+        report()
+    else:
+        names = [n for n in sorted(os.listdir(folder)) if n.lower().endswith(('.png', '.jpg', '.jpeg'))]
+        results = []
+        for name in names:
+            try:
+                results.append((name, check_file(os.path.join(folder, name))))
+            except Exception as e:
+                print(f"Could not read {name}: {e}")
+        for metric in ("dark_fraction", "bright_fraction", "sharpness", "entropy"):
+            values = np.array([r[metric] for _, r in results]) if results else np.zeros(1)
+            p = np.percentile(values, [1, 5, 50, 95, 99])
+            print(f"{metric:<16} p1={p[0]:.2f} p5={p[1]:.2f} p50={p[2]:.2f} p95={p[3]:.2f} p99={p[4]:.2f}")
+        bad = [(n, r["reasons"]) for n, r in results if not r["ok"]]
+        print(f"{len(bad)}/{len(results)} would be rejected:")
+        for name, reasons in bad[:50]:
+            print(f"   {name}: {', '.join(reasons)}")
@@ -1,9 +1,25 @@
+import os
 import requests
 import cv2
 from datetime import datetime
 from google.cloud import storage
 
-API_URL = "https://edmontontrafficcam.com/Default.aspx/GetCameras"
+try:
+    # Copy ../frame_quality.py next to this file before deploying to enable the quality gate
+    from frame_quality import check_frame
+except ImportError:
+    check_frame = None
+
+try:
+    # Copy ../burst.py too (needs frame_quality.py, see "Deploy the function") to keep the best of several frames per stream
+    from burst import capture_burst
+except ImportError:
+    capture_burst = None
+
+# API_URL / HLS_URL_TEMPLATE can be overridden with environment variables,
+# e.g. to run against a camera_replay.py server instead of the live site
+API_URL = os.environ.get("API_URL", "https://edmontontrafficcam.com/Default.aspx/GetCameras")
+HLS_URL_TEMPLATE = os.environ.get("HLS_URL_TEMPLATE", "https://{mms_url}/{forge}/public/hls/{stream_code}.m3u8")
 BUCKET_NAME = "YOUR_BUCKET_NAME"
 PREFIX = "traffic_dataset"
 
@@ -25,6 +41,7 @@ def scrape_traffic_cameras(request):
 
         bucket = storage_client.bucket(BUCKET_NAME)
         success_count = 0
+        rejected = {}
 
         for cam in data:
             stream_code = cam.get("StreamCode")
@@ -34,15 +51,26 @@ def scrape_traffic_cameras(request):
             if not (stream_code and mms_url and forge):
                 continue
 
-            video_url = f"https://{mms_url}/{forge}/public/hls/{stream_code}.m3u8"
+            video_url = HLS_URL_TEMPLATE.format(mms_url=mms_url, forge=forge, stream_code=stream_code)
 
             cap = cv2.VideoCapture(video_url)
-            ret, frame = cap.read()
+            if capture_burst is not None:
+                frame, _ = capture_burst(cap)
+            else:
+                ret, frame = cap.read()
+                frame = frame if ret else None
             cap.release()
 
-            if not ret:
+            if frame is None:
                 continue
 
+            # Skip black / slate / blurred frames (not worth the storage or the labeling time)
+            if check_frame is not None:
+                result = check_frame(frame, bgr=True)
+                if not result["ok"]:
+                    rejected[stream_code] = result["reasons"]
+                    continue
+
             # Encode frame to JPEG bytes (no local file needed)
             ok, jpg = cv2.imencode(".jpg", frame)
             if not ok:
@@ -56,7 +84,7 @@ def scrape_traffic_cameras(request):
 
             success_count += 1
 
-        return (f"Done. Uploaded {success_count} images.", 200)
+        return (f"Done. Uploaded {success_count} images, rejected {len(rejected)}: {rejected}", 200)
 
     except Exception as e:
         return (f"CRITICAL ERROR: {e}", 500)
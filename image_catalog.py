@@ -0,0 +1,404 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+# --- CONFIGURATION ---
+CATALOG_PATH = "image_catalog.db"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Known capture filename patterns:
+#   API / GCP scraper: {StreamCode}_{YYYYmmdd}_{HHMMSS}.jpg
+#   Selenium scripts:  cam_{YYYY-mm-dd}_{HH-MM-SS}.png
+API_NAME = re.compile(r"^(?P<code>.+)_(?P<date>\d{8})_(?P<time>\d{6})$")
+SELENIUM_NAME = re.compile(r"^(?P<code>.+)_(?P<date>\d{4}-\d{2}-\d{2})_(?P<time>\d{2}-\d{2}-\d{2})$")
+
+ORDERINGS = {
+    "path": "images.path",
+    "captured_at": "images.captured_at",
+    "stream_code, captured_at": "images.stream_code, images.captured_at",
+    "label, path": "images.label, images.path",
+    # Unpredicted images last, then the least confident first
+    "uncertain": "predictions.margin IS NULL, predictions.margin, images.path",
+    # Grouped by the model's guess, most confident first (good for batch confirming)
+    "predicted": "predictions.pred_label IS NULL, predictions.pred_label, predictions.confidence DESC, images.path",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path        TEXT PRIMARY KEY,
+    root        TEXT NOT NULL,
+    folder      TEXT NOT NULL,
+    filename    TEXT NOT NULL,
+    stream_code TEXT,
+    captured_at TEXT,
+    label       TEXT,
+    sha1        TEXT,
+    size        INTEGER,
+    mtime       REAL,
+    width       INTEGER,
+    height      INTEGER,
+    reviewed    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_images_root ON images(root);
+CREATE INDEX IF NOT EXISTS idx_images_folder ON images(folder);
+CREATE INDEX IF NOT EXISTS idx_images_camera ON images(stream_code, captured_at);
+CREATE INDEX IF NOT EXISTS idx_images_label ON images(label);
+CREATE INDEX IF NOT EXISTS idx_images_sha1 ON images(sha1);
+CREATE TABLE IF NOT EXISTS dirs (
+    path  TEXT PRIMARY KEY,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    path       TEXT PRIMARY KEY,
+    mtime      REAL,
+    model      TEXT,
+    pred_label TEXT,
+    confidence REAL,
+    margin     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_margin ON predictions(margin);
+CREATE TABLE IF NOT EXISTS dhashes (
+    path  TEXT PRIMARY KEY,
+    mtime REAL,
+    dhash TEXT
+);
+CREATE TABLE IF NOT EXISTS verified (
+    path       TEXT PRIMARY KEY,
+    mtime      REAL,
+    size       INTEGER,
+    checked_at REAL
+);
+CREATE TABLE IF NOT EXISTS archived (
+    path        TEXT PRIMARY KEY,
+    stream_code TEXT,
+    captured_at TEXT,
+    bundle      TEXT,
+    size        INTEGER,
+    archived_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_archived_camera ON archived(stream_code, captured_at);
+"""
+
+
+def parse_capture_name(filename):
+    """Returns (stream_code, captured_at ISO string or None) from a capture filename."""
+    name = os.path.splitext(os.path.basename(filename))[0]
+    match = API_NAME.match(name)
+    if match:
+        stamp = datetime.strptime(match["date"] + match["time"], "%Y%m%d%H%M%S")
+        return match["code"], stamp.isoformat()
+    match = SELENIUM_NAME.match(name)
+    if match:
+        stamp = datetime.strptime(f"{match['date']} {match['time']}", "%Y-%m-%d %H-%M-%S")
+        return match["code"], stamp.isoformat()
+    return name, None
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def model_key(model_path):
+    """
+    'road_model.keras@1a2b3c4d5e6f': the model's file name plus a hash of its contents, so a
+    model retrained in place under the same name makes every stored prediction stale.
+    """
+    return f"{os.path.basename(model_path)}@{_file_sha1(model_path)[:12]}"
+
+
+def _image_size(path):
+    """Reads only the image header, not the pixels."""
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+class ImageCatalog:
+    """
+    Persistent index of every image the tools know about, stored in SQLite.
+    scan() only re-reads folders whose mtime changed and files whose (mtime, size) changed,
+    so opening a tool on 100k+ files is a few indexed queries instead of a directory walk.
+    """
+
+    def __init__(self, db_path=CATALOG_PATH):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Keeping it up to date ---
+
+    def scan(self, root, labeled=False, full=False):
+        """
+        Brings the catalog up to date with 'root' (e.g. "labeled_dataset").
+        With labeled=True, images inside a sub-folder get that folder's name as their label.
+        Unchanged folders are skipped unless full=True.
+        """
+        root = os.path.normpath(root)
+        if not os.path.isdir(root):
+            return {"added": 0, "updated": 0, "removed": 0}
+
+        start = time.perf_counter()
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        known_dirs = {row["path"]: row["mtime"] for row in self.conn.execute(
+            "SELECT path, mtime FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+            (root, len(root) + 1, root + os.sep))}
+
+        children = {}  # Sub-folders as of the last scan, so unchanged folders need no listing
+        for path in known_dirs:
+            if path != root:
+                children.setdefault(os.path.dirname(path), []).append(path)
+
+        seen_dirs = set()
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            seen_dirs.add(folder)
+            try:
+                dir_mtime = os.stat(folder).st_mtime
+            except OSError:
+                continue
+            if not full and known_dirs.get(folder) == dir_mtime:
+                # Nothing was added, removed or renamed here since the last scan: one stat, no listing
+                stack.extend(children.get(folder, []))
+                continue
+
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            stack.extend(os.path.normpath(e.path) for e in entries if e.is_dir())
+            self._scan_folder(root, folder, entries, stats, labeled)
+            self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime) VALUES (?, ?)", (folder, dir_mtime))
+
+        # Folders that disappeared entirely
+        for gone in set(known_dirs) - seen_dirs:
+            cur = self.conn.execute("DELETE FROM images WHERE folder = ?", (gone,))
+            stats["removed"] += cur.rowcount
+            self.conn.execute("DELETE FROM dirs WHERE path = ?", (gone,))
+
+        self.conn.commit()
+        print(f"Catalog scan of {root}: +{stats['added']} ~{stats['updated']} -{stats['removed']} "
+              f"({time.perf_counter() - start:.2f}s)")
+        return stats
+
+    def _scan_folder(self, root, folder, entries, stats, labeled):
+        label = os.path.basename(folder) if (labeled and folder != root) else None
+        known = {row["path"]: (row["mtime"], row["size"]) for row in self.conn.execute(
+            "SELECT path, mtime, size FROM images WHERE folder = ?", (folder,))}
+
+        present = set()
+        for entry in entries:
+            if not (entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)):
+                continue
+            path = os.path.normpath(entry.path)
+            present.add(path)
+            st = entry.stat()
+            if known.get(path) == (st.st_mtime, st.st_size):
+                continue
+            stats["updated" if path in known else "added"] += 1
+            self._upsert(root, path, label, st)
+
+        for path in set(known) - present:
+            self.conn.execute("DELETE FROM images WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM predictions WHERE path = ?", (path,))
+            stats["removed"] += 1
+
+    def _upsert(self, root, path, label, st=None):
+        st = st or os.stat(path)
+        stream_code, captured_at = parse_capture_name(path)
+        if captured_at is None:
+            captured_at = datetime.fromtimestamp(st.st_mtime).isoformat()
+        width, height = _image_size(path)
+        self.conn.execute(
+            "INSERT INTO images (path, root, folder, filename, stream_code, captured_at, label, sha1, size, mtime, width, height) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET root=excluded.root, label=excluded.label, sha1=excluded.sha1, "
+            "size=excluded.size, mtime=excluded.mtime, width=excluded.width, height=excluded.height",
+            (path, root, os.path.dirname(path), os.path.basename(path), stream_code, captured_at, label,
+             _file_sha1(path), st.st_size, st.st_mtime, width, height))
+
+    # --- Called by the tools when THEY change files (keeps the catalog in sync without a rescan) ---
+
+    def record_move(self, src, dst, root, label):
+        """A file was moved/relabeled. Keeps its hash, timestamp and review flag."""
+        src, dst = os.path.normpath(src), os.path.normpath(dst)
+        self.conn.execute("DELETE FROM images WHERE path = ?", (dst,))
+        self.conn.execute("DELETE FROM predictions WHERE path = ?", (dst,))
+        cur = self.conn.execute(
+            "UPDATE images SET path = ?, root = ?, folder = ?, filename = ?, label = ? WHERE path = ?",
+            (dst, os.path.normpath(root), os.path.dirname(dst), os.path.basename(dst), label, src))
+        self.conn.execute("UPDATE predictions SET path = ? WHERE path = ?", (dst, src))
+        self.conn.execute("DELETE FROM verified WHERE path = ?", (dst,))
+        self.conn.execute("UPDATE verified SET path = ? WHERE path = ?", (dst, src))
+        self.conn.execute("DELETE FROM dhashes WHERE path = ?", (dst,))
+        self.conn.execute("UPDATE dhashes SET path = ? WHERE path = ?", (dst, src))
+        if cur.rowcount == 0 and os.path.exists(dst):
+            self._upsert(os.path.normpath(root), dst, label)
+        self.conn.commit()
+
+    def record_delete(self, path):
+        self.conn.execute("DELETE FROM images WHERE path = ?", (os.path.normpath(path),))
+        self.conn.execute("DELETE FROM predictions WHERE path = ?", (os.path.normpath(path),))
+        self.conn.execute("DELETE FROM verified WHERE path = ?", (os.path.normpath(path),))
+        self.conn.execute("DELETE FROM dhashes WHERE path = ?", (os.path.normpath(path),))
+        self.conn.commit()
+
+    def record_predictions(self, rows, model):
+        """rows: (path, pred_label, confidence, margin). Tied to the file's current mtime."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions (path, mtime, model, pred_label, confidence, margin) "
+            "SELECT path, mtime, ?, ?, ?, ? FROM images WHERE path = ?",
+            [(model, label, float(conf), float(margin), os.path.normpath(path)) for path, label, conf, margin in rows])
+        self.conn.commit()
+
+    def record_verified(self, paths):
+        """Marks files as fully decoded OK at their current (mtime, size)."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO verified (path, mtime, size, checked_at) "
+            "SELECT path, mtime, size, ? FROM images WHERE path = ?",
+            [(now, os.path.normpath(p)) for p in paths])
+        self.conn.commit()
+
+    def record_archived(self, paths, bundle):
+        """Files packed into an archive bundle (retention.py). Call BEFORE deleting the originals."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO archived (path, stream_code, captured_at, bundle, size, archived_at) "
+            "SELECT path, stream_code, captured_at, ?, size, ? FROM images WHERE path = ?",
+            [(bundle, now, os.path.normpath(p)) for p in paths])
+        self.conn.commit()
+
+    def archived(self, path=None, stream_code=None, since=None, until=None):
+        """Index of archived frames: rows with path, stream_code, captured_at, bundle, size."""
+        clauses, params = [], []
+        if path is not None:
+            clauses.append("path = ?")
+            params.append(os.path.normpath(path))
+        if stream_code is not None:
+            clauses.append("stream_code = ?")
+            params.append(stream_code)
+        if since is not None:
+            clauses.append("captured_at >= ?")
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            clauses.append("captured_at < ?")
+            params.append(until.isoformat() if isinstance(until, datetime) else until)
+        sql = "SELECT * FROM archived"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self.conn.execute(sql + " ORDER BY stream_code, captured_at", params).fetchall()
+
+    def cached_hashes(self, root):
+        """{path: perceptual hash} for images under 'root' whose hash is still current."""
+        return {row["path"]: int(row["dhash"], 16) for row in self.conn.execute(
+            "SELECT images.path, dhashes.dhash FROM images JOIN dhashes "
+            "ON dhashes.path = images.path AND dhashes.mtime = images.mtime WHERE images.root = ?",
+            (os.path.normpath(root),))}
+
+    def record_hashes(self, hashes):
+        """Stores {path: perceptual hash} (as hex, SQLite integers are signed 64-bit)."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO dhashes (path, mtime, dhash) SELECT path, mtime, ? FROM images WHERE path = ?",
+            [(f"{h:016x}", os.path.normpath(p)) for p, h in hashes.items()])
+        self.conn.commit()
+
+    def unverified(self, root):
+        """Paths under 'root' that were never checked, or changed since their last good check."""
+        return [row["path"] for row in self.conn.execute(
+            "SELECT images.path FROM images LEFT JOIN verified "
+            "ON verified.path = images.path AND verified.mtime = images.mtime AND verified.size = images.size "
+            "WHERE images.root = ? AND verified.path IS NULL ORDER BY images.path",
+            (os.path.normpath(root),))]
+
+    def unpredicted(self, root, model):
+        """
+        Paths under 'root' with no prediction from 'model' (a model_key(), which changes when the
+        model is retrained) for the image's current version.
+        """
+        return [row["path"] for row in self.conn.execute(
+            "SELECT images.path FROM images LEFT JOIN predictions "
+            "ON predictions.path = images.path AND predictions.mtime = images.mtime AND predictions.model = ? "
+            "WHERE images.root = ? AND predictions.path IS NULL ORDER BY images.path",
+            (model, os.path.normpath(root)))]
+
+    def mark_reviewed(self, path, reviewed=True):
+        self.conn.execute("UPDATE images SET reviewed = ? WHERE path = ?", (int(reviewed), os.path.normpath(path)))
+        self.conn.commit()
+
+    # --- Query API ---
+
+    def query(self, root=None, label=None, stream_code=None, since=None, until=None,
+              unreviewed=False, min_confidence=None, order_by="path", limit=None):
+        """
+        Returns matching rows (sqlite3.Row, use row["path"], row["label"], ...).
+        since / until are datetimes or ISO strings compared against the capture time.
+        Rows also carry the latest model guess (pred_label, confidence, margin) or None.
+        order_by="uncertain" puts the lowest-margin (hardest) predictions first.
+        """
+        clauses, params = [], []
+        if root is not None:
+            clauses.append("images.root = ?")
+            params.append(os.path.normpath(root))
+        if label is not None:
+            clauses.append("images.label = ?")
+            params.append(label)
+        if stream_code is not None:
+            clauses.append("images.stream_code = ?")
+            params.append(stream_code)
+        if since is not None:
+            clauses.append("images.captured_at >= ?")
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            clauses.append("images.captured_at < ?")
+            params.append(until.isoformat() if isinstance(until, datetime) else until)
+        if unreviewed:
+            clauses.append("images.reviewed = 0")
+        if min_confidence is not None:
+            clauses.append("predictions.confidence >= ?")
+            params.append(float(min_confidence))
+
+        if order_by not in ORDERINGS:
+            raise ValueError(f"Unsupported order_by: {order_by}")
+
+        sql = ("SELECT images.*, predictions.pred_label, predictions.confidence, predictions.margin "
+               "FROM images LEFT JOIN predictions "
+               "ON predictions.path = images.path AND predictions.mtime = images.mtime")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {ORDERINGS[order_by]}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self.conn.execute(sql, params).fetchall()
+
+    def counts(self, root=None):
+        """{label: count} for a quick overview (label is None for unsorted images)."""
+        sql = "SELECT label, COUNT(*) AS n FROM images"
+        params = []
+        if root is not None:
+            sql += " WHERE root = ?"
+            params.append(os.path.normpath(root))
+        sql += " GROUP BY label"
+        return {row["label"]: row["n"] for row in self.conn.execute(sql, params)}
+
+
+if __name__ == "__main__":
+    catalog = ImageCatalog()
+    for folder, labeled in (("traffic_screenshots", False), ("traffic_dataset", False), ("labeled_dataset", True)):
+        catalog.scan(folder, labeled=labeled)
+        print(f"   {folder}: {catalog.counts(folder)}")
+    catalog.close()
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from preprocess import open_rgb, RESAMPLE
+
+# --- CONFIGURATION ---
+DISPLAY_SIZE = (800, 600)  # Same box the Tk tools thumbnail into
+PREFETCH_AHEAD = 6         # Decode this many upcoming images in the background
+PREFETCH_BEHIND = 2        # ...and keep a couple of previous ones around
+CACHE_SIZE = 16            # Max decoded thumbnails held in memory (LRU)
+WORKERS = 2
+
+
+def decode_thumbnail(path, size=DISPLAY_SIZE):
+    """Opens, downsizes and fully decodes one image. Safe to run off the Tk thread."""
+    # Same decode + colour conversion as the model input (preprocess.py); for JPEGs the draft
+    # lets libjpeg decode at 1/2, 1/4 or 1/8 scale directly (much faster)
+    img = open_rgb(path, draft_size=size)
+    img.thumbnail(size, RESAMPLE)  # Keeps the aspect ratio for display
+    return img
+
+
+class PrefetchLoader:
+    """
+    Decodes the images around the current position on worker threads.
+    The Tk thread only calls get(), which is usually an instant cache hit,
+    and then does the cheap ImageTk.PhotoImage() handoff itself.
+    """
+
+    def __init__(self, paths, size=DISPLAY_SIZE, ahead=PREFETCH_AHEAD, behind=PREFETCH_BEHIND,
+                 capacity=CACHE_SIZE, workers=WORKERS, decode=decode_thumbnail):
+        self.paths = paths
+        self.size = size
+        self.ahead = ahead
+        self.behind = behind
+        self.capacity = max(capacity, ahead + behind + 1)
+        self.decode = decode
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.cache = OrderedDict()  # path -> Future
+        self.lock = threading.Lock()
+
+    def _submit(self, path):
+        with self.lock:
+            future = self.cache.get(path)
+            if future is not None:
+                self.cache.move_to_end(path)
+                return future
+            future = self.pool.submit(self.decode, path, self.size)
+            self.cache[path] = future
+            while len(self.cache) > self.capacity:
+                _, old = self.cache.popitem(last=False)
+                old.cancel()  # No-op if it already started
+            return future
+
+    def get(self, index):
+        """
+        Returns the decoded thumbnail for paths[index] (raises if it could not be opened)
+        and queues its neighbours. Blocks only if the image was not prefetched yet.
+        """
+        future = self._submit(self.paths[index])
+        self.prefetch(index)
+        return future.result()
+
+    def request(self, index):
+        """Non-blocking version of get(): returns the Future for paths[index]."""
+        return self._submit(self.paths[index])
+
+    def prefetch(self, index):
+        # Nearest images first, so the next keypress is the one that's ready soonest
+        for offset in range(1, self.ahead + 1):
+            if index + offset < len(self.paths):
+                self._submit(self.paths[index + offset])
+        for offset in range(1, self.behind + 1):
+            if index - offset >= 0:
+                self._submit(self.paths[index - offset])
+
+    def discard(self, path):
+        """Forget a file that was moved or deleted."""
+        with self.lock:
+            future = self.cache.pop(path, None)
+        if future is not None:
+            future.cancel()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
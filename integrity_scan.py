@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from image_catalog import ImageCatalog
+from config import SOURCE_FOLDER, CAPTURE_FOLDER, DATASET_PATH
+
+# --- CONFIGURATION ---
+SCAN_FOLDERS = {
+    # folder: has class sub-folders?
+    SOURCE_FOLDER: False,
+    CAPTURE_FOLDER: False,
+    DATASET_PATH: True,
+}
+QUARANTINE_FOLDER = "quarantine"
+MIN_WIDTH = 64
+MIN_HEIGHT = 64
+ALLOWED_MODES = ("RGB", "RGBA", "L", "P")
+WORKERS = os.cpu_count() or 4
+
+# Set to True to only REPORT bad files without moving them
+DRY_RUN = False
+
+
+def check_image(path):
+    """
+    Fully decodes one file and returns (path, problem). problem is None if the image is fine.
+    Runs in a worker process.
+    """
+    from PIL import Image
+
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return path, "zero-byte file"
+
+        # 1. Structure check (headers, chunk CRCs for PNG)
+        with Image.open(path) as img:
+            img.verify()
+
+        # 2. Full decode: this is what catches truncated JPEG/PNG data
+        with Image.open(path) as img:
+            img.load()
+            width, height = img.size
+            mode = img.mode
+
+        if width < MIN_WIDTH or height < MIN_HEIGHT:
+            return path, f"too small ({width}x{height})"
+        if mode not in ALLOWED_MODES:
+            return path, f"unexpected mode {mode}"
+
+        # 3. JPEGs must end with the End-Of-Image marker (PIL pads some cut-off files silently)
+        if path.lower().endswith(('.jpg', '.jpeg')):
+            with open(path, 'rb') as f:
+                f.seek(-2, os.SEEK_END)
+                if f.read(2) != b'\xff\xd9':
+                    return path, "truncated JPEG (no end marker)"
+
+        return path, None
+    except Exception as e:
+        return path, f"unreadable: {e}"
+
+
+def quarantine_path(path):
+    """labeled_dataset/clear_road/x.jpg -> quarantine/labeled_dataset/clear_road/x.jpg"""
+    return os.path.join(QUARANTINE_FOLDER, os.path.normpath(path))
+
+
+def scan(folders=SCAN_FOLDERS, dry_run=DRY_RUN, workers=WORKERS):
+    """Checks every new or changed image in a process pool and quarantines the bad ones."""
+    start = time.perf_counter()
+    catalog = ImageCatalog()
+
+    to_check = []
+    for folder, labeled in folders.items():
+        if not os.path.isdir(folder):
+            continue
+        catalog.scan(folder, labeled=labeled)
+        pending = catalog.unverified(folder)
+        print(f"{folder}: {len(pending)} new or changed files to check.")
+        to_check.extend(pending)
+
+    bad = []
+    good = []
+    if to_check:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, problem in pool.map(check_image, to_check, chunksize=64):
+                if problem is None:
+                    good.append(path)
+                else:
+                    bad.append((path, problem))
+                    print(f"[BAD] {path}: {problem}")
+
+    # Good files are remembered, so tomorrow's run skips them unless they change
+    catalog.record_verified(good)
+
+    report = {"time": datetime.now().isoformat(timespec="seconds"), "checked": len(to_check),
+              "bad": [], "dry_run": dry_run}
+    for path, problem in bad:
+        entry = {"path": path, "problem": problem}
+        if not dry_run:
+            target = quarantine_path(path)
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+                catalog.record_delete(path)
+                entry["moved_to"] = target
+            except Exception as e:
+                entry["error"] = str(e)
+                print(f"Could not quarantine {path}: {e}")
+        report["bad"].append(entry)
+    catalog.close()
+
+    print("-" * 30)
+    print(f"Checked {len(to_check)} files in {time.perf_counter() - start:.1f}s: "
+          f"{len(good)} OK, {len(bad)} bad.")
+    if bad:
+        os.makedirs(QUARANTINE_FOLDER, exist_ok=True)
+        report_path = os.path.join(QUARANTINE_FOLDER, f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        action = "Would quarantine" if dry_run else "Quarantined"
+        print(f"{action} {len(bad)} files. Report: {report_path}")
+    return report
+
+
+if __name__ == "__main__":
+    scan()
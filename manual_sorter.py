@@ -1,20 +1,28 @@
 import os
-import shutil
 import tkinter as tk
-import random
-from PIL import Image, ImageTk, ImageEnhance
+from tkinter import messagebox
+from PIL import ImageTk
+from image_catalog import ImageCatalog
+from image_prefetch import PrefetchLoader
+from thumbnail_cache import ThumbnailCache
+from file_journal import FileJournal, POLL_MS
+from integrity_scan import quarantine_path
+from config import SOURCE_FOLDER, DATASET_PATH
 
 # --- CONFIGURATION ---
-SOURCE_FOLDER = "traffic_screenshots"
 FOLDERS = {
-    '1': "labeled_dataset/fully_covered",
-    '2': "labeled_dataset/partially_covered",
-    '3': "labeled_dataset/clear_road"
+    '1': os.path.join(DATASET_PATH, "fully_covered"),
+    '2': os.path.join(DATASET_PATH, "partially_covered"),
+    '3': os.path.join(DATASET_PATH, "clear_road")
 }
 
-# --- SETTINGS ---
-KEEP_ORIGINAL = True     # Set to False if you want to DELETE the original after creating augmented copies
-DO_AUGMENTATION = True   # Set to False to disable the "Cheat Code" entirely
+# NOTE: Augmented copies are no longer written to disk here.
+# train_model.py now flips / rotates / brightens on the fly (see augment.py).
+
+# --- MODEL-ASSISTED LABELING (run prelabel.py first) ---
+QUEUE_ORDER = "uncertain"       # "uncertain" = hardest images first, "path" = plain file order
+BULK_ACCEPT_CONFIDENCE = 0.95   # 'A' accepts every remaining AI guess at or above this confidence
+CLASS_TO_KEY = {os.path.basename(folder): key for key, folder in FOLDERS.items()}
 
 class ImageSorter:
     def __init__(self, master):
@@ -26,18 +34,42 @@ class ImageSorter:
             if not os.path.exists(path):
                 os.makedirs(path)
 
-        # Get images
-        self.image_list = [f for f in os.listdir(SOURCE_FOLDER) if f.endswith(('.png', '.jpg', '.jpeg'))]
+        # Get images (from the catalog; only new/changed folders are re-read)
+        self.catalog = ImageCatalog()
+        self.catalog.scan(SOURCE_FOLDER)
+        rows = self.catalog.query(root=SOURCE_FOLDER, order_by=QUEUE_ORDER)
+        self.image_list = [row["filename"] for row in rows]
+        self.guesses = {row["filename"]: (row["pred_label"], row["confidence"])
+                        for row in rows if row["pred_label"] is not None}
         self.current_index = 0
 
+        # File moves/deletes run in the background through an undoable journal.
+        # Resume where the last session stopped.
+        # The catalog is only updated once a move has really happened (see poll_journal).
+        self.journal = FileJournal("sorter")
+        last = self.journal.last_position()
+        if last in self.image_list:
+            self.current_index = self.image_list.index(last)
+        self.master.after(POLL_MS, self.poll_journal)
+
+        # Decodes the next few images on worker threads while you look at this one.
+        # Thumbnails are kept on disk, so the next session reads small pre-scaled files.
+        self.thumbs = ThumbnailCache()
+        self.loader = None
+        self.reset_loader()
+
         # UI
-        instructions = "KEYS:\n1: Full Snow\n2: Partial\n3: Clear\n\nX: DELETE Image (Junk)"
+        instructions = ("KEYS:\n1: Full Snow\n2: Partial\n3: Clear\n\nX: DELETE Image (Junk)\nZ: Undo\n"
+                        f"ENTER: Accept AI guess\nA: Accept all AI guesses >= {BULK_ACCEPT_CONFIDENCE:.0%}")
         self.label_instruction = tk.Label(master, text=instructions, font=("Arial", 14, "bold"), justify="left")
         self.label_instruction.pack(pady=10)
 
         self.canvas = tk.Label(master)
         self.canvas.pack()
 
+        self.label_guess = tk.Label(master, text="", font=("Arial", 12, "bold"), fg="purple")
+        self.label_guess.pack()
+
         self.label_status = tk.Label(master, text="", font=("Arial", 10))
         self.label_status.pack(pady=10)
 
@@ -47,27 +79,64 @@ class ImageSorter:
         master.bind('3', lambda e: self.process_image('3'))
         master.bind('x', lambda e: self.delete_image()) # New "Trash" Key
         master.bind('X', lambda e: self.delete_image()) 
+        master.bind('<Return>', lambda e: self.accept_guess())
+        master.bind('a', lambda e: self.bulk_accept())
+        master.bind('A', lambda e: self.bulk_accept())
+        master.bind('z', lambda e: self.undo())
+        master.bind('<Control-z>', lambda e: self.undo())
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.load_image()
 
+    def reset_loader(self):
+        """(Re)starts the prefetcher after the image list changed."""
+        if self.loader:
+            self.loader.close()
+        self.loader = PrefetchLoader([os.path.join(SOURCE_FOLDER, name) for name in self.image_list],
+                                     decode=self.thumbs.load)
+
+    def poll_journal(self):
+        """Applies finished background moves to the catalog (on the Tk thread, which owns it)."""
+        self.journal.poll()
+        self.master.after(POLL_MS, self.poll_journal)
+
+    def on_close(self):
+        print("Finishing queued file operations...")
+        self.journal.close()
+        self.master.destroy()
+
     def load_image(self):
         if self.current_index >= len(self.image_list):
             self.label_status.config(text="No more images to sort!")
+            self.label_guess.config(text="")
             self.canvas.config(image='')
             return
 
         image_name = self.image_list[self.current_index]
-        image_path = os.path.join(SOURCE_FOLDER, image_name)
+        self.journal.save_position(image_name)
 
         try:
-            img = Image.open(image_path)
-            img.thumbnail((800, 600))
+            img = self.loader.get(self.current_index)  # Already decoded in the background
             self.photo = ImageTk.PhotoImage(img)
             self.canvas.config(image=self.photo)
             self.label_status.config(text=f"Image {self.current_index + 1} / {len(self.image_list)}: {image_name}")
+            guess = self.guesses.get(image_name)
+            self.label_guess.config(text=f"AI guess: {guess[0]} ({guess[1]:.0%})" if guess else "AI guess: -")
         except Exception as e:
             print(f"Error loading {image_name}: {e}")
-            self.delete_image() # Auto-delete corrupted files
+            self.quarantine_image() # Move corrupted files aside (see integrity_scan.py)
+
+    def quarantine_image(self):
+        """Moves an unreadable image to the quarantine folder instead of deleting it."""
+        filename = self.image_list[self.current_index]
+        file_path = os.path.join(SOURCE_FOLDER, filename)
+        self.journal.move(file_path, quarantine_path(file_path), index=self.current_index,
+                          on_done=lambda: self.catalog.record_delete(file_path))
+        self.loader.discard(file_path)
+        print(f"Quarantined unreadable file: {filename}")
+
+        self.current_index += 1
+        self.load_image()
 
     def delete_image(self):
         """Deletes the current image from source without labeling."""
@@ -76,60 +145,94 @@ class ImageSorter:
         filename = self.image_list[self.current_index]
         file_path = os.path.join(SOURCE_FOLDER, filename)
         
-        try:
-            os.remove(file_path) # <--- THIS DELETE COMMAND
-            print(f"Deleted junk file: {filename}")
-        except Exception as e:
-            print(f"Could not delete: {e}")
+        # Goes to the trash folder in the background, so 'Z' can bring it back
+        self.journal.delete(file_path, index=self.current_index, on_done=lambda: self.catalog.record_delete(file_path))
+        self.loader.discard(file_path)
+        print(f"Deleted junk file: {filename}")
 
         self.current_index += 1
         self.load_image()
 
-    def process_image(self, key):
-        if self.current_index >= len(self.image_list): return
-
-        filename = self.image_list[self.current_index]
+    def move_to_class(self, filename, key, index=None):
+        """Queues the move of one file from the source folder into its class folder."""
         src_path = os.path.join(SOURCE_FOLDER, filename)
         target_folder = FOLDERS[key]
-        
-        # 1. Load image into memory first
-        try:
-            with Image.open(src_path) as img:
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                base_name = os.path.splitext(filename)[0]
-
-                # 2. Generate Augmented Copies (The "Cheat Code")
-                if DO_AUGMENTATION:
-                    # Flip
-                    img.transpose(Image.FLIP_LEFT_RIGHT).save(os.path.join(target_folder, f"{base_name}_flip.jpg"))
-                    # Rotate
-                    img.rotate(random.uniform(-10, 10)).save(os.path.join(target_folder, f"{base_name}_rot1.jpg"))
-                    img.rotate(random.uniform(-10, 10)).save(os.path.join(target_folder, f"{base_name}_rot2.jpg"))
-                    # Brightness
-                    enhancer = ImageEnhance.Brightness(img)
-                    enhancer.enhance(random.uniform(0.7, 1.3)).save(os.path.join(target_folder, f"{base_name}_light1.jpg"))
-
-                # 3. Handle the Original File
-                if KEEP_ORIGINAL:
-                    # Save a copy of the original to the destination
-                    img.save(os.path.join(target_folder, filename))
-            
-            # 4. DELETE from Source (This cleans your traffic_screenshots folder)
-            os.remove(src_path)
-            print(f"Processed {filename} -> {target_folder}")
 
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
+        # Move the original straight into its class folder (no re-encode, no copies).
+        # The journal does the actual disk work on a background thread.
+        dst_path = os.path.join(target_folder, filename)
+        self.journal.move(src_path, dst_path, index=index, on_done=lambda: self.catalog.record_move(
+            src_path, dst_path, os.path.dirname(target_folder), os.path.basename(target_folder)))
+        self.loader.discard(src_path)
+        print(f"Processed {filename} -> {target_folder}")
+
+    def process_image(self, key):
+        if self.current_index >= len(self.image_list): return
+
+        self.move_to_class(self.image_list[self.current_index], key, index=self.current_index)
 
         self.current_index += 1
         self.load_image()
 
-if __name__ == "__main__":
+    def accept_guess(self):
+        """ENTER: label the current image with the model's guess."""
+        if self.current_index >= len(self.image_list): return
+
+        guess = self.guesses.get(self.image_list[self.current_index])
+        if guess and guess[0] in CLASS_TO_KEY:
+            self.process_image(CLASS_TO_KEY[guess[0]])
+
+    def bulk_accept(self):
+        """A: label every remaining image whose AI guess is confident enough, in one go."""
+        remaining = self.image_list[self.current_index:]
+        confident = [name for name in remaining
+                     if name in self.guesses
+                     and self.guesses[name][0] in CLASS_TO_KEY
+                     and self.guesses[name][1] >= BULK_ACCEPT_CONFIDENCE]
+        if not confident:
+            messagebox.showinfo("Bulk accept", f"No remaining guesses at or above {BULK_ACCEPT_CONFIDENCE:.0%}.")
+            return
+        if not messagebox.askyesno("Bulk accept", f"Accept the AI guess for {len(confident)} images?"):
+            return
+
+        for name in confident:
+            self.move_to_class(name, CLASS_TO_KEY[self.guesses[name][0]])
+        accepted = set(confident)
+        print(f"Bulk-accepted {len(accepted)} images.")
+
+        # Keep everything already seen, drop the accepted ones from the rest of the queue
+        self.image_list = self.image_list[:self.current_index] + [n for n in remaining if n not in accepted]
+        self.reset_loader()
+        self.load_image()
+
+    def undo(self):
+        """Z: puts the last labeled/deleted image back in the source folder and shows it again."""
+        # Wait for the file to be back, or load_image() would see it missing and quarantine it
+        action = self.journal.undo(wait=True, on_done=lambda a: self.catalog.record_move(
+            a["dst"], a["src"], SOURCE_FOLDER, None))
+        if action is None:
+            print("Nothing to undo.")
+            return
+
+        filename = os.path.basename(action["src"])
+        print(f"Undo: {filename} back to {SOURCE_FOLDER}")
+
+        index = action.get("index")
+        if index is not None and index < len(self.image_list) and self.image_list[index] == filename:
+            self.current_index = index
+        else:
+            # e.g. a bulk-accepted image: put it back in front of the queue
+            self.image_list.insert(self.current_index, filename)
+            self.reset_loader()
+        self.load_image()
+
+def main():
     if not os.path.exists(SOURCE_FOLDER):
         print(f"Source folder '{SOURCE_FOLDER}' not found.")
-    else:
-        root = tk.Tk()
-        app = ImageSorter(root)
-        root.mainloop()
\ No newline at end of file
+        return
+    root = tk.Tk()
+    app = ImageSorter(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
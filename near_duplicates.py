@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# --- CONFIGURATION ---
+HASH_SIZE = 8          # 8x8 difference hash = 64 bits
+MAX_DISTANCE = 4       # Hamming distance (out of 64) that still counts as "the same picture"
+MIN_HASH_BITS = 6      # Hashes with fewer set bits come from flat frames (night, blank slates): no detail to compare
+WORKERS = os.cpu_count() or 4
+
+
+def dhash(path, hash_size=HASH_SIZE):
+    """
+    Difference hash: shrink to (hash_size+1) x hash_size greyscale and compare neighbours.
+    Robust to re-encoding, small brightness changes and resizing; returns an int.
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft('L', (hash_size * 8, hash_size * 8))  # Fast reduced-size JPEG decode
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def _hash_one(path):
+    try:
+        return path, dhash(path)
+    except Exception as e:
+        print(f"Could not hash {path}: {e}")
+        return path, None
+
+
+def hash_files(paths, workers=WORKERS):
+    """{path: hash} for all readable files, computed in a process pool."""
+    if not paths:
+        return {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return {p: h for p, h in pool.map(_hash_one, paths, chunksize=64) if h is not None}
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def is_uniform(value, min_bits=MIN_HASH_BITS):
+    """True for the (near-)zero hashes of dark or featureless frames, which all look alike to dhash."""
+    return bin(value).count('1') < min_bits
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over Hamming distance. A radius query only visits the
+    children whose edge distance is within [d - r, d + r] (triangle inequality),
+    so finding near neighbours does not compare every pair.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, item, {distance: child}]
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, item, {}]
+                return
+            node = child
+
+    def query(self, value, radius):
+        """All (distance, item) within 'radius' of value."""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                found.append((d, node[1]))
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return found
+
+
+def find_clusters(hashes, order, max_distance=MAX_DISTANCE):
+    """
+    Groups near-identical images. 'order' is the list of paths in priority order
+    (the first one of each cluster is the one we keep, e.g. earliest capture).
+    Every member is within max_distance of its cluster's representative, so slowly
+    changing scenes do not chain a whole day of frames into one cluster.
+    Returns a list of (representative, [duplicates]).
+    """
+    rank = {path: i for i, path in enumerate(order)}
+    tree = BKTree()
+    for path in order:
+        if path in hashes:
+            tree.add(hashes[path], path)
+
+    assigned = set()
+    clusters = []
+    for path in order:
+        if path in assigned or path not in hashes:
+            continue
+        assigned.add(path)
+        duplicates = sorted((p for _, p in tree.query(hashes[path], max_distance) if p not in assigned),
+                            key=rank.get)
+        assigned.update(duplicates)
+        if duplicates:
+            clusters.append((path, duplicates))
+    return clusters
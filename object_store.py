@@ -0,0 +1,282 @@
+import csv
+import hashlib
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from image_catalog import parse_capture_name
+from config import DATASET_PATH, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE, SEED
+
+# Train straight from the bucket layout gcp/code.py writes ({PREFIX}/{stream_code}/{stream_code}_{timestamp}.jpg)
+# instead of bulk-copying it first. Objects are fetched concurrently into a size-bounded local
+# read-through cache, so the first epoch overlaps download and training and later epochs (and
+# later runs) read from local disk.
+#
+# Storage backends (pick by URI):
+#   gs://bucket              -> Google Cloud Storage (needs google-cloud-storage)
+#   http://host:port/        -> any static file server (e.g. 'python -m http.server' as a stand-in)
+#   /some/folder, file://... -> a local directory with the same layout (tests / offline runs)
+
+# --- CONFIGURATION ---
+OBJECT_PREFIX = "traffic_dataset"          # Same PREFIX as gcp/code.py
+LABEL_MANIFEST = "object_labels.csv"       # key,label (key = object name inside the bucket)
+CACHE_FOLDER = ".object_cache"
+MAX_CACHE_MB = 20 * 1024
+FETCH_WORKERS = 16                         # Concurrent downloads (network-bound, so more than cores)
+FETCH_AHEAD = 256                          # Objects in flight ahead of the training loop
+FETCH_TIMEOUT = 60
+
+
+# --- Backends: read(key) -> bytes (which keys exist comes from the label manifest) ---
+
+class LocalBackend:
+    def __init__(self, root):
+        self.root = root
+
+    def read(self, key):
+        with open(os.path.join(self.root, *key.split("/")), "rb") as f:
+            return f.read()
+
+
+class HTTPBackend:
+    """Plain GET {base_url}/{key}."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def read(self, key):
+        import urllib.request
+        with urllib.request.urlopen(f"{self.base_url}/{key}", timeout=FETCH_TIMEOUT) as response:
+            return response.read()
+
+
+class GCSBackend:
+    def __init__(self, bucket_name):
+        from google.cloud import storage  # Only needed when actually reading from GCS
+        self.bucket = storage.Client().bucket(bucket_name)
+
+    def read(self, key):
+        return self.bucket.blob(key).download_as_bytes(timeout=FETCH_TIMEOUT)
+
+
+def open_backend(uri):
+    if uri.startswith("gs://"):
+        return GCSBackend(uri[len("gs://"):].strip("/"))
+    if uri.startswith(("http://", "https://")):
+        return HTTPBackend(uri)
+    if uri.startswith("file://"):
+        uri = uri[len("file://"):]
+    return LocalBackend(uri)
+
+
+# --- Local read-through cache ---
+
+class ReadThroughCache:
+    """
+    key -> local file. Misses are fetched from the backend and written atomically; the least
+    recently used files are evicted above max_mb (the files handed out most recently are never
+    evicted, so tf.data can still open them).
+    """
+
+    def __init__(self, backend, cache_folder=CACHE_FOLDER, max_mb=MAX_CACHE_MB, pinned=FETCH_AHEAD * 2):
+        self.backend = backend
+        self.cache_folder = cache_folder
+        self.max_bytes = max_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=pinned)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_folder, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    def path_for(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_folder, digest[:2], digest + os.path.splitext(key)[1])
+
+    def _entries(self):
+        for sub in os.scandir(self.cache_folder):
+            if sub.is_dir():
+                for entry in os.scandir(sub.path):
+                    if not entry.name.endswith(".tmp"):
+                        st = entry.stat()
+                        yield st.st_mtime, entry.path, st.st_size
+
+    def get(self, key):
+        path = self.path_for(key)
+        # Check and pin under the lock: evict() holds it for its whole pass, so it either ran
+        # before (and the file is gone) or will see the path in 'recent' and leave it alone
+        with self.lock:
+            cached = os.path.exists(path)
+            if cached:
+                self.recent.append(path)
+        if cached:
+            try:
+                os.utime(path)  # Recently used
+                with self.lock:
+                    self.hits += 1
+                return path
+            except OSError:
+                pass  # Removed behind our back after all: fetch it again
+
+        data = self.backend.read(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        with self.lock:
+            self.recent.append(path)  # Pinned before it appears, for the same reason
+        os.replace(tmp, path)
+        with self.lock:
+            self.misses += 1
+            self.total_bytes += len(data)
+            over = self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def evict(self):
+        with self.lock:
+            entries = sorted(self._entries())
+            self.total_bytes = sum(size for _, _, size in entries)
+            keep = set(self.recent)
+            target = self.max_bytes * 0.9
+            for _, path, size in entries:
+                if self.total_bytes <= target:
+                    break
+                if path in keep:
+                    continue
+                try:
+                    os.remove(path)
+                    self.total_bytes -= size
+                except OSError:
+                    pass
+
+
+# --- Manifest ---
+
+def read_manifest(path=LABEL_MANIFEST):
+    """[(key, label)] from a key,label CSV."""
+    with open(path, newline='') as f:
+        return [(row["key"], row["label"]) for row in csv.DictReader(f)]
+
+
+def write_manifest_from_labels(dataset_path=DATASET_PATH, manifest_path=LABEL_MANIFEST, prefix=OBJECT_PREFIX):
+    """
+    Turns the labels in labeled_dataset (one folder per class) into a manifest of bucket keys,
+    using the object layout of gcp/code.py: {prefix}/{stream_code}/{filename}.
+    """
+    rows = []
+    for label in sorted(os.listdir(dataset_path)):
+        folder = os.path.join(dataset_path, label)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            stream_code, _ = parse_capture_name(name)
+            rows.append({"key": f"{prefix}/{stream_code}/{name}", "label": label})
+    with open(manifest_path, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["key", "label"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Wrote {len(rows)} labeled keys to {manifest_path}.")
+    return rows
+
+
+# --- Fetching ---
+
+def fetch_in_order(cache, keys, workers=FETCH_WORKERS, ahead=FETCH_AHEAD):
+    """
+    Yields (key, local path or None) in the order of 'keys', keeping up to 'ahead' fetches in flight,
+    so downloads run while the consumer (tf.data / training) works on earlier objects.
+    """
+    def _get(key):
+        try:
+            return cache.get(key)
+        except Exception as e:
+            print(f"Could not fetch {key}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        keys = iter(keys)
+        for key in keys:
+            pending.append((key, pool.submit(_get, key)))
+            if len(pending) >= ahead:
+                break
+        while pending:
+            key, future = pending.popleft()
+            for nxt in keys:
+                pending.append((nxt, pool.submit(_get, nxt)))
+                break
+            yield key, future.result()
+
+
+def object_dataset(uri, items, class_names, image_size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE,
+                   shuffle=False, seed=SEED, cache=None):
+    """
+    Batched tf.data dataset (float images 0-255, int labels, like image_dataset_from_directory)
+    streaming the (key, label) items from the object store through the local cache.
+    Each epoch re-shuffles (seed + epoch) when shuffle=True.
+    """
+    import tensorflow as tf
+    from preprocess import tf_loader
+
+    cache = cache or ReadThroughCache(open_backend(uri))
+    index = {name: i for i, name in enumerate(class_names)}
+    items = [(key, index[label]) for key, label in items if label in index]
+    epoch = [0]
+
+    def _generate():
+        order = list(items)
+        if shuffle:
+            random.Random(seed + epoch[0]).shuffle(order)
+        epoch[0] += 1
+        labels = dict(order)
+        for key, path in fetch_in_order(cache, [key for key, _ in order]):
+            if path is None:
+                continue
+            # Read here rather than handing tf.data the path: the cache may evict it before
+            # the map gets to it
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                try:
+                    data = cache.backend.read(key)  # Evicted since it was fetched: straight from the store
+                except Exception as e:
+                    print(f"Could not fetch {key}: {e}")
+                    continue
+            yield data, labels[key]
+        print(f"\nObject cache: {cache.hits} hits, {cache.misses} downloads so far.")
+
+    ds = tf.data.Dataset.from_generator(
+        _generate, output_signature=(tf.TensorSpec((), tf.string), tf.TensorSpec((), tf.int32)))
+    return ds.map(tf_loader(image_size, from_bytes=True), num_parallel_calls=tf.data.AUTOTUNE).batch(batch_size)
+
+
+def load_object_splits(uri, manifest_path=LABEL_MANIFEST, image_size=(IMG_HEIGHT, IMG_WIDTH),
+                       batch_size=BATCH_SIZE):
+    """
+    (train_ds, val_ds, class_names) for an object-store dataset. Objects are split by camera + day
+    with the same stable hash as split_dataset.py, so a frame lands in the same split either way.
+    """
+    from split_dataset import assign_split, group_key
+
+    items = read_manifest(manifest_path)
+    class_names = sorted({label for _, label in items})
+    splits = {}
+    for key, label in items:
+        stream_code, captured_at = parse_capture_name(key)
+        split = assign_split(group_key({"stream_code": stream_code, "captured_at": captured_at}))
+        splits.setdefault(split, []).append((key, label))
+    print(f"Object store {uri}: " + ", ".join(f"{s} {len(v)}" for s, v in sorted(splits.items())))
+
+    cache = ReadThroughCache(open_backend(uri))
+    train_ds = object_dataset(uri, splits.get("train", []), class_names, image_size, batch_size,
+                              shuffle=True, cache=cache)
+    val_ds = object_dataset(uri, splits.get("validation", []), class_names, image_size, batch_size, cache=cache)
+    return train_ds, val_ds, class_names
+
+
+if __name__ == "__main__":
+    write_manifest_from_labels()
@@ -1,14 +1,20 @@
 import tensorflow as tf
 import numpy as np
 import os
+from config import MODEL_PATH, CLASS_NAMES, SOURCE_FOLDER, IMG_HEIGHT, IMG_WIDTH, STATUS_URL, USE_CASCADE, CASCADE_PATH
+from image_catalog import parse_capture_name
+from status_store import post_status
+from frame_quality import check_file
+from preprocess import load_image, model_input
 
-# --- CONFIGURATION ---
-MODEL_PATH = "road_model.keras"
-# Define your classes exactly as they appear in your labeled_dataset folders
-# Usually they are alphabetical:
-CLASS_NAMES = ['clear_road', 'fully_covered', 'partially_covered'] 
+def load_model():
+    """The full model, or the tiny -> full cascade if it is enabled and calibrated (cascade.py)."""
+    if USE_CASCADE and os.path.exists(CASCADE_PATH):
+        from cascade import CascadeClassifier
+        return CascadeClassifier()
+    return tf.keras.models.load_model(MODEL_PATH)
 
-def predict_road_condition(image_path):
+def predict_road_condition(image_path, model=None):
     # 1. Check if file exists
     if not os.path.exists(image_path):
         print(f"Error: The file '{image_path}' does not exist.")
@@ -16,20 +22,23 @@ def predict_road_condition(image_path):
 
     print(f"\nAnalyzing: {image_path} ...")
 
+    # Don't waste a CNN pass on black / slate / smeared frames
+    quality = check_file(image_path)
+    if not quality["ok"]:
+        print(f"Skipped: frame failed the quality check ({', '.join(quality['reasons'])}).")
+        return None
+
     # 2. Load the trained brain
-    # (We load it here, but in a real loop you'd load it once at the top)
-    model = tf.keras.models.load_model(MODEL_PATH)
+    # (Pass 'model' in when predicting many images, so it is only loaded once)
+    if model is None:
+        model = load_model()
 
     # 3. Pre-process the image
-    # The AI expects a 180x180 pixel square, just like we trained it
-    img = tf.keras.utils.load_img(image_path, target_size=(180, 180))
-    
-    # Convert image to an array of numbers
-    img_array = tf.keras.utils.img_to_array(img)
-    img_array = tf.expand_dims(img_array, 0) # Create a batch of 1
+    # The AI expects a 180x180 pixel square, decoded exactly like the training images
+    img_array = model_input(load_image(image_path, (IMG_HEIGHT, IMG_WIDTH))[np.newaxis])  # Batch of 1
 
     # 4. Make the Prediction
-    predictions = model.predict(img_array)
+    predictions = model.predict(img_array, verbose=0)
     score = tf.nn.softmax(predictions[0])
 
     # 5. Interpret Results
@@ -47,14 +56,31 @@ def predict_road_condition(image_path):
     for i, class_name in enumerate(CLASS_NAMES):
         print(f"  - {class_name}: {100 * score[i]:.2f}%")
 
-if __name__ == "__main__":
+    # 6. Publish it to the live status API (the camera and time come from the file name)
+    if STATUS_URL:
+        stream_code, captured_at = parse_capture_name(image_path)
+        post_status(STATUS_URL, stream_code, top_class_name, float(np.max(score)), captured_at)
+
+    return top_class_name, float(np.max(score))
+
+def main(image_paths=None):
+    if image_paths:
+        model = load_model()
+        for image_path in image_paths:
+            predict_road_condition(image_path, model)
+        return
+
     # --- CHANGE THIS TO TEST DIFFERENT IMAGES ---
-    test_image = "traffic_screenshots/test_image.png" 
+    test_image = os.path.join(SOURCE_FOLDER, "test_image.png")
     
     # If that file doesn't exist, let's just pick the first one we find to test
     if not os.path.exists(test_image):
-        all_files = os.listdir("traffic_screenshots")
+        all_files = os.listdir(SOURCE_FOLDER)
         if all_files:
-            test_image = os.path.join("traffic_screenshots", all_files[0])
+            test_image = os.path.join(SOURCE_FOLDER, all_files[0])
     
-    predict_road_condition(test_image)
\ No newline at end of file
+    predict_road_condition(test_image)
+
+if __name__ == "__main__":
+    import sys
+    main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import tensorflow as tf
+from image_catalog import ImageCatalog, model_key
+from preprocess import BatchDecoder, model_input
+from config import SOURCE_FOLDER, DATASET_PATH, MODEL_PATH, CLASS_NAMES, IMG_HEIGHT, IMG_WIDTH
+
+# --- CONFIGURATION ---
+BATCH_SIZE = 64
+
+
+def scores_to_guesses(logits):
+    """Softmax -> (class index, confidence, margin between the top two classes) per image."""
+    probs = tf.nn.softmax(logits, axis=1).numpy()
+    top2 = np.sort(probs, axis=1)[:, -2:]
+    return np.argmax(probs, axis=1), top2[:, 1], top2[:, 1] - top2[:, 0]
+
+
+def prelabel(source_folder=SOURCE_FOLDER, model_path=MODEL_PATH, labeled=False):
+    """
+    Batch-classifies every image in 'source_folder' that has no up-to-date prediction yet
+    and stores (predicted class, confidence, margin) in the catalog for the sorter.
+    Use labeled=True for labeled_dataset (so the grid reviewer can sort by predicted class).
+    """
+    if not os.path.exists(model_path):
+        print(f"Error: model '{model_path}' not found. Train one first.")
+        return 0
+
+    catalog = ImageCatalog()
+    catalog.scan(source_folder, labeled=labeled)
+    model_name = model_key(model_path)  # Name + content hash: retraining in place re-runs everything
+    paths = catalog.unpredicted(source_folder, model_name)
+    if not paths:
+        print("Every image already has a prediction.")
+        catalog.close()
+        return 0
+
+    print(f"Pre-labeling {len(paths)} images with {model_path}...")
+    model = tf.keras.models.load_model(model_path)
+
+    # Unreadable files are skipped here; the sorter will still show (and let you delete) them
+    decoder = BatchDecoder((IMG_HEIGHT, IMG_WIDTH), BATCH_SIZE)
+    done = 0
+    for start in range(0, len(paths), BATCH_SIZE):
+        batch_paths = paths[start:start + BATCH_SIZE]
+        images, ok = decoder.decode(batch_paths)
+        if not ok.any():
+            continue
+        classes, confidence, margin = scores_to_guesses(model.predict_on_batch(model_input(images[ok])))
+        kept = [p for p, good in zip(batch_paths, ok) if good]
+        rows = [(p, CLASS_NAMES[c], conf, m) for p, c, conf, m in zip(kept, classes, confidence, margin)]
+        catalog.record_predictions(rows, model_name)
+        done += len(rows)
+        print(f"   {done}/{len(paths)}", end="\r")
+    decoder.close()
+
+    print(f"\nDone. Stored predictions for {done} images.")
+    catalog.close()
+    return done
+
+
+if __name__ == "__main__":
+    import sys
+    # python prelabel.py                   -> unlabeled screenshots (for manual_sorter.py)
+    # python prelabel.py labeled_dataset   -> labeled images (for the reviewer's grid mode)
+    folder = sys.argv[1] if len(sys.argv) > 1 else SOURCE_FOLDER
+    prelabel(folder, labeled=(os.path.normpath(folder) == os.path.normpath(DATASET_PATH)))
@@ -0,0 +1,161 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from config import IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE, SEED
+
+# The one place images become model input. Training, evaluation, prediction, pre-labeling and
+# the capture scripts all go through load_image(), so every caller sees the same decode, the
+# same resize filter and RGB channel order (OpenCV frames are BGR: pass bgr=True).
+#
+#   load_image(path_or_frame)        -> (IMG_HEIGHT, IMG_WIDTH, 3) uint8, RGB
+#   BatchDecoder().decode(sources)   -> many of those, decoded on threads into one reused buffer
+#   tf_loader() / dataset_from_paths -> the same function inside tf.data pipelines
+#
+# Changing RESAMPLE (or anything else here) changes what the model sees: retrain afterwards.
+
+# --- CONFIGURATION ---
+RESAMPLE = Image.BILINEAR     # PIL's bilinear widens its kernel when shrinking (proper anti-aliasing)
+DECODE_WORKERS = min(8, os.cpu_count() or 1)   # PIL releases the GIL while decoding and resizing
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+
+def open_rgb(source, bgr=False, draft_size=None):
+    """
+    PIL RGB image from a file path, encoded bytes, a PIL image or an HxWx3 uint8 array
+    (bgr=True for OpenCV frames). draft_size lets libjpeg decode JPEGs at 1/2, 1/4 or 1/8 scale
+    directly, as long as the result stays at least that big.
+    """
+    if isinstance(source, np.ndarray):
+        if bgr:
+            source = source[..., 2::-1]
+        return Image.fromarray(np.ascontiguousarray(source[..., :3]))
+    if isinstance(source, Image.Image):
+        return source.convert('RGB')
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        if draft_size:
+            img.draft('RGB', draft_size)
+        return img.convert('RGB')
+
+
+def load_image(source, size=(IMG_HEIGHT, IMG_WIDTH), bgr=False):
+    """One image as a (height, width, 3) uint8 RGB array: decode, RGB, resize with RESAMPLE."""
+    height, width = size
+    img = open_rgb(source, bgr, draft_size=(width, height))
+    if img.size != (width, height):
+        img = img.resize((width, height), RESAMPLE)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def model_input(images):
+    """uint8 NHWC batch -> float32 0-255, what the models' Rescaling(1/255) layer expects."""
+    return np.asarray(images, dtype=np.float32)
+
+
+class BatchDecoder:
+    """
+    Decodes batches of paths / bytes / frames on a thread pool straight into one preallocated
+    (batch_size, height, width, 3) uint8 buffer. The buffer is reused by the next decode(),
+    so copy what you want to keep.
+    """
+
+    def __init__(self, size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE, workers=DECODE_WORKERS):
+        self.size = size
+        self.buffer = np.empty((batch_size, size[0], size[1], 3), dtype=np.uint8)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def decode(self, sources, bgr=False):
+        """
+        (images, ok): images is a view of the first len(sources) rows of the buffer, ok marks
+        the rows that decoded (unreadable files are reported and left as garbage).
+        """
+        n = len(sources)
+        if n > len(self.buffer):
+            self.buffer = np.empty((n,) + self.buffer.shape[1:], dtype=np.uint8)
+        ok = np.zeros(n, dtype=bool)
+
+        def _one(i):
+            try:
+                self.buffer[i] = load_image(sources[i], self.size, bgr)
+                ok[i] = True
+            except Exception as e:
+                print(f"Could not decode {sources[i] if isinstance(sources[i], str) else f'#{i}'}: {e}")
+
+        list(self.pool.map(_one, range(n)))
+        return self.buffer[:n], ok
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- tf.data ---
+
+def tf_loader(size=(IMG_HEIGHT, IMG_WIDTH), from_bytes=False):
+    """
+    (path, label) -> (float32 image 0-255, label) for Dataset.map, decoded by load_image().
+    from_bytes=True when the dataset yields the encoded file contents instead of paths.
+    """
+    import tensorflow as tf
+
+    def _decode(value):
+        return load_image(value if from_bytes else value.decode('utf-8'), size)
+
+    def _load(path, label):
+        image = tf.numpy_function(_decode, [path], tf.uint8, stateful=False)
+        image.set_shape((size[0], size[1], 3))
+        return tf.cast(image, tf.float32), label
+
+    return _load
+
+
+def dataset_from_paths(paths, labels, size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE, shuffle=False, seed=SEED):
+    """Batched (float images 0-255, int labels), like image_dataset_from_directory."""
+    import tensorflow as tf
+
+    ds = tf.data.Dataset.from_tensor_slices((list(paths), list(labels)))
+    if shuffle:
+        ds = ds.shuffle(max(1, len(paths)), seed=seed)
+    return ds.map(tf_loader(size), num_parallel_calls=tf.data.AUTOTUNE).batch(batch_size)
+
+
+def dataset_from_directory(directory, size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE, shuffle=True,
+                           seed=SEED, validation_split=None, subset=None):
+    """
+    Drop-in for image_dataset_from_directory with the same file selection (Keras still picks the
+    files, so old validation_split splits stay exactly the same), decoded by load_image().
+    Returns (dataset, class_names, paths).
+    """
+    import tensorflow as tf
+
+    index = tf.keras.utils.image_dataset_from_directory(
+        directory, validation_split=validation_split, subset=subset, seed=seed,
+        image_size=size, batch_size=batch_size, shuffle=shuffle)
+    class_names = index.class_names
+    paths = list(index.file_paths)
+    labels = [class_names.index(os.path.basename(os.path.dirname(p))) for p in paths]
+    return dataset_from_paths(paths, labels, size, batch_size, shuffle, seed), class_names, paths
+
+
+if __name__ == "__main__":
+    # python preprocess.py some_folder   -> decode speed of this module on that folder
+    import sys
+    import time
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else "."
+    files = [os.path.join(folder, n) for n in sorted(os.listdir(folder)) if n.lower().endswith(IMAGE_EXTENSIONS)]
+    with BatchDecoder() as decoder:
+        start, done = time.perf_counter(), 0
+        for i in range(0, len(files), len(decoder.buffer)):
+            images, ok = decoder.decode(files[i:i + len(decoder.buffer)])
+            done += int(ok.sum())
+        seconds = time.perf_counter() - start
+    print(f"Decoded {done}/{len(files)} images in {seconds:.2f}s ({done / max(seconds, 1e-9):.0f} images/s).")
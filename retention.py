@@ -0,0 +1,217 @@
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from image_catalog import ImageCatalog
+from config import SOURCE_FOLDER, CAPTURE_FOLDER, DATASET_PATH
+
+# --- CONFIGURATION ---
+# Raw capture folders to keep small. labeled_dataset is NEVER touched.
+RETENTION_FOLDERS = [SOURCE_FOLDER, CAPTURE_FOLDER]
+
+# Tiers by capture age (applied oldest tier first, each run only touches what is not compacted yet):
+#   "downsample" -> re-encode at most max_side pixels on the long side (same file name and format)
+#   "thin"       -> keep one frame per camera per "hour" / "day", archive (or delete) the rest
+RETENTION_TIERS = [
+    {"older_than_days": 7, "action": "downsample", "max_side": 640, "jpeg_quality": 80},
+    {"older_than_days": 90, "action": "thin", "keep_one_per": "hour"},
+]
+
+ARCHIVE_FOLDER = "archive"   # Thinned-out frames go into {folder}_{YYYY-MM}.zip bundles here
+ARCHIVE_THINNED = True       # False = thinned-out frames are deleted for good
+WORKERS = os.cpu_count() or 4
+
+# Set to True to only print what would happen
+DRY_RUN = False
+
+BUCKETS = {"hour": 13, "day": 10}  # Length of the ISO timestamp prefix that identifies a bucket
+
+
+def downsample_file(args):
+    """Shrinks one image in place (atomic replace). Returns (path, bytes before, bytes after, error)."""
+    path, max_side, jpeg_quality = args
+    from PIL import Image
+
+    try:
+        before = os.path.getsize(path)
+        with Image.open(path) as img:
+            fmt = img.format
+            if max(img.size) <= max_side:
+                return path, before, before, None
+            img.draft('RGB', (max_side, max_side))
+            img = img.convert('RGB')
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        root, ext = os.path.splitext(path)
+        tmp = f"{root}.retention_tmp{ext}"
+        if fmt == "JPEG":
+            img.save(tmp, "JPEG", quality=jpeg_quality, optimize=True)
+        else:
+            img.save(tmp, fmt, optimize=True)
+        os.replace(tmp, path)
+        return path, before, os.path.getsize(path), None
+    except Exception as e:
+        return path, 0, 0, str(e)
+
+
+def estimate_downsample(row, max_side):
+    """Bytes a downsample would save, assuming the file size scales with the pixel count (dry runs)."""
+    long_side = max(row["width"] or 0, row["height"] or 0)
+    if not row["size"] or long_side <= max_side:
+        return 0
+    return int(row["size"] * (1 - (max_side / long_side) ** 2))
+
+
+def plan_thinning(rows, keep_one_per, protected):
+    """
+    rows: catalog rows sorted by camera then capture time.
+    Keeps the first frame of every (camera, hour/day) bucket and every protected file;
+    returns the rows to drop.
+    """
+    prefix = BUCKETS[keep_one_per]
+    kept = set()
+    drop = []
+    for row in rows:
+        if row["filename"] in protected:
+            continue
+        bucket = (row["stream_code"], (row["captured_at"] or "")[:prefix])
+        if bucket in kept:
+            drop.append(row)
+        else:
+            kept.add(bucket)
+    return drop
+
+
+def archive_rows(catalog, folder, rows):
+    """Packs files into monthly zip bundles and records them in the catalog. The caller deletes the originals."""
+    os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+    by_bundle = {}
+    for row in rows:
+        month = (row["captured_at"] or "unknown")[:7]
+        name = f"{os.path.basename(os.path.normpath(folder))}_{month}.zip"
+        by_bundle.setdefault(os.path.join(ARCHIVE_FOLDER, name), []).append(row["path"])
+
+    archived = []
+    for bundle, paths in by_bundle.items():
+        # Images are already compressed, so store them as-is (fast, and members can be read directly)
+        with zipfile.ZipFile(bundle, "a", compression=zipfile.ZIP_STORED) as zf:
+            existing = set(zf.namelist())  # Re-run after a crash: don't add the same file twice
+            for path in paths:
+                member = os.path.basename(path)  # Capture folders are flat
+                if member not in existing:
+                    zf.write(path, member)
+        catalog.record_archived(paths, bundle)
+        archived.extend(paths)
+    return archived
+
+
+def restore(path, dest=None):
+    """Extracts one archived frame (its original path, e.g. traffic_dataset/CAM1_20240101_120000.jpg)."""
+    catalog = ImageCatalog()
+    rows = catalog.archived(path=path)
+    catalog.close()
+    if not rows:
+        print(f"'{path}' is not in the archive index.")
+        return None
+    dest = dest or path
+    member = os.path.basename(path)
+    with zipfile.ZipFile(rows[0]["bundle"]) as zf:
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        with zf.open(member) as src, open(dest, "wb") as out:
+            out.write(src.read())
+    return dest
+
+
+def apply_retention(folders=RETENTION_FOLDERS, tiers=RETENTION_TIERS, dry_run=DRY_RUN, workers=WORKERS):
+    start = time.perf_counter()
+    catalog = ImageCatalog()
+    now = datetime.now()
+
+    # Frames that were labeled (same file name in labeled_dataset) are always kept
+    catalog.scan(DATASET_PATH, labeled=True)
+    protected = {row["filename"] for row in catalog.query(root=DATASET_PATH)}
+
+    report = {"time": now.isoformat(timespec="seconds"), "dry_run": dry_run, "folders": {}}
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        catalog.scan(folder)
+        stats = {"downsampled": 0, "archived": 0, "deleted": 0, "bytes_reclaimed": 0, "errors": 0}
+        thinned = set()  # Dry run: frames a real run would have removed before downsampling
+
+        # 1. Thin the oldest tier first, so we never spend time downsampling frames about to go
+        for tier in sorted(tiers, key=lambda t: -t["older_than_days"]):
+            cutoff = now - timedelta(days=tier["older_than_days"])
+            rows = catalog.query(root=folder, until=cutoff, order_by="stream_code, captured_at")
+
+            if tier["action"] == "thin":
+                drop = plan_thinning(rows, tier.get("keep_one_per", "hour"), protected)
+                print(f"{folder}: {len(drop)} frames older than {tier['older_than_days']} days to thin "
+                      f"({sum(row['size'] or 0 for row in drop) / 1e6:.1f} MB).")
+                if dry_run:
+                    stats["archived" if ARCHIVE_THINNED else "deleted"] += len(drop)
+                    stats["bytes_reclaimed"] += sum(row["size"] or 0 for row in drop)
+                    thinned.update(row["path"] for row in drop)
+                    continue
+                if not drop:
+                    continue
+                sizes = {row["path"]: row["size"] or 0 for row in drop}
+                gone = archive_rows(catalog, folder, drop) if ARCHIVE_THINNED else list(sizes)
+                for path in gone:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        print(f"Could not remove {path}: {e}")
+                        stats["errors"] += 1
+                        continue
+                    catalog.record_delete(path)
+                    stats["archived" if ARCHIVE_THINNED else "deleted"] += 1
+                    # Bytes leaving the hot folder (archived frames still take their space in the bundle)
+                    stats["bytes_reclaimed"] += sizes[path]
+
+            elif tier["action"] == "downsample":
+                max_side = tier["max_side"]
+                todo_rows = [row for row in rows if row["path"] not in thinned
+                             and (row["width"] is None or max(row["width"], row["height"] or 0) > max_side)]
+                todo = [row["path"] for row in todo_rows]
+                print(f"{folder}: {len(todo)} frames older than {tier['older_than_days']} days to downsample "
+                      f"to {max_side}px.")
+                if dry_run:
+                    # Frames of unknown size are counted but not estimated
+                    stats["downsampled"] += len(todo)
+                    stats["bytes_reclaimed"] += sum(estimate_downsample(row, max_side) for row in todo_rows)
+                    continue
+                if not todo:
+                    continue
+                jobs = [(path, max_side, tier.get("jpeg_quality", 80)) for path in todo]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    for path, before, after, error in pool.map(downsample_file, jobs, chunksize=32):
+                        if error:
+                            print(f"Could not downsample {path}: {error}")
+                            stats["errors"] += 1
+                            continue
+                        if after < before:
+                            stats["downsampled"] += 1
+                            stats["bytes_reclaimed"] += before - after
+            else:
+                raise ValueError(f"Unknown retention action: {tier['action']}")
+
+        # 2. Pick up the new sizes (replaced files changed the folder's mtime, so this is incremental)
+        if not dry_run:
+            catalog.scan(folder)
+        report["folders"][folder] = stats
+
+    catalog.close()
+    print("-" * 30)
+    total = sum(s["bytes_reclaimed"] for s in report["folders"].values())
+    for folder, s in report["folders"].items():
+        print(f"{folder}: {s['downsampled']} downsampled, {s['archived']} archived, {s['deleted']} deleted, "
+              f"{s['bytes_reclaimed'] / 1e6:.1f} MB {'to reclaim' if dry_run else 'reclaimed'}, {s['errors']} errors")
+    action = "Would reclaim (estimate)" if dry_run else "Reclaimed"
+    print(f"{action} {total / 1e6:.1f} MB in the capture folders in {time.perf_counter() - start:.1f}s.")
+    return report
+
+
+if __name__ == "__main__":
+    apply_retention()
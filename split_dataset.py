@@ -0,0 +1,113 @@
+import csv
+import hashlib
+import os
+from image_catalog import ImageCatalog
+from config import DATASET_PATH, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE, SEED
+
+# --- CONFIGURATION ---
+SPLIT_MANIFEST = "split_manifest.csv"
+SPLIT_FRACTIONS = {"train": 0.7, "validation": 0.15, "test": 0.15}
+SPLIT_SALT = "road-split-v1"   # Change ONLY if you deliberately want a brand-new split
+
+# Every frame from the same camera on the same day lands in the same split,
+# so near-identical consecutive frames can never be on both sides.
+def group_key(row):
+    day = (row["captured_at"] or "")[:10]
+    return f"{row['stream_code']}|{day}"
+
+
+def assign_split(key, fractions=SPLIT_FRACTIONS, salt=SPLIT_SALT):
+    """Deterministic split for a group key: same key -> same split, on any machine, forever."""
+    digest = hashlib.sha1(f"{salt}|{key}".encode('utf-8')).hexdigest()
+    point = int(digest[:8], 16) / 0x100000000
+    cumulative = 0.0
+    for split, fraction in fractions.items():
+        cumulative += fraction
+        if point < cumulative:
+            return split
+    return list(fractions)[-1]
+
+
+def read_manifest(path=SPLIT_MANIFEST):
+    """{filename: {"group": ..., "split": ...}}. Keyed by filename so relabeling (moving) a file keeps its split."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline='') as f:
+        return {row["filename"]: row for row in csv.DictReader(f)}
+
+
+def update_manifest(dataset_path=DATASET_PATH, manifest_path=SPLIT_MANIFEST):
+    """
+    Adds new images to the manifest and drops deleted ones. Existing assignments are never changed,
+    so cached preprocessing and results stay comparable across runs.
+    """
+    catalog = ImageCatalog()
+    catalog.scan(dataset_path, labeled=True)
+    rows = [r for r in catalog.query(root=dataset_path) if r["label"] is not None]
+    catalog.close()
+
+    manifest = read_manifest(manifest_path)
+    current = {}
+    added = 0
+    for row in rows:
+        entry = manifest.get(row["filename"])
+        if entry is None:
+            key = group_key(row)
+            entry = {"filename": row["filename"], "group": key, "split": assign_split(key)}
+            added += 1
+        current[row["filename"]] = entry
+    removed = len(set(manifest) - set(current))
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["filename", "group", "split"])
+        writer.writeheader()
+        for filename in sorted(current):
+            writer.writerow(current[filename])
+    os.replace(tmp, manifest_path)
+
+    counts = {}
+    for row in rows:
+        split = current[row["filename"]]["split"]
+        counts.setdefault(split, {}).setdefault(row["label"], 0)
+        counts[split][row["label"]] += 1
+    print(f"Split manifest updated: +{added} new, -{removed} removed, {len(current)} total.")
+    for split in SPLIT_FRACTIONS:
+        print(f"   {split}: {counts.get(split, {})}")
+    return current
+
+
+def split_files(split, dataset_path=DATASET_PATH, manifest_path=SPLIT_MANIFEST):
+    """(paths, labels, class_names) for one split. Labels are indices into the sorted class folders."""
+    manifest = update_manifest(dataset_path, manifest_path)
+    class_names = sorted(d for d in os.listdir(dataset_path) if os.path.isdir(os.path.join(dataset_path, d)))
+
+    catalog = ImageCatalog()
+    rows = catalog.query(root=dataset_path)
+    catalog.close()
+
+    paths, labels = [], []
+    for row in rows:
+        entry = manifest.get(row["filename"])
+        if entry and entry["split"] == split and row["label"] in class_names:
+            paths.append(row["path"])
+            labels.append(class_names.index(row["label"]))
+    return paths, labels, class_names
+
+
+def load_split(split, image_size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE, shuffle=False, seed=SEED,
+               dataset_path=DATASET_PATH, manifest_path=SPLIT_MANIFEST):
+    """
+    Same output as image_dataset_from_directory (batched float images 0-255, int labels),
+    but for the files the manifest assigns to 'split'. Returns (dataset, class_names, paths).
+    """
+    from preprocess import dataset_from_paths
+
+    paths, labels, class_names = split_files(split, dataset_path, manifest_path)
+    print(f"Found {len(paths)} files for the '{split}' split.")
+    ds = dataset_from_paths(paths, labels, image_size, batch_size, shuffle, seed)
+    return ds, class_names, paths
+
+
+if __name__ == "__main__":
+    update_manifest()
@@ -0,0 +1,302 @@
+import bisect
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from config import CAMERAS_FILE
+
+# --- CONFIGURATION ---
+STATUS_HOST = "127.0.0.1"
+STATUS_PORT = 8765
+HISTORY_SIZE = 288            # Classifications kept per camera (a day at one frame every 5 minutes)
+STATUS_PATH = "road_status.json"  # Snapshot so a restart doesn't start from nothing
+SAVE_EVERY_SECONDS = 60
+
+# Endpoints (all JSON):
+#   GET  /cameras                  -> latest status of every camera
+#   GET  /cameras/<StreamCode>     -> latest status + recent history of one camera
+#   GET  /changes?since=<T>        -> cameras whose road condition changed at or after T (ISO time or epoch seconds)
+#   POST /update                   -> {"stream_code", "label", "confidence", "time"} (what predict.py sends)
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts is not None else None
+
+
+def parse_time(value):
+    """ISO string, epoch seconds (number or string) or datetime -> epoch seconds."""
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class RoadStatusStore:
+    """
+    Latest road condition per camera, plus a ring buffer of recent classifications.
+
+    Lookups are dict hits. "Changed since T" uses an append-only log of
+    (change time, camera) sorted by time, so it is a bisect plus the matching
+    entries; stale entries (the camera changed again later) are skipped and the
+    log is compacted once it gets much longer than the number of cameras.
+    The full "all cameras" response is cached and only rebuilt after an update,
+    so dashboards can poll it as often as they like.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history_size = history_size
+        self.lock = threading.Lock()
+        self.cameras = {}    # stream_code -> {"stream_code", "road", "label", "confidence", "time", "changed_at"}
+        self.history = {}    # stream_code -> deque of (time, label, confidence)
+        self.changes = []    # [(changed_at, stream_code)], sorted by changed_at
+        self.version = 0     # Bumped on every update
+        self._all_cache = None
+
+    # --- Feeding it ---
+
+    def load_cameras(self, cameras):
+        """Camera metadata from the GetCameras payload (the list inside 'd')."""
+        with self.lock:
+            for cam in cameras:
+                code = cam.get('StreamCode')
+                if not code:
+                    continue
+                entry = self.cameras.setdefault(code, self._empty(code))
+                entry["road"] = cam.get('PrimaryRoad')
+            self._touch()
+
+    def update(self, stream_code, label, confidence, when=None):
+        """Records one classification. Returns True if the camera's road condition changed."""
+        when = parse_time(when)
+        confidence = float(confidence)  # Before touching any state, so a bad value changes nothing
+        with self.lock:
+            entry = self.cameras.setdefault(stream_code, self._empty(stream_code))
+            if entry["time"] is not None and when < entry["time"]:
+                # An older frame (e.g. a backfill): history only, the live status stays
+                self._history(stream_code).append((when, label, confidence))
+                return False
+
+            changed = entry["label"] != label
+            entry.update(label=label, confidence=confidence, time=when)
+            self._history(stream_code).append((when, label, confidence))
+            if changed:
+                entry["changed_at"] = when
+                if self.changes and when < self.changes[-1][0]:
+                    bisect.insort(self.changes, (when, stream_code))
+                else:
+                    self.changes.append((when, stream_code))
+                if len(self.changes) > 4 * max(len(self.cameras), 64):
+                    self._compact()
+            self._touch()
+            return changed
+
+    def load_from_catalog(self, catalog, since=None):
+        """Backfills from the predictions prelabel.py stored in the image catalog."""
+        rows = catalog.query(since=since, order_by="captured_at")
+        count = 0
+        for row in rows:
+            if row["pred_label"] is not None and row["captured_at"]:
+                self.update(row["stream_code"], row["pred_label"], row["confidence"], row["captured_at"])
+                count += 1
+        return count
+
+    def _empty(self, code):
+        return {"stream_code": code, "road": None, "label": None, "confidence": None,
+                "time": None, "changed_at": None}
+
+    def _history(self, code):
+        if code not in self.history:
+            self.history[code] = deque(maxlen=self.history_size)
+        return self.history[code]
+
+    def _touch(self):
+        self.version += 1
+        self._all_cache = None
+
+    def _compact(self):
+        """Keeps only each camera's latest change."""
+        self.changes = sorted((e["changed_at"], code) for code, e in self.cameras.items()
+                              if e["changed_at"] is not None)
+
+    # --- Queries ---
+
+    def _public(self, entry):
+        return {**entry, "time": _iso(entry["time"]), "changed_at": _iso(entry["changed_at"])}
+
+    def all_json(self):
+        """Serialized status of every camera (cached until the next update)."""
+        with self.lock:
+            if self._all_cache is None:
+                body = {"version": self.version,
+                        "cameras": [self._public(e) for _, e in sorted(self.cameras.items())]}
+                self._all_cache = json.dumps(body).encode("utf-8")
+            return self._all_cache
+
+    def camera(self, stream_code, limit=None):
+        with self.lock:
+            entry = self.cameras.get(stream_code)
+            if entry is None:
+                return None
+            history = list(self.history.get(stream_code, ()))
+        if limit:
+            history = history[-limit:]
+        return {**self._public(entry),
+                "history": [{"time": _iso(t), "label": label, "confidence": conf} for t, label, conf in history]}
+
+    def changed_since(self, since):
+        since = parse_time(since)
+        with self.lock:
+            start = bisect.bisect_left(self.changes, (since, ""))
+            seen = set()
+            result = []
+            for changed_at, code in self.changes[start:]:
+                entry = self.cameras[code]
+                if code in seen or entry["changed_at"] != changed_at:
+                    continue  # Superseded by a later change
+                seen.add(code)
+                result.append(self._public(entry))
+        return {"since": _iso(since), "cameras": result}
+
+    # --- Snapshot ---
+
+    def save(self, path=STATUS_PATH):
+        # Copy under the lock; serializing happens outside it while updates keep coming in
+        with self.lock:
+            state = {"cameras": {code: dict(entry) for code, entry in self.cameras.items()},
+                     "history": {code: list(h) for code, h in self.history.items()}}
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def load(self, path=STATUS_PATH):
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            state = json.load(f)
+        with self.lock:
+            self.cameras = state["cameras"]
+            self.history = {code: deque((tuple(x) for x in h), maxlen=self.history_size)
+                            for code, h in state["history"].items()}
+            self._compact()
+            self._touch()
+
+
+def post_status(url, stream_code, label, confidence, when=None, timeout=2):
+    """Sends one classification to a running status server. Never raises (inference must not stop)."""
+    body = json.dumps({"stream_code": stream_code, "label": label, "confidence": float(confidence),
+                       "time": parse_time(when)}).encode("utf-8")
+    request = urllib.request.Request(url.rstrip("/") + "/update", data=body,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except Exception as e:
+        print(f"Could not send status to {url}: {e}")
+        return None
+
+
+def make_handler(store):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")  # Map dashboards on other origins
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            parts = [p for p in url.path.split("/") if p]
+            try:
+                if parts == ["cameras"]:
+                    self._send(200, store.all_json())
+                elif len(parts) == 2 and parts[0] == "cameras":
+                    limit = int(params["limit"][0]) if "limit" in params else None
+                    result = store.camera(parts[1], limit)
+                    self._send(200 if result else 404, result or {"error": f"unknown camera {parts[1]}"})
+                elif parts == ["changes"]:
+                    if "since" not in params:
+                        self._send(400, {"error": "missing ?since="})
+                    else:
+                        self._send(200, store.changed_since(params["since"][0]))
+                else:
+                    self._send(404, {"error": "not found"})
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip("/") != "/update":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length))
+                changed = store.update(data["stream_code"], data["label"], data["confidence"], data.get("time"))
+                self._send(200, {"changed": changed})
+            except (ValueError, KeyError, TypeError) as e:
+                # e.g. {"confidence": null} or a JSON body that isn't an object
+                self._send(400, {"error": f"bad update: {e}"})
+
+        def log_message(self, format, *args):
+            pass  # Dashboards poll a lot; don't flood the console
+
+    return StatusHandler
+
+
+def serve(host=STATUS_HOST, port=STATUS_PORT, status_path=STATUS_PATH, backfill=True):
+    store = RoadStatusStore()
+    store.load(status_path)
+    if os.path.exists(CAMERAS_FILE):
+        with open(CAMERAS_FILE) as f:
+            store.load_cameras(json.load(f))
+    if backfill:
+        from image_catalog import ImageCatalog
+        catalog = ImageCatalog()
+        newest = max((e["time"] for e in store.cameras.values() if e["time"]), default=None)
+        count = store.load_from_catalog(catalog, since=_iso(newest))
+        catalog.close()
+        print(f"Backfilled {count} classifications from the catalog.")
+
+    # Save a snapshot now and then, so a crash loses at most SAVE_EVERY_SECONDS
+    stop = threading.Event()
+
+    def _autosave():
+        saved_version = store.version
+        while not stop.wait(SAVE_EVERY_SECONDS):
+            if store.version != saved_version:
+                saved_version = store.version
+                store.save(status_path)
+
+    threading.Thread(target=_autosave, daemon=True).start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    print(f"Road status API on http://{host}:{port}/cameras ({len(store.cameras)} cameras). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        store.save(status_path)
+        print(f"Saved status to {status_path}.")
+
+
+if __name__ == "__main__":
+    serve()
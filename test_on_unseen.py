@@ -1,66 +1,43 @@
-import tensorflow as tf
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import classification_report, confusion_matrix
 import os
+import sys
+import tensorflow as tf
+from eval_engine import evaluate_checkpoints
+from split_dataset import load_split, SPLIT_MANIFEST
+from preprocess import dataset_from_directory
+from config import TEST_PATH, MODEL_PATH, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE
 
 # --- CONFIGURATION ---
-MODEL_PATH = "road_model.keras"
-TEST_PATH = "test_dataset" # <--- Points to the unseen data
-IMG_HEIGHT = 180
-IMG_WIDTH = 180
-BATCH_SIZE = 32
+# You can also pass model files on the command line: python test_on_unseen.py a.keras b.keras
+MODEL_PATHS = [MODEL_PATH]
+OUTPUT_DIR = "unseen_results"  # metrics.json + confusion-matrix PNGs (no windows pop up)
 
-def test_model():
-    if not os.path.exists(TEST_PATH):
-        print(f"Error: '{TEST_PATH}' not found. Did you run the splitter?")
-        return
+def test_model(model_paths=None):
+    model_paths = model_paths or MODEL_PATHS
 
-    print("Loading Model...")
-    model = tf.keras.models.load_model(MODEL_PATH)
-    
-    print(f"Loading Unseen Data from {TEST_PATH}...")
-    # Load dataset without shuffling order so we can match labels
-    test_ds = tf.keras.utils.image_dataset_from_directory(
-        TEST_PATH,
-        seed=123,
-        image_size=(IMG_HEIGHT, IMG_WIDTH),
-        batch_size=BATCH_SIZE,
-        shuffle=False 
-    )
+    if os.path.exists(TEST_PATH):
+        print(f"Loading Unseen Data from {TEST_PATH}...")
+        # Load dataset without shuffling order so we can match labels
+        test_ds, class_names, _ = dataset_from_directory(
+            TEST_PATH,
+            seed=123,
+            size=(IMG_HEIGHT, IMG_WIDTH),
+            batch_size=BATCH_SIZE,
+            shuffle=False
+        )
+    elif os.path.exists(SPLIT_MANIFEST):
+        # The 'test' split of the manifest: never used for training or validation
+        print(f"Loading Unseen Data from the 'test' split in {SPLIT_MANIFEST}...")
+        test_ds, class_names, _ = load_split("test", (IMG_HEIGHT, IMG_WIDTH), BATCH_SIZE)
+    else:
+        print(f"Error: neither '{TEST_PATH}' nor '{SPLIT_MANIFEST}' found. Run split_dataset.py first.")
+        return
     
-    class_names = test_ds.class_names
     print(f"Classes: {class_names}")
 
-    # Extract Images and Labels
-    y_true = []
-    y_pred = []
-    
-    print("Running predictions...")
-    for images, labels in test_ds:
-        # Predict batch
-        preds = model.predict(images, verbose=0)
-        pred_classes = np.argmax(preds, axis=1)
-        
-        y_true.extend(labels.numpy())
-        y_pred.extend(pred_classes)
-
-    # --- REPORT ---
-    print("\n------------------------------------------------")
-    print("FINAL EXAM RESULTS (UNSEEN DATA)")
-    print("------------------------------------------------")
-    print(classification_report(y_true, y_pred, target_names=class_names))
-
-    # Confusion Matrix
-    cm = confusion_matrix(y_true, y_pred)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Greens', 
-                xticklabels=class_names, yticklabels=class_names)
-    plt.xlabel('AI Prediction')
-    plt.ylabel('Actual Truth')
-    plt.title('Performance on Unseen Data')
-    plt.show()
+    # Predict batch by batch with every model (same streaming path as evaluate_model.py)
+    test_ds = test_ds.prefetch(buffer_size=tf.data.AUTOTUNE)
+    evaluate_checkpoints(model_paths, test_ds, class_names, OUTPUT_DIR,
+                         title='Performance on Unseen Data', cmap='Greens')
 
 if __name__ == "__main__":
-    test_model()
\ No newline at end of file
+    test_model(sys.argv[1:])
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The light cli.py commands must not pay for TensorFlow / OpenCV / sklearn at startup.
+# Each module is imported in a fresh interpreter, so nothing is cached from other tests.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_SECONDS = 0.5   # Measured ~0.01-0.12s; a TensorFlow import alone takes several seconds
+HEAVY_MODULES = ["tensorflow", "cv2", "sklearn", "matplotlib", "selenium"]
+
+# cli.py itself + the module each light subcommand imports when it runs
+LIGHT_COMMANDS = {
+    "cli": "cli",
+    "sort": "manual_sorter",
+    "review": "dataset_reviewer",
+    "clean": "clean_dataset",
+    "scan": "integrity_scan",
+    "split": "split_dataset",
+    "retention": "retention",
+    "status": "status_store",
+    "replay": "camera_replay",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def import_in_subprocess(module):
+    result = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                            cwd=REPO_ROOT, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0 and "No module named 'tkinter'" in result.stderr:
+        pytest.skip("tkinter is not installed")
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("command", sorted(LIGHT_COMMANDS))
+def test_light_command_imports_no_heavy_modules(command):
+    probe = import_in_subprocess(LIGHT_COMMANDS[command])
+    assert probe["heavy"] == [], f"'{command}' imports {probe['heavy']} at startup"
+
+
+@pytest.mark.parametrize("command", sorted(LIGHT_COMMANDS))
+def test_light_command_import_time(command):
+    probe = import_in_subprocess(LIGHT_COMMANDS[command])
+    assert probe["seconds"] < IMPORT_BUDGET_SECONDS, \
+        f"'{command}' took {probe['seconds']:.2f}s to import (budget {IMPORT_BUDGET_SECONDS}s)"
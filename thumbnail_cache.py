@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from image_prefetch import decode_thumbnail, DISPLAY_SIZE
+from config import DATASET_PATH, SOURCE_FOLDER
+
+# --- CONFIGURATION ---
+CACHE_FOLDER = ".thumbnail_cache"
+MAX_CACHE_MB = 1024          # Least recently used thumbnails are evicted above this
+JPEG_QUALITY = 90
+PREWARM_FOLDERS = [DATASET_PATH, SOURCE_FOLDER]
+PREWARM_WORKERS = os.cpu_count() or 4
+
+
+def cache_key(path, size=DISPLAY_SIZE):
+    """(path, mtime, file size, display size) -> file name. Edited or replaced originals get a new key."""
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size[0]}x{size[1]}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _cache_file(cache_folder, key):
+    # Two-level fan-out so no single folder gets 100k entries
+    return os.path.join(cache_folder, key[:2], key + ".jpg")
+
+
+def _write_thumbnail(cache_folder, key, img):
+    target = _cache_file(cache_folder, key)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    img.save(tmp, "JPEG", quality=JPEG_QUALITY)
+    os.replace(tmp, target)  # Atomic: readers never see half a file
+    return os.path.getsize(target)
+
+
+def _warm_one(args):
+    """Process-pool worker: makes the thumbnail for one original if it isn't cached yet."""
+    cache_folder, path, size = args
+    try:
+        key = cache_key(path, size)
+        if os.path.exists(_cache_file(cache_folder, key)):
+            return 0
+        return _write_thumbnail(cache_folder, key, decode_thumbnail(path, size))
+    except Exception as e:
+        print(f"Could not thumbnail {path}: {e}")
+        return 0
+
+
+class ThumbnailCache:
+    """
+    Disk-backed cache of pre-scaled display images shared by the sorter and the reviewer.
+    A re-review reads a ~100 KB JPEG instead of decoding the full frame again.
+    """
+
+    def __init__(self, cache_folder=CACHE_FOLDER, max_mb=MAX_CACHE_MB):
+        self.cache_folder = cache_folder
+        self.max_bytes = max_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        os.makedirs(cache_folder, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        """(last_used, path, bytes) for every cached thumbnail."""
+        for sub in os.scandir(self.cache_folder):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".jpg"):
+                    st = entry.stat()
+                    yield st.st_mtime, entry.path, st.st_size
+
+    def load(self, path, size=DISPLAY_SIZE):
+        """
+        Returns the display-sized image for 'path', from the cache when possible.
+        Same signature as image_prefetch.decode_thumbnail, so it can be the loader's decode function.
+        """
+        key = cache_key(path, size)
+        cached = _cache_file(self.cache_folder, key)
+        try:
+            with Image.open(cached) as img:
+                img.load()
+            os.utime(cached)  # Mark as recently used for LRU eviction
+            return img
+        except OSError:  # Not cached yet (or a damaged cache file)
+            pass
+
+        img = decode_thumbnail(path, size)
+        written = _write_thumbnail(self.cache_folder, key, img)
+        with self.lock:
+            self.total_bytes += written
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        return img
+
+    def evict(self):
+        """Deletes least recently used thumbnails until the cache is 90% of its cap."""
+        with self.lock:
+            entries = sorted(self._entries())
+            self.total_bytes = sum(size for _, _, size in entries)
+            target = self.max_bytes * 0.9
+            removed = 0
+            for _, path, size in entries:
+                if self.total_bytes <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self.total_bytes -= size
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            print(f"Thumbnail cache: evicted {removed} old thumbnails.")
+
+    def prewarm(self, paths, size=DISPLAY_SIZE, workers=PREWARM_WORKERS):
+        """Builds the missing thumbnails in parallel (one process per core) ahead of a review session."""
+        start = time.perf_counter()
+        jobs = [(self.cache_folder, p, size) for p in paths]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(_warm_one, jobs, chunksize=32))
+        created = sum(1 for w in written if w)
+        with self.lock:
+            self.total_bytes += sum(written)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        print(f"Pre-warmed {created} new thumbnails ({len(paths) - created} already cached) "
+              f"in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    from image_catalog import ImageCatalog
+
+    catalog = ImageCatalog()
+    all_paths = []
+    for folder in PREWARM_FOLDERS:
+        catalog.scan(folder, labeled=(folder == DATASET_PATH))
+        all_paths.extend(row["path"] for row in catalog.query(root=folder))
+    catalog.close()
+
+    ThumbnailCache().prewarm(all_paths)
@@ -1,5 +1,6 @@
 import time
 import os
+import numpy as np
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -7,11 +8,16 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
+from config import SOURCE_FOLDER
+from frame_quality import check_file, rejected_path, QualityStats, REJECT_ACTION
+from capture_scheduler import AdaptiveScheduler, BASE_INTERVAL
+from preprocess import open_rgb
 
 # --- Configuration ---
 WEBSITE_URL = "https://edmontontrafficcam.com/"
 INTERVAL_SECONDS = 60  # 2 minutes
-SAVE_FOLDER = "traffic_screenshots"
+ADAPTIVE = True  # Back off towards BASE_INTERVAL while the picture stays the same (capture_scheduler.py)
+SAVE_FOLDER = SOURCE_FOLDER
 
 def setup_driver():
     """Sets up the Chrome WebDriver."""
@@ -22,7 +28,8 @@ def setup_driver():
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
     return driver
 
-def main():
+def main(camera="cam"):
+    """Capture loop for one browser window; 'camera' prefixes the file names (one per parallel run)."""
     # 1. Create folder for screenshots if it doesn't exist
     if not os.path.exists(SAVE_FOLDER):
         os.makedirs(SAVE_FOLDER)
@@ -57,13 +64,18 @@ def main():
             print("Could not isolate <video> tag. Falling back to full window capture.")
             target_element = None
 
-        print(f"Starting capture loop. Taking a screenshot every {INTERVAL_SECONDS} seconds.")
+        if ADAPTIVE:
+            print(f"Starting capture loop. Taking a screenshot every {INTERVAL_SECONDS}-{BASE_INTERVAL} seconds "
+                  f"(faster while the picture changes).")
+        else:
+            print(f"Starting capture loop. Taking a screenshot every {INTERVAL_SECONDS} seconds.")
+        scheduler = AdaptiveScheduler(min_interval=INTERVAL_SECONDS)
         print("Press Ctrl+C in this terminal to stop.")
 
         while True:
             # Generate timestamped filename
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = f"{SAVE_FOLDER}/cam_{timestamp}.png"
+            filename = f"{SAVE_FOLDER}/{camera}_{timestamp}.png"
 
             if target_element:
                 # Screenshot just the video element
@@ -72,10 +84,27 @@ def main():
                 # Screenshot the whole visible browser window if element specific failed
                 driver.save_screenshot(filename)
 
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Saved {filename}")
+            # Black / slate / blurred screenshots go aside instead of into the sorting queue
+            result = check_file(filename)
+            quality = QualityStats()
+            quality.add(camera, result)
+            quality.save()
+            if not result["ok"]:
+                if REJECT_ACTION == "route":
+                    target = rejected_path(filename, result)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(filename, target)
+                else:
+                    os.remove(filename)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Rejected {filename} ({', '.join(result['reasons'])})")
+                scheduler.observe(camera)
+            else:
+                change, sig = scheduler.frame_change(camera, np.asarray(open_rgb(filename)), bgr=False)
+                scheduler.observe(camera, change, sig)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Saved {filename} (change {change:.2f})")
             
             # Wait for the next interval
-            time.sleep(INTERVAL_SECONDS)
+            time.sleep(scheduler.cameras[camera]["interval"] if ADAPTIVE else INTERVAL_SECONDS)
 
     except KeyboardInterrupt:
         print("\nStopping script...")
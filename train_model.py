@@ -1,59 +1,107 @@
+import os
 import matplotlib.pyplot as plt
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models
+from augment import augment_dataset, AUGMENT_POLICY, AUGMENT_SEED
+from balanced_sampler import balanced_dataset
+from train_profiler import TrainingProfiler
+from split_dataset import load_split, SPLIT_MANIFEST
+from preprocess import dataset_from_directory
+from config import DATASET_PATH, DATASET_URI, IMG_HEIGHT, IMG_WIDTH, BATCH_SIZE, MODEL_PATH, TINY_MODEL_PATH, STUDENT_MODEL_PATH
 
 # --- CONFIGURATION ---
-DATASET_PATH = "labeled_dataset"
-IMG_HEIGHT = 180
-IMG_WIDTH = 180
-BATCH_SIZE = 32
 EPOCHS = 15
 
-def train():
-    # 1. Load Data
+# "full" = the normal model (road_model.keras)
+# "tiny" = a very cheap first stage for the cascade (road_model_tiny.keras, see cascade.py)
+# "student" = compact CPU model (road_model_student.keras); distill.py trains it from the full one
+MODEL_SIZE = "full"
+TINY_INPUT_SIZE = 64      # The tiny model shrinks its input to this before the first conv
+STUDENT_INPUT_SIZE = 128  # ...and the student to this
+SAVE_PATHS = {"full": MODEL_PATH, "tiny": TINY_MODEL_PATH, "student": STUDENT_MODEL_PATH}
+
+# Class balancing (replaces the old disk-duplicating "cheat code")
+# None = plain shuffled files, or "class" / "camera" / "class_camera" (see balanced_sampler.py)
+BALANCE_BY = None
+TARGET_RATIOS = None  # e.g. {"clear_road": 1, "fully_covered": 1, "partially_covered": 1}
+
+# Set to True to time input wait vs compute per step (writes training_profile.json/.html)
+PROFILE = False
+
+def load_train_val():
+    """(train_ds, val_ds, class_names, train_paths), from the split manifest if there is one."""
+    if DATASET_URI:
+        # Streamed from the object store through a local disk cache (no bulk copy first)
+        from object_store import load_object_splits
+        train_ds, val_ds, class_names = load_object_splits(DATASET_URI)
+        return train_ds, val_ds, class_names, None
+
+    if os.path.exists(SPLIT_MANIFEST):
+        # Stable hash-based split (see split_dataset.py): new files never move old ones
+        train_ds, class_names, train_paths = load_split("train", (IMG_HEIGHT, IMG_WIDTH), BATCH_SIZE,
+                                                        shuffle=True, dataset_path=DATASET_PATH)
+        val_ds, _, _ = load_split("validation", (IMG_HEIGHT, IMG_WIDTH), BATCH_SIZE, dataset_path=DATASET_PATH)
+        return train_ds, val_ds, class_names, train_paths
+
+    # Old on-the-fly split (reshuffles whenever a file is added). Run split_dataset.py to switch.
     # (We use a seed so the split is reproducible)
-    train_ds = tf.keras.utils.image_dataset_from_directory(
+    train_ds, class_names, train_paths = dataset_from_directory(
         DATASET_PATH,
         validation_split=0.2,
         subset="training",
         seed=123,
-        image_size=(IMG_HEIGHT, IMG_WIDTH),
+        size=(IMG_HEIGHT, IMG_WIDTH),
         batch_size=BATCH_SIZE
     )
 
-    val_ds = tf.keras.utils.image_dataset_from_directory(
+    val_ds, _, _ = dataset_from_directory(
         DATASET_PATH,
         validation_split=0.2,
         subset="validation",
         seed=123,
-        image_size=(IMG_HEIGHT, IMG_WIDTH),
+        size=(IMG_HEIGHT, IMG_WIDTH),
         batch_size=BATCH_SIZE
     )
+    return train_ds, val_ds, class_names, train_paths
 
-    class_names = train_ds.class_names
-    num_classes = len(class_names)
-    print(f"Classes found: {class_names}")
+def build_model(num_classes, size="full"):
+    if size == "tiny":
+        # ~6k parameters: downscale, three small convs, global pooling. Meant to be right on
+        # the easy frames and unsure (low margin) on the hard ones, which go to the full model.
+        return models.Sequential([
+            layers.Input(shape=(IMG_HEIGHT, IMG_WIDTH, 3)),
+            layers.Resizing(TINY_INPUT_SIZE, TINY_INPUT_SIZE),
+            layers.Rescaling(1./255),
+            layers.Conv2D(8, 3, strides=2, padding='same', activation='relu'),
+            layers.Conv2D(16, 3, strides=2, padding='same', activation='relu'),
+            layers.Conv2D(32, 3, strides=2, padding='same', activation='relu'),
+            layers.GlobalAveragePooling2D(),
+            layers.Dense(num_classes)
+        ])
 
-    # Optimize performance
-    AUTOTUNE = tf.data.AUTOTUNE
-    train_ds = train_ds.cache().shuffle(1000).prefetch(buffer_size=AUTOTUNE)
-    val_ds = val_ds.cache().prefetch(buffer_size=AUTOTUNE)
-
-    # 2. Define Data Augmentation Block
-    # These layers ONLY activate during model.fit(), not model.predict()
-    data_augmentation = tf.keras.Sequential([
-        layers.RandomFlip("horizontal", input_shape=(IMG_HEIGHT, IMG_WIDTH, 3)),
-        layers.RandomRotation(0.1), # Rotate up to 10%
-        layers.RandomZoom(0.1),     # Zoom in/out up to 10%
-    ])
+    if size == "student":
+        # Depthwise-separable convs + global pooling instead of Flatten -> Dense(128),
+        # which is where almost all of the full model's parameters are
+        return models.Sequential([
+            layers.Input(shape=(IMG_HEIGHT, IMG_WIDTH, 3)),
+            layers.Resizing(STUDENT_INPUT_SIZE, STUDENT_INPUT_SIZE),
+            layers.Rescaling(1./255),
+            layers.Conv2D(16, 3, strides=2, padding='same', activation='relu'),
+            layers.SeparableConv2D(32, 3, padding='same', activation='relu'),
+            layers.MaxPooling2D(),
+            layers.SeparableConv2D(64, 3, padding='same', activation='relu'),
+            layers.MaxPooling2D(),
+            layers.SeparableConv2D(128, 3, padding='same', activation='relu'),
+            layers.GlobalAveragePooling2D(),
+            layers.Dropout(0.2),
+            layers.Dense(num_classes)
+        ])
 
-    # 3. Build the Model
-    model = models.Sequential([
-        # Augmentation happens FIRST
-        data_augmentation,
-        
-        # Then we normalize
+    return models.Sequential([
+        layers.Input(shape=(IMG_HEIGHT, IMG_WIDTH, 3)),
+
+        # Normalize
         layers.Rescaling(1./255),
         
         # The Convolutional Base (The "Eyes")
@@ -76,6 +124,50 @@ def train():
         layers.Dense(num_classes)
     ])
 
+def training_pipeline(train_ds, val_ds, class_names, train_paths):
+    """
+    Balancing + caching + augmentation. Returns (train_ds, val_ds); the caller adds the
+    final prefetch to train_ds (or lets the profiler do it).
+    """
+    # Flip / rotate / brightness run as a parallel map AFTER the cache,
+    # so every epoch gets new random copies and nothing is written to disk.
+    if train_paths is None:
+        # Object store: already shuffled per epoch and cached on local disk, which scales
+        # past what an in-memory .cache() could hold
+        if BALANCE_BY:
+            print("BALANCE_BY is not supported with DATASET_URI; training unbalanced.")
+        return augment_dataset(train_ds, AUGMENT_POLICY, AUGMENT_SEED), val_ds.prefetch(tf.data.AUTOTUNE)
+    if BALANCE_BY:
+        # Streams files per group with bounded buffers; no cache, so every epoch is re-sampled
+        print(f"Balancing training data by: {BALANCE_BY}")
+        train_ds = balanced_dataset(train_paths, class_names, group_by=BALANCE_BY,
+                                    target_ratios=TARGET_RATIOS,
+                                    image_size=(IMG_HEIGHT, IMG_WIDTH), batch_size=BATCH_SIZE)
+    else:
+        train_ds = train_ds.cache().shuffle(1000)
+    train_ds = augment_dataset(train_ds, AUGMENT_POLICY, AUGMENT_SEED)
+    val_ds = val_ds.cache().prefetch(buffer_size=tf.data.AUTOTUNE)
+    return train_ds, val_ds
+
+def train():
+    # 1. Load Data
+    train_ds, val_ds, class_names, train_paths = load_train_val()
+    num_classes = len(class_names)
+    print(f"Classes found: {class_names}")
+
+    # 2. Optimize performance + Data Augmentation
+    AUTOTUNE = tf.data.AUTOTUNE
+    train_ds, val_ds = training_pipeline(train_ds, val_ds, class_names, train_paths)
+    profiler = TrainingProfiler() if PROFILE else None
+    if profiler:
+        train_ds = profiler.instrument(train_ds)  # counts batches, then prefetches
+    else:
+        train_ds = train_ds.prefetch(buffer_size=AUTOTUNE)
+
+    # 3. Build the Model
+    model = build_model(num_classes, MODEL_SIZE)
+    print(f"Model size: {MODEL_SIZE} ({model.count_params():,} parameters)")
+
     # 4. Compile
     model.compile(optimizer='adam',
                   loss=tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True),
@@ -83,22 +175,27 @@ def train():
 
     # 5. Train
     print("Starting training...")
-    history = model.fit(
-        train_ds,
-        validation_data=val_ds,
-        epochs=EPOCHS
-    )
+    if profiler:
+        history = profiler.fit(model, train_ds, val_ds, EPOCHS)
+        profiler.report()
+    else:
+        history = model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=EPOCHS
+        ).history
 
     # 6. Save
-    model.save("road_model.keras")
-    print("Model saved as road_model.keras")
+    save_path = SAVE_PATHS[MODEL_SIZE]
+    model.save(save_path)
+    print(f"Model saved as {save_path}")
 
     # 7. Visualize Results
-    acc = history.history['accuracy']
-    val_acc = history.history['val_accuracy']
-    loss = history.history['loss']
-    val_loss = history.history['val_loss']
-    epochs_range = range(EPOCHS)
+    acc = history['accuracy']
+    val_acc = history['val_accuracy']
+    loss = history['loss']
+    val_loss = history['val_loss']
+    epochs_range = range(len(acc))  # Shorter than EPOCHS if training stopped early
 
     plt.figure(figsize=(8, 8))
     plt.subplot(1, 2, 1)
@@ -0,0 +1,180 @@
+import inspect
+import json
+import os
+import sys
+import time
+import tensorflow as tf
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+# --- CONFIGURATION ---
+REPORT_PATH = "training_profile.json"   # An .html file with the same name is written next to it
+INPUT_BOUND_SHARE = 0.5                 # Input wait above this share of step time = input-bound
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None if the OS can't tell us)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class TrainingProfiler:
+    """
+    Runs the training loop step by step so we can see where each second goes:
+    waiting for the next batch from tf.data (decode, cache, shuffle) versus
+    the forward/backward pass itself. No TensorBoard needed.
+    """
+
+    def __init__(self):
+        self.produced = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.consumed = 0
+        self.epochs = []
+        self.first_step_seconds = None
+
+    def instrument(self, ds):
+        """
+        Counts batches as they leave the pipeline, then prefetches.
+        produced - consumed = batches ready and waiting when the model asks for one.
+        Call this INSTEAD of the final .prefetch() on the training dataset.
+        """
+        def _count(images, labels):
+            with tf.control_dependencies([self.produced.assign_add(1)]):
+                return tf.identity(images), labels
+
+        return ds.map(_count).prefetch(buffer_size=tf.data.AUTOTUNE)
+
+    def fit(self, model, train_ds, val_ds, epochs):
+        """Drop-in for model.fit(); returns the same history dict (accuracy, loss, val_*)."""
+        history = {"accuracy": [], "loss": [], "val_accuracy": [], "val_loss": []}
+
+        # Keras 3 never resets metrics inside train_on_batch (and has no reset_metrics argument);
+        # Keras 2 resets after every batch unless told not to. Either way we reset once per epoch.
+        train_kwargs = {"return_dict": True}
+        if "reset_metrics" in inspect.signature(model.train_on_batch).parameters:
+            train_kwargs["reset_metrics"] = False
+
+        for epoch in range(epochs):
+            print(f"Epoch {epoch + 1}/{epochs} (profiling)")
+            model.reset_metrics()
+            logs = None
+            input_wait, compute, occupancy = [], [], []
+            images_seen = 0
+            epoch_start = time.perf_counter()
+
+            iterator = iter(train_ds)
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    images, labels = next(iterator)
+                except StopIteration:
+                    break
+                t1 = time.perf_counter()
+                self.consumed += 1
+                occupancy.append(int(self.produced.numpy()) - self.consumed)
+
+                logs = model.train_on_batch(images, labels, **train_kwargs)
+                t2 = time.perf_counter()
+
+                # The very first step also traces/compiles the graph, keep it out of the totals
+                if self.first_step_seconds is None:
+                    self.first_step_seconds = t2 - t0
+                    continue
+
+                input_wait.append(t1 - t0)
+                compute.append(t2 - t1)
+                images_seen += int(images.shape[0])
+
+            epoch_seconds = time.perf_counter() - epoch_start
+            if logs is None:
+                print("   No training batches in this epoch (empty training split?). Stopping.")
+                break
+            val_logs = model.evaluate(val_ds, verbose=0, return_dict=True)
+
+            history["accuracy"].append(logs["accuracy"])
+            history["loss"].append(logs["loss"])
+            history["val_accuracy"].append(val_logs["accuracy"])
+            history["val_loss"].append(val_logs["loss"])
+
+            self.epochs.append(self._summarize_epoch(epoch, input_wait, compute, occupancy,
+                                                     images_seen, epoch_seconds))
+            e = self.epochs[-1]
+            print(f"   loss: {logs['loss']:.4f} - accuracy: {logs['accuracy']:.4f} - "
+                  f"val_loss: {val_logs['loss']:.4f} - val_accuracy: {val_logs['accuracy']:.4f}")
+            print(f"   input wait: {e['input_wait_seconds']:.1f}s | compute: {e['compute_seconds']:.1f}s | "
+                  f"{e['images_per_second']:.1f} img/s")
+
+        return history
+
+    def _summarize_epoch(self, epoch, input_wait, compute, occupancy, images_seen, epoch_seconds):
+        wait_total = sum(input_wait)
+        compute_total = sum(compute)
+        step_total = wait_total + compute_total
+        steps = len(compute)
+        return {
+            "epoch": epoch + 1,
+            "steps": steps,
+            "input_wait_seconds": wait_total,
+            "compute_seconds": compute_total,
+            "input_wait_share": wait_total / step_total if step_total else 0.0,
+            "mean_step_ms": 1000 * step_total / steps if steps else 0.0,
+            "max_input_wait_ms": 1000 * max(input_wait) if input_wait else 0.0,
+            "mean_prefetch_occupancy": sum(occupancy) / len(occupancy) if occupancy else 0.0,
+            "empty_prefetch_steps": sum(1 for o in occupancy if o <= 0),
+            "images_per_second": images_seen / epoch_seconds if epoch_seconds else 0.0,
+            "epoch_seconds": epoch_seconds,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def dominant_cost(self):
+        """Names the biggest cost, looking at the first epoch separately (it fills the .cache())."""
+        if not self.epochs:
+            return "unknown"
+
+        later = self.epochs[1:] or self.epochs
+        wait = sum(e["input_wait_seconds"] for e in later)
+        compute = sum(e["compute_seconds"] for e in later)
+        share = wait / (wait + compute) if (wait + compute) else 0.0
+
+        if share > INPUT_BOUND_SHARE:
+            return "input pipeline (decode/shuffle stalls every epoch)"
+        if self.epochs[0]["input_wait_share"] > INPUT_BOUND_SHARE:
+            return "input pipeline on the first epoch only (JPEG decode while filling the cache), then compute"
+        return "compute (model layers)"
+
+    def report(self, path=REPORT_PATH):
+        """Writes the JSON report plus a small HTML table next to it."""
+        summary = {
+            "dominant_cost": self.dominant_cost(),
+            "first_step_seconds": self.first_step_seconds,
+            "peak_rss_mb": peak_rss_mb(),
+            "epochs": self.epochs,
+        }
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+        columns = ["epoch", "steps", "input_wait_seconds", "compute_seconds", "input_wait_share",
+                   "mean_prefetch_occupancy", "empty_prefetch_steps", "images_per_second", "peak_rss_mb"]
+        rows = "".join(
+            "<tr>" + "".join(f"<td>{e[c]:.3g}</td>" if isinstance(e[c], float) else f"<td>{e[c]}</td>"
+                             for c in columns) + "</tr>"
+            for e in self.epochs
+        )
+        html = (
+            "<html><head><title>Training Profile</title></head><body>"
+            f"<h2>Dominant cost: {summary['dominant_cost']}</h2>"
+            f"<p>First step (graph tracing): {self.first_step_seconds or 0:.2f}s</p>"
+            "<table border='1' cellpadding='4'><tr>" + "".join(f"<th>{c}</th>" for c in columns) + "</tr>"
+            f"{rows}</table></body></html>"
+        )
+        with open(os.path.splitext(path)[0] + ".html", "w") as f:
+            f.write(html)
+
+        print(f"Profile saved to {path}")
+        print(f"Dominant cost: {summary['dominant_cost']}")
+        return summary